@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+import concurrent.futures
+import copy
+import itertools
+import os
+
+import numpy as np
+
+from .bones_pose_calculator import (
+    BonesPoseCalculator,
+    BonesTree,
+)
+from .camera_trace_bone import (
+    CameraSmoother,
+    CameraTracer,
+)
+from .job_planner import JobPlanner
+from .job_setting import (
+    PREVIEW_EASING_TABLE_SIZE,
+    PREVIEW_STRIDE,
+    QUALITY_FULL,
+    QUALITY_PROGRESSIVE,
+    get_motion_bones_names,
+    select_bones_list,
+    validate_bones_data,
+    validate_camera_data,
+)
+from .keyframe_validator import KeyframeValidator
+from .timeline_profile import TimelineProfile
+from .vmd_profile import (
+    VmdBoneData,
+    VmdSimpleProfile,
+)
+
+
+def generate_bone_tracing_camera_data(
+        src_camera,
+        dst_camera,
+        need_smooth=True,
+        need_smooth_fov_angles=False,
+        camera_shake_interval=1.0,
+        camera_shake_amplitude=0.1,
+        src_nonrotatable_bone=None,
+        trace_bone_name=None,
+        interp_frame_interval=2,
+        motion_time_delay=0.0,
+        thread_num=1,
+        seed=None,
+        validation_policy=KeyframeValidator.POLICY_REPAIR,
+        quality=QUALITY_FULL,
+        preview_stride=PREVIEW_STRIDE,
+        src_dancers=None,
+        dancer_weights=None,
+        src_dancer_model=None,
+        memory_budget=None,
+    ):
+
+    vpc = VmdSimpleProfile(src_camera)
+
+    if not vpc.check_is_camera():
+        print("Not camera data but bone data: %s" % (src_camera,))
+        return
+
+    # admission by estimated peak memory
+    if memory_budget is not None:
+        plan = plan_bone_tracing_camera_data(
+            src_camera, src_nonrotatable_bone, trace_bone_name, motion_time_delay,
+            interp_frame_interval, src_dancers, src_dancer_model, memory_budget,
+        )
+        print("memory plan: %s" % JobPlanner.describe(plan))
+        if plan["decision"] == JobPlanner.DECISION_REFUSE:
+            raise MemoryError(plan["reason"])
+
+    # load
+    print("load camera data")
+    camera_data = vpc.read_camera()
+    print("load %d frames of camera" % len(camera_data.frame_ids))
+    camera_data = validate_camera_data(camera_data, validation_policy)
+
+    bone_data = None
+    if src_nonrotatable_bone and trace_bone_name:
+        vpb = open_bone_profile(src_nonrotatable_bone)
+        if vpb.check_is_camera():
+            print("Not bone data but camera data: %s" % (src_nonrotatable_bone,))
+        else:
+            print("load fully interpolated nonrotatable bone data...")
+            bone_data = read_traced_bones(vpb, [trace_bone_name], validation_policy)[trace_bone_name]
+            print("load %d frames of bone %s" % (bone_data.get_frame_num(), bone_data.name))
+
+    # members of group dance, which are loaded concurrently
+    dancers_bpc = []  # type: list[BonesPoseCalculator]
+    dancer_bone_name = None
+    if src_dancers and trace_bone_name:
+        dancer_bone_name, bones_list = get_dancer_bones_list(trace_bone_name, src_dancer_model)
+        if dancer_bone_name is None:
+            print("Not bone of dancers: %s" % (trace_bone_name,))
+            return
+        print("load motion data of %d dancers..." % len(src_dancers))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(thread_num, 1)) as executor:
+            dancers_bpc = list(executor.map(
+                lambda src: load_dancer(src, bones_list, validation_policy), src_dancers,
+            ))
+        if any([bpc is None for bpc in dancers_bpc]):
+            return
+
+    # create object to processing camera data
+    cs = CameraSmoother(camera_data, interp_frame_interval, thread_num)
+
+    # interpolation (coarse preview first, which is refined to full quality
+    # for progressive quality)
+    if quality == QUALITY_FULL:
+        print("doing interpolation of camera data...")
+        camera_interps = [(cs.interp(need_smooth, need_smooth_fov_angles), None)]
+    else:
+        print("doing preview interpolation of camera data with stride %d frames..." % preview_stride)
+        frame_strides = [preview_stride] + ([1] if quality == QUALITY_PROGRESSIVE else [])
+        camera_interps = cs.interp_progressive(need_smooth, need_smooth_fov_angles, frame_strides)
+
+    # stride shorter than interpolation interval gives full quality at once
+    has_preview = quality != QUALITY_FULL and preview_stride // interp_frame_interval > 1
+    for i, (camera_interp, error_bounds) in enumerate(camera_interps):
+        is_preview = has_preview and i == 0
+        if is_preview:
+            print("error bound of camera interpolation: %s" % ", ".join([
+                "%s %f" % (name, error_bound) for name, error_bound in error_bounds.items()
+            ]))
+        elif quality == QUALITY_PROGRESSIVE:
+            print("refined to full quality")
+
+        if dancers_bpc:
+            # dancers are posed only at the frames needed, and blended at once
+            # (low-pass filter is linear, so it's applied to the blended centroid)
+            need_lpf = motion_time_delay > 0. and not is_preview
+            if need_lpf:
+                frame_ids = np.arange(camera_interp.frame_ids[-1] + 1)
+            else:
+                frame_ids = camera_interp.frame_ids
+            print("calculate %s of %d dancers..." % (dancer_bone_name, len(dancers_bpc)))
+            easing_table_size = PREVIEW_EASING_TABLE_SIZE if is_preview else None
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max(thread_num, 1)) as executor:
+                dancers_bone = list(executor.map(
+                    lambda bpc: bpc.get_pose_bone_at(dancer_bone_name, frame_ids, easing_table_size),
+                    dancers_bpc,
+                ))
+            bone_data = CameraTracer.blend_bones(dancers_bone, frame_ids, dancer_weights)
+            if need_lpf:
+                print("smoothing bone with %f sec of time delay..." % motion_time_delay)
+                bone_data = get_lpf_bone_data(bone_data, motion_time_delay, thread_num)
+
+        if bone_data is not None:
+            # low-pass filter is skipped for preview, and done for dancers
+            if motion_time_delay > 0. and not is_preview and not dancers_bpc:
+                print("smoothing bone with %f sec of time delay..." % motion_time_delay)
+                bone_data = get_lpf_bone_data(bone_data, motion_time_delay, thread_num)
+            print("calculate camera tracing bone...")
+            # camera distance data is redundant (useless, and misleading) for bone tracing
+            camera_interp.distances = camera_interp.positions[:,2]
+            camera_interp.positions = CameraTracer.trace_bone(camera_interp, bone_data)
+
+        if camera_shake_interval > 0. and camera_shake_amplitude > 0.:
+            print(
+                "add cammera shake with interval %f sec and amplitiude %f m ..."
+                % (camera_shake_interval, camera_shake_amplitude)
+            )
+            camera_interp.positions = CameraTracer.add_camera_shake(
+                camera_interp, camera_shake_interval, camera_shake_amplitude, seed,
+            )
+
+        # write to file
+        print("exporting camera data to file: '%s' ..." % dst_camera)
+        vpc.write_camera(dst_camera, camera_interp)
+    print("done!")
+
+
+def plan_bone_tracing_camera_data(
+        src_camera, src_nonrotatable_bone=None, trace_bone_name=None, motion_time_delay=0.0,
+        interp_frame_interval=2, src_dancers=None, src_dancer_model=None,
+        memory_budget=None, in_use_bytes=0,
+    ):
+    # type: (str, str | None, str | None, float, int, list[str] | None, str | None, float | None, int) -> dict
+    # estimate the job from vmd headers, and decide whether it runs,
+    # waits for in_use_bytes or is refused in budget (MB)
+    bone_summaries = []  # type: list[dict]
+    bone_num = 1
+    if src_dancers and trace_bone_name:
+        _, bones_list = get_dancer_bones_list(trace_bone_name, src_dancer_model)
+        bone_summaries = [JobPlanner.read_summary(src) for src in src_dancers]
+        bone_num = max(len(bones_list), 1)
+    elif src_nonrotatable_bone and trace_bone_name \
+            and not TimelineProfile.is_timeline(src_nonrotatable_bone):
+        # dense timeline is memory-mapped, instead of loaded
+        bone_summaries = [JobPlanner.read_summary(src_nonrotatable_bone)]
+    estimate = JobPlanner.estimate_bone_tracing_camera(
+        JobPlanner.read_summary(src_camera), interp_frame_interval, bone_summaries, bone_num,
+        motion_time_delay,
+    )
+    budget_bytes = None if memory_budget is None else int(memory_budget * 1e6)
+    return JobPlanner.plan([estimate], budget_bytes, in_use_bytes)
+
+
+def get_dancer_bones_list(trace_bone_name, src_model=None):
+    # type: (str, str | None) -> tuple[str | None, list[tuple[str, str, np.ndarray]]]
+    # traced bone in the name of motion, and its ancestors
+    bone_name, = get_motion_bones_names([trace_bone_name])
+    bones_list = select_bones_list([bone_name], src_model)
+    if bone_name not in {bone[0] for bone in bones_list}:
+        return None, bones_list
+    return bone_name, bones_list
+
+
+def load_dancer(src, bones_list, validation_policy):
+    # type: (str, list[tuple[str, str, np.ndarray]], str) -> BonesPoseCalculator | None
+    vp = VmdSimpleProfile(src)
+    if vp.check_is_camera():
+        print("Not bone data but camera data: %s" % (src,))
+        return None
+    bones_data = vp.read_desired_bones([bone[0] for bone in bones_list])
+    bones_data = validate_bones_data(bones_data, validation_policy)
+    print("load %d frames of dancer %s" % (
+        sum([bone_data.get_frame_num() for bone_data in bones_data.values()]),
+        vp.read_model_name(),
+    ))
+    return BonesPoseCalculator(bones_data, BonesTree.get(bones_list))
+
+
+def open_bone_profile(src):
+    # type: (str) -> VmdSimpleProfile | TimelineProfile
+    if TimelineProfile.is_timeline(src):
+        return TimelineProfile(src)
+    else:
+        return VmdSimpleProfile(src)
+
+
+def read_traced_bones(vpb, bone_names, validation_policy):
+    # type: (VmdSimpleProfile | TimelineProfile, list[str], str) -> dict[str, VmdBoneData]
+    bones_data = vpb.read_desired_bones(bone_names)
+    # dense timeline is written by the tools, and isn't validated, which would
+    # read (and copy) the whole memory-mapped file
+    if isinstance(vpb, TimelineProfile):
+        return bones_data
+    return validate_bones_data(bones_data, validation_policy)
+
+
+def get_lpf_bone_data(bone_data, time_delay, thread_num=1):
+    # type: (VmdBoneData, float, int) -> VmdBoneData
+    # low-pass filter is applied to every frame instead of keyframes
+    frame_ids = np.arange(bone_data.frame_ids[-1] + 1)
+    bpc = BonesPoseCalculator({bone_data.name: bone_data})
+    bone_full_interp = bpc.get_interp_bone_at(bone_data.name, frame_ids)
+    bone_full_interp.frame_ids = frame_ids
+    bone_full_interp.positions = BonesPoseCalculator.apply_lpf(
+        bone_full_interp.positions, time_delay, thread_num=thread_num,
+    )
+    return bone_full_interp
+
+
+def generate_bone_tracing_camera_data_sweep(
+        src_camera,
+        dst_camera,
+        need_smooth=True,
+        need_smooth_fov_angles=False,
+        camera_shake_intervals=[1.0],
+        camera_shake_amplitudes=[0.1],
+        src_nonrotatable_bone=None,
+        trace_bone_names=[None],
+        interp_frame_intervals=[2],
+        motion_time_delays=[0.0],
+        thread_num=1,
+        seed=None,
+        validation_policy=KeyframeValidator.POLICY_REPAIR,
+    ):
+    # generate camera data for every combination of parameters,
+    # intermediate data shared by the combinations is computed only once
+
+    vpc = VmdSimpleProfile(src_camera)
+
+    if not vpc.check_is_camera():
+        print("Not camera data but bone data: %s" % (src_camera,))
+        return
+
+    # load
+    print("load camera data")
+    camera_data = vpc.read_camera()
+    print("load %d frames of camera" % len(camera_data.frame_ids))
+    camera_data = validate_camera_data(camera_data, validation_policy)
+
+    # load all traced bones at once
+    bones_data = {}  # type: dict[str, VmdBoneData]
+    desired_bones_names = [name for name in trace_bone_names if name]
+    if src_nonrotatable_bone and desired_bones_names:
+        vpb = open_bone_profile(src_nonrotatable_bone)
+        if vpb.check_is_camera():
+            print("Not bone data but camera data: %s" % (src_nonrotatable_bone,))
+            return
+        print("load fully interpolated nonrotatable bone data...")
+        bones_data = read_traced_bones(vpb, desired_bones_names, validation_policy)
+        for bone_data in bones_data.values():
+            print("load %d frames of bone %s" % (bone_data.get_frame_num(), bone_data.name))
+
+    # name of output file is suffixed with the swept parameters
+    dst_root, dst_ext = os.path.splitext(dst_camera)
+    params_list = [
+        ("i", interp_frame_intervals),
+        ("b", trace_bone_names),
+        ("d", motion_time_delays),
+        ("si", camera_shake_intervals),
+        ("sa", camera_shake_amplitudes),
+    ]
+
+    def get_dst(*params):
+        suffix = "".join([
+            "_%s-%s" % (key, value) \
+                for (key, values), value in zip(params_list, params) if len(values) > 1
+        ])
+        return dst_root + suffix + dst_ext
+
+    bones_lpf = {}  # type: dict[tuple[str, float], VmdBoneData]
+    for interp_frame_interval in interp_frame_intervals:
+        # create object to processing camera data
+        cs = CameraSmoother(camera_data, interp_frame_interval, thread_num)
+
+        # interpolation
+        print(
+            "doing interpolation of camera data with interval %d frames..."
+            % interp_frame_interval
+        )
+        camera_interp = cs.interp(need_smooth, need_smooth_fov_angles)
+
+        # camera shake depends on frames but not on traced bone
+        shake_motions = {}  # type: dict[tuple[float, float], np.ndarray]
+        for camera_shake_interval, camera_shake_amplitude in itertools.product(
+                camera_shake_intervals, camera_shake_amplitudes,
+            ):
+            if camera_shake_interval > 0. and camera_shake_amplitude > 0.:
+                shake_motions[camera_shake_interval, camera_shake_amplitude] = \
+                    CameraTracer.add_camera_shake(
+                        camera_interp, camera_shake_interval, camera_shake_amplitude, seed,
+                    ) - camera_interp.positions
+
+        for trace_bone_name, motion_time_delay in itertools.product(
+                trace_bone_names, motion_time_delays,
+            ):
+            camera_traced = copy.copy(camera_interp)
+            if trace_bone_name in bones_data:
+                bone_key = (trace_bone_name, motion_time_delay)
+                if bone_key not in bones_lpf:
+                    if motion_time_delay > 0.:
+                        print(
+                            "smoothing bone %s with %f sec of time delay..."
+                            % (trace_bone_name, motion_time_delay)
+                        )
+                        bones_lpf[bone_key] = get_lpf_bone_data(
+                            bones_data[trace_bone_name], motion_time_delay, thread_num,
+                        )
+                    else:
+                        bones_lpf[bone_key] = bones_data[trace_bone_name]
+                # camera distance data is redundant (useless, and misleading) for bone tracing
+                camera_traced.distances = camera_interp.positions[:,2]
+                camera_traced.positions = CameraTracer.trace_bone(
+                    camera_interp, bones_lpf[bone_key],
+                )
+
+            for camera_shake_interval, camera_shake_amplitude in itertools.product(
+                    camera_shake_intervals, camera_shake_amplitudes,
+                ):
+                camera_variant = copy.copy(camera_traced)
+                shake_key = (camera_shake_interval, camera_shake_amplitude)
+                if shake_key in shake_motions:
+                    camera_variant.positions = camera_traced.positions + shake_motions[shake_key]
+
+                # write to file
+                dst = get_dst(
+                    interp_frame_interval, trace_bone_name, motion_time_delay,
+                    camera_shake_interval, camera_shake_amplitude,
+                )
+                print("exporting camera data to file: '%s' ..." % dst)
+                vpc.write_camera(dst, camera_variant)
+    print("done!")
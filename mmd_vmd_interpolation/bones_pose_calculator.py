@@ -1,11 +1,27 @@
+import collections
+import concurrent.futures
+import functools
+import threading
+
 import numpy as np
-import scipy.signal
 
+from .jit_backend import JitBackend
 from .mmd_curve_interp import MMDCurveInterp
 from .transform import Transform
 from .vmd_profile import VmdBoneData
 
 
+def _synchronized(fun):
+    # serialize memoized computation of an object shared by threads,
+    # which is safe by the serialization, so computation doesn't run in parallel
+    # (an object for each thread runs in parallel without sharing cache)
+    @functools.wraps(fun)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return fun(self, *args, **kwargs)
+    return wrapper
+
+
 class BonesTree(object):
 
     @classmethod
@@ -26,36 +42,173 @@ class BonesTree(object):
                     - bones_tree[bone_info["parent"]]["position"])
         return bones_tree
 
+    @classmethod
+    def select(cls, bones_list, desired_bones_names):
+        # type: (list[tuple[str, str, np.ndarray]], list[str]) -> list[tuple[str, str, np.ndarray]]
+        # select desired bones and all their ancestors, which are required for
+        # successive transformation, with the order in the original list
+        bones_parent = {bone_name: parent_name for bone_name, parent_name, _ in bones_list}
+        selected_names = set()
+        for bone_name in desired_bones_names:
+            while bone_name is not None and bone_name not in selected_names:
+                if bone_name not in bones_parent:
+                    break
+                selected_names.add(bone_name)
+                bone_name = bones_parent[bone_name]
+        return [bone for bone in bones_list if bone[0] in selected_names]
+
 
 class BonesPoseCalculator(object):
 
-    def __init__(self, bones_data, bone_tree={}):
-        # type: (dict[str, VmdBoneData], dict[str, dict[str, str | np.ndarray]]) -> None
-        self._bones_data = bones_data  # type: dict[str, VmdBoneData]
+    # stages of cached data
+    _STAGE_INTERP = "interp"
+    _STAGE_POSE = "pose"
+    _STAGE_LPF = "lpf"
+    # frames of low-pass filter computed at once
+    _LPF_CHUNK_LEN = 64
+    # minimum frames of a segment of low-pass filter in parallel
+    _LPF_SEGMENT_MIN_LEN = 4096
+
+    def __init__(self, bones_data, bone_tree={}, cache_max_bytes=None, dtype="float", thread_num=1):
+        # type: (dict[str, VmdBoneData], dict[str, dict[str, str | np.ndarray]], int | None, str, int) -> None
+        self._bones_data = dict(bones_data)  # type: dict[str, VmdBoneData]
         self._bones_tree = bone_tree
+        # dtype of data for each frame of full timeline (e.g. float32 for half memory)
+        self._dtype = np.dtype(dtype)
+        # threads of low-pass filter along timeline, created at the first use
+        self._thread_num = thread_num
+        self._lpf_executor = None  # type: concurrent.futures.ThreadPoolExecutor | None
+        # computed data keyed by (stage, bone name, parameters) with lru eviction,
+        # whose memory is unbounded if cache_max_bytes is None
+        self._cache = collections.OrderedDict()  # type: collections.OrderedDict[tuple, tuple[VmdBoneData, int]]
+        self._cache_max_bytes = cache_max_bytes
+        self._cache_bytes = 0
+        self._cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+        # re-entrant, since cached data depends on each other
+        self._lock = threading.RLock()
+        self._init_timeline()
+
+    def _init_timeline(self):
+        # type: () -> None
         self._full_frame_num = max([
             b.frame_ids[-1] if b.get_frame_num() else 0 \
                 for b in self._bones_data.values()
         ])
-        self._bones_full_interp = {}  # type: dict[str, VmdBoneData]
-        self._bones_full_pose = {}  # type: dict[str, VmdBoneData]
-        self._bones_full_position_lpf = {}  # type: dict[str, np.ndarray]
-
-    def get_full_interp_bones(self):
-        if self._bones_full_interp:
-            return self._bones_full_interp
-        # loop to do data interpolation for each bone
-        for name in self._bones_data.keys():
-            self._get_full_interp_bone(name)
-        return self._bones_full_interp
+        # timeline starts from the first keyframe of all bones instead of frame 0
+        self._start_frame_id = min([
+            b.frame_ids[0] for b in self._bones_data.values() if b.get_frame_num()
+        ] or [0])
+        self._start_frame_id = min(self._start_frame_id, max(self._full_frame_num - 1, 0))
+        # frame ids and default curves are shared by all bones of the timeline
+        self._full_frame_ids = np.arange(self._start_frame_id, self._full_frame_num)
+        self._full_frame_ids.flags.writeable = False
+
+    @_synchronized
+    def set_bone_data(self, bone_name, bone_data):
+        # type: (str, VmdBoneData) -> None
+        # replace keyframes of a bone, and drop data computed from the old ones
+        self._bones_data[bone_name] = bone_data
+        timeline = (self._start_frame_id, self._full_frame_num)
+        self._init_timeline()
+        if timeline != (self._start_frame_id, self._full_frame_num):
+            self.invalidate()
+        else:
+            self.invalidate([bone_name])
+
+    @_synchronized
+    def invalidate(self, bone_names=None):
+        # type: (list[str] | None) -> None
+        # drop cached data of the bones and their descendants (all if None)
+        if bone_names is None:
+            self._cache.clear()
+            self._cache_bytes = 0
+            return
+        invalid_names = set(bone_names)
+        for bone_name in self._bones_tree:
+            ancestor_name = bone_name
+            while ancestor_name in self._bones_tree and ancestor_name not in invalid_names:
+                ancestor_name = self._bones_tree[ancestor_name]["parent"]
+            if ancestor_name in invalid_names:
+                invalid_names.add(bone_name)
+        for key in [key for key in self._cache if key[1] in invalid_names]:
+            self._cache_bytes -= self._cache.pop(key)[1]
+
+    @_synchronized
+    def get_cache_stats(self):
+        # type: () -> dict[str, int]
+        stats = dict(self._cache_stats)
+        stats["size"] = len(self._cache)
+        stats["bytes"] = self._cache_bytes
+        return stats
+
+    def _get_cache(self, key):
+        # type: (tuple) -> VmdBoneData | None
+        cached = self._cache.get(key)
+        if cached is None:
+            self._cache_stats["misses"] += 1
+            return None
+        self._cache.move_to_end(key)
+        self._cache_stats["hits"] += 1
+        return cached[0]
+
+    def _put_cache(self, key, bone_full, shared=None):
+        # type: (tuple, VmdBoneData, np.ndarray | None) -> VmdBoneData
+        # only arrays owning memory for each frame are counted,
+        # except shared one already counted by another entry
+        nbytes = sum([
+            x.nbytes for x in [bone_full.positions, bone_full.orientations]
+                if x.strides[0] and x is not shared
+        ])
+        self._cache[key] = (bone_full, nbytes)
+        self._cache_bytes += nbytes
+        if self._cache_max_bytes is not None:
+            # at least the latest one remains, even if it exceeds the budget
+            while self._cache_bytes > self._cache_max_bytes and len(self._cache) > 1:
+                _, (_, evicted_nbytes) = self._cache.popitem(last=False)
+                self._cache_bytes -= evicted_nbytes
+                self._cache_stats["evictions"] += 1
+        return bone_full
 
+    def _get_bone_names(self, bone_names=None):
+        # type: (list[str] | None) -> list[str]
+        if bone_names is None:
+            return list(self._bones_data.keys())
+        unknown_names = [name for name in bone_names if name not in self._bones_data]
+        if unknown_names:
+            raise KeyError("unknown bones: %s" % ", ".join(unknown_names))
+        return list(bone_names)
+
+    @_synchronized
+    def get_full_interp_bones(self, bone_names=None):
+        # type: (list[str] | None) -> dict[str, VmdBoneData]
+        # loop to do data interpolation for each bone (or given bones)
+        return {name: self._get_full_interp_bone(name) for name in self._get_bone_names(bone_names)}
+
+    @_synchronized
     def _get_full_interp_bone(self, bone_name):
         # type: (str) -> VmdBoneData
-        if bone_name in self._bones_full_interp:
-            return self._bones_full_interp[bone_name]
+        key = (self._STAGE_INTERP, bone_name, ())
+        bone_full_interp = self._get_cache(key)
+        if bone_full_interp is not None:
+            return bone_full_interp
         bone_data = self._bones_data[bone_name]
-        bone_full_interp = VmdBoneData(bone_name, self._full_frame_num)
-        bone_full_interp.frame_ids = np.arange(self._full_frame_num)
+        # constant bone just broadcasts a value, without memory for each frame
+        if self._check_is_constant_keyframes(bone_data):
+            if bone_data.get_frame_num():
+                position = bone_data.positions[0, :]
+                orientation = bone_data.orientations[0, :]
+            else:
+                # remain default value if 0 frame
+                position = np.zeros(3)
+                orientation = VmdBoneData._QUATERNION_DEFAULT
+            return self._put_cache(key, self._gen_constant_full_bone(
+                bone_name, position, orientation,
+            ))
+        full_frame_num = len(self._full_frame_ids)
+        bone_full_interp = self._gen_full_bone(
+            bone_name, np.zeros([full_frame_num, 3], dtype=self._dtype),
+            VmdBoneData._gen_default_quaternion(full_frame_num).astype(self._dtype, copy=False),
+        )
         # loop to do data interpolation for each interval
         for i in range(bone_data.get_frame_num()-1):
             frame_id_endpoint = bone_data.frame_ids[i:i+2]
@@ -74,116 +227,460 @@ class BonesPoseCalculator(object):
                 bone_data.curve_rot[i+1,:],
                 frame_ids_desired,
             )
-            # record interval data
-            bone_full_interp.positions[fid0:fid1, :] = position_interp
-            bone_full_interp.orientations[fid0:fid1, :] = orientation_interp
+            # record interval data (index is shifted by the start of timeline)
+            idx0, idx1 = fid0 - self._start_frame_id, fid1 - self._start_frame_id
+            bone_full_interp.positions[idx0:idx1, :] = position_interp
+            bone_full_interp.orientations[idx0:idx1, :] = orientation_interp
         # append the last frame
-        if bone_data.get_frame_num() > 1:
-            bone_full_interp.positions[-1, :] = bone_data.positions[-1, :]
-            bone_full_interp.orientations[-1, :] = bone_data.orientations[-1, :]
-        # padding constant data for single frame
-        elif bone_data.get_frame_num() == 1:
-            bone_full_interp.positions[:] = bone_data.positions[0, :]
-            bone_full_interp.orientations[:] = bone_data.orientations[0, :]
-        # remain default value if 0 frame
-        else:
-            pass
+        bone_full_interp.positions[-1, :] = bone_data.positions[-1, :]
+        bone_full_interp.orientations[-1, :] = bone_data.orientations[-1, :]
         # record interpolated bone data
-        self._bones_full_interp[bone_name] = bone_full_interp
-        return self._bones_full_interp[bone_name]
+        return self._put_cache(key, bone_full_interp)
 
-    def get_full_pose_bones(self):
-        if self._bones_full_pose:
-            return self._bones_full_pose
-        # loop to do data interpolation for each bone
-        for name in self._bones_data.keys():
-            self._get_full_pose_bone(name)
-        return self._bones_full_pose
+    @_synchronized
+    def get_full_pose_bones(self, bone_names=None):
+        # type: (list[str] | None) -> dict[str, VmdBoneData]
+        # loop to do successive transformation for each bone (or given bones),
+        # which evaluates their ancestors only
+        return {name: self._get_full_pose_bone(name) for name in self._get_bone_names(bone_names)}
 
+    @_synchronized
     def _get_full_pose_bone(self, bone_name):
         # type: (str) -> VmdBoneData
-        # get parent bone
-        if bone_name in self._bones_full_pose:
-            return self._bones_full_pose[bone_name]
-        # get parent bone
+        # if no parent, just return itself
+        # (without another cache entry, which would count the same arrays twice)
         parent_name = self._bones_tree[bone_name]["parent"]
-        if parent_name is not None:
-            parent_full_pose = self._get_full_pose_bone(parent_name)
-        else:
-            # if no parent, just return itself
-            self._bones_full_pose[bone_name] = self._get_full_interp_bone(bone_name)
-            return self._bones_full_pose[bone_name]
+        if parent_name is None:
+            return self._get_full_interp_bone(bone_name)
+        key = (self._STAGE_POSE, bone_name, ())
+        bone_full_pose = self._get_cache(key)
+        if bone_full_pose is not None:
+            return bone_full_pose
+        # get parent bone
+        parent_full_pose = self._get_full_pose_bone(parent_name)
         # get relative translation
         trans_from_parent = self._bones_tree[bone_name]["trans_from_parent"]
         # get its bone data
         bone_full_interp = self._get_full_interp_bone(bone_name)
-        # successsive transformation
-        full_frame_num = bone_full_interp.get_frame_num()
-        bone_full_pose = VmdBoneData(bone_name, full_frame_num)
-        bone_full_pose.frame_ids = bone_full_interp.frame_ids
+        # successsive transformation only once if both are constant
+        is_constant = self._check_is_constant_full_bone(parent_full_pose) \
+            and self._check_is_constant_full_bone(bone_full_interp)
+        frame_slice = slice(0, 1) if is_constant else slice(None)
         full_orientations_T, full_positions_T = Transform.transform_pose(
-            parent_full_pose.orientations.T,
-            parent_full_pose.positions.T,
-            bone_full_interp.orientations.T,
-            (bone_full_interp.positions + trans_from_parent).T,
+            parent_full_pose.orientations[frame_slice].T,
+            parent_full_pose.positions[frame_slice].T,
+            bone_full_interp.orientations[frame_slice].T,
+            (bone_full_interp.positions[frame_slice] + trans_from_parent).T,
         )
-        bone_full_pose.orientations = full_orientations_T.T
-        bone_full_pose.positions = full_positions_T.T
+        if is_constant:
+            bone_full_pose = self._gen_constant_full_bone(
+                bone_name, full_positions_T[:, 0], full_orientations_T[:, 0],
+            )
+        else:
+            bone_full_pose = self._gen_full_bone(
+                bone_name, full_positions_T.T.astype(self._dtype, copy=False),
+                full_orientations_T.T.astype(self._dtype, copy=False),
+            )
         # record
-        self._bones_full_pose[bone_name] = bone_full_pose
-        return self._bones_full_pose[bone_name]
-
-    def get_lpf_full_positions_bones(self, time_delay):
-        # type: (float) -> dict[str, np.ndarray]
-        if self._bones_full_position_lpf:
-            return self._bones_full_position_lpf
-        # loop to apply low-pass filter to position for each bone
-        for bone_name in self.get_full_pose_bones().keys():
-            self._get_lpf_full_positions_bone(bone_name, time_delay)
-        return self._bones_full_position_lpf
+        return self._put_cache(key, bone_full_pose)
+
+    def _gen_full_bone(self, bone_name, positions, orientations):
+        # type: (str, np.ndarray, np.ndarray) -> VmdBoneData
+        full_frame_num = len(self._full_frame_ids)
+        default_curve = np.broadcast_to(VmdBoneData._CURVE_DEFAULT, (full_frame_num, 4))
+        bone_full = VmdBoneData(bone_name)
+        bone_full.frame_ids = self._full_frame_ids
+        bone_full.positions = positions
+        bone_full.orientations = orientations
+        bone_full.curve_x = default_curve
+        bone_full.curve_y = default_curve
+        bone_full.curve_z = default_curve
+        bone_full.curve_rot = default_curve
+        return bone_full
+
+    def _gen_constant_full_bone(self, bone_name, position, orientation):
+        # type: (str, np.ndarray, np.ndarray) -> VmdBoneData
+        # read-only views with zero stride along frames
+        full_frame_num = len(self._full_frame_ids)
+        return self._gen_full_bone(
+            bone_name,
+            np.broadcast_to(np.array(position, dtype="float"), (full_frame_num, 3)),
+            np.broadcast_to(np.array(orientation, dtype="float"), (full_frame_num, 4)),
+        )
+
+    def _check_is_constant_keyframes(self, bone_data):
+        # type: (VmdBoneData) -> bool
+        if bone_data.get_frame_num() <= 1:
+            return True
+        # frames before the first keyframe and after the last keyframe remain
+        # default value (except the last frame of timeline, which is the last
+        # keyframe), so the bone is constant only if its keyframes cover the timeline
+        if bone_data.frame_ids[0] > self._start_frame_id \
+                or bone_data.frame_ids[-1] < self._full_frame_num - 1:
+            return False
+        return bool(
+            np.all(bone_data.positions == bone_data.positions[0])
+            and np.all(bone_data.orientations == bone_data.orientations[0])
+        )
+
+    @staticmethod
+    def _check_is_constant_full_bone(bone_full):
+        # type: (VmdBoneData) -> bool
+        return bone_full.positions.strides[0] == 0 and bone_full.orientations.strides[0] == 0
+
+    def get_interp_bone_at(self, bone_name, times, easing_table_size=None):
+        # type: (str, np.ndarray, int | None) -> VmdBoneData
+        # evaluate bone data at arbitrary (sub-frame) times without full timeline
+        # (mmd curves are approximated by table if easing_table_size is given)
+        times = np.asarray(times, dtype="float")
+        bone_data = self._bones_data[bone_name]
+        bone_interp = VmdBoneData(bone_name, len(times))
+        bone_interp.frame_ids = times
+        # remain default value if 0 frame
+        if bone_data.get_frame_num() == 0:
+            return bone_interp
+        bone_interp.positions = np.column_stack([
+            MMDCurveInterp.interp_keyframes(
+                bone_data.frame_ids, bone_data.positions[:,i], curve, times,
+                easing_table_size,
+            ) for i, curve in enumerate(
+                [bone_data.curve_x, bone_data.curve_y, bone_data.curve_z]
+            )
+        ])
+        bone_interp.orientations = MMDCurveInterp.interp_keyframes_quaternion(
+            bone_data.frame_ids, bone_data.orientations, bone_data.curve_rot, times,
+            easing_table_size,
+        )
+        return bone_interp
+
+    def _get_timeline_interp_bone_at(self, bone_name, frame_ids):
+        # type: (str, np.ndarray) -> VmdBoneData
+        # the same as full timeline at given frames of it, where frames out of
+        # keyframes remain default value, and the last frame of timeline is
+        # the last keyframe
+        bone_data = self._bones_data[bone_name]
+        bone_interp = self.get_interp_bone_at(bone_name, frame_ids)
+        if self._check_is_constant_keyframes(bone_data):
+            return bone_interp
+        mask_default = (frame_ids < bone_data.frame_ids[0]) \
+            | (frame_ids >= bone_data.frame_ids[-1])
+        bone_interp.positions[mask_default] = 0.0
+        bone_interp.orientations[mask_default] = VmdBoneData._QUATERNION_DEFAULT
+        mask_last = frame_ids == self._full_frame_ids[-1]
+        bone_interp.positions[mask_last] = bone_data.positions[-1]
+        bone_interp.orientations[mask_last] = bone_data.orientations[-1]
+        return bone_interp
+
+    def get_pose_bone_at(self, bone_name, times, easing_table_size=None):
+        # type: (str, np.ndarray, int | None) -> VmdBoneData
+        bone_interp = self.get_interp_bone_at(bone_name, times, easing_table_size)
+        # get parent bone
+        parent_name = self._bones_tree[bone_name]["parent"]
+        if parent_name is None:
+            return bone_interp
+        parent_pose = self.get_pose_bone_at(parent_name, times, easing_table_size)
+        return self._transform_child_bone(bone_name, parent_pose, bone_interp)
+
+    def _get_timeline_pose_bones_at(self, bone_names, frame_ids):
+        # type: (list[str], np.ndarray) -> dict[str, VmdBoneData]
+        # poses of the bones (and their ancestors, evaluated once) at given frames
+        # of full timeline, without cache
+        poses = {}  # type: dict[str, VmdBoneData]
+        for bone_name in bone_names:
+            # unevaluated ancestors from the bone to the root (or an evaluated one)
+            chain_names = []
+            ancestor_name = bone_name
+            while ancestor_name is not None and ancestor_name not in poses:
+                chain_names.append(ancestor_name)
+                ancestor_name = self._bones_tree[ancestor_name]["parent"]
+            for chain_name in reversed(chain_names):
+                bone_interp = self._get_timeline_interp_bone_at(chain_name, frame_ids)
+                parent_name = self._bones_tree[chain_name]["parent"]
+                poses[chain_name] = bone_interp if parent_name is None else \
+                    self._transform_child_bone(chain_name, poses[parent_name], bone_interp)
+        return {bone_name: poses[bone_name] for bone_name in bone_names}
 
+    def _transform_child_bone(self, bone_name, parent_pose, bone_interp):
+        # type: (str, VmdBoneData, VmdBoneData) -> VmdBoneData
+        # successsive transformation
+        trans_from_parent = self._bones_tree[bone_name]["trans_from_parent"]
+        bone_pose = VmdBoneData(bone_name, len(bone_interp.frame_ids))
+        bone_pose.frame_ids = bone_interp.frame_ids
+        orientations_T, positions_T = Transform.transform_pose(
+            parent_pose.orientations.T,
+            parent_pose.positions.T,
+            bone_interp.orientations.T,
+            (bone_interp.positions + trans_from_parent).T,
+        )
+        bone_pose.orientations = orientations_T.T
+        bone_pose.positions = positions_T.T
+        return bone_pose
+
+    def get_coarse_pose_bones(self, frame_stride, easing_table_size=None, bone_names=None):
+        # type: (int, int | None, list[str] | None) -> dict[str, VmdBoneData]
+        # poses on every frame_stride frames of the full timeline (and its last frame)
+        # for preview, which are not cached
+        frame_ids = self._full_frame_ids[::max(frame_stride, 1)]
+        if len(self._full_frame_ids) and frame_ids[-1] != self._full_frame_ids[-1]:
+            frame_ids = np.append(frame_ids, self._full_frame_ids[-1])
+        bones_coarse = {}  # type: dict[str, VmdBoneData]
+        for bone_name in self._get_bone_names(bone_names):
+            bone_coarse = self.get_pose_bone_at(bone_name, frame_ids, easing_table_size)
+            bone_coarse.frame_ids = frame_ids
+            bones_coarse[bone_name] = bone_coarse
+        return bones_coarse
+
+    def get_position_error_bounds(self, easing_table_size, bone_names=None):
+        # type: (int, list[str] | None) -> dict[str, float]
+        # bound of the position error of each pose (or given poses) caused by
+        # approximating mmd curves by table, where the error of easing ratio is
+        # scaled by the change in each interval of keyframes, and the error of
+        # orientations of ancestors moves the bone by its distance from them
+        bounds = {}  # type: dict[str, tuple[float, float]]
+        for bone_name in self._get_bone_names(bone_names):
+            # unevaluated ancestors from the bone to the root (or an evaluated one)
+            chain_names = []
+            ancestor_name = bone_name
+            while ancestor_name is not None and ancestor_name not in bounds:
+                chain_names.append(ancestor_name)
+                ancestor_name = self._bones_tree[ancestor_name]["parent"]
+            for chain_name in reversed(chain_names):
+                position_error, angle_error, lever = self._get_local_error_bounds(
+                    self._bones_data[chain_name], easing_table_size,
+                )
+                parent_name = self._bones_tree[chain_name]["parent"]
+                if parent_name is not None:
+                    parent_position_error, parent_angle_error = bounds[parent_name]
+                    lever += np.linalg.norm(self._bones_tree[chain_name]["trans_from_parent"])
+                    position_error += parent_position_error + parent_angle_error * lever
+                    angle_error += parent_angle_error
+                bounds[chain_name] = (position_error, angle_error)
+        return {bone_name: bounds[bone_name][0] for bone_name in self._get_bone_names(bone_names)}
+
+    @staticmethod
+    def _get_local_error_bounds(bone_data, easing_table_size):
+        # type: (VmdBoneData, int) -> tuple[float, float, float]
+        # bounds of the errors of position and rotation angle of a bone relative to
+        # its parent, and the bound of its position (eased position lies in the box
+        # of the keyframes of its interval)
+        if bone_data.get_frame_num() == 0:
+            return 0.0, 0.0, 0.0
+        positions = np.asarray(bone_data.positions, dtype="float")
+        lever = float(np.linalg.norm(np.abs(positions).max(axis=0)))
+        if bone_data.get_frame_num() == 1:
+            return 0.0, 0.0, lever
+        position_diff = np.abs(np.diff(positions, axis=0))
+        position_error = float(np.linalg.norm([
+            (position_diff[:, i] * MMDCurveInterp.get_easing_error_bound(
+                np.asarray(curves)[1:], easing_table_size,
+            )).max() for i, curves in enumerate(
+                [bone_data.curve_x, bone_data.curve_y, bone_data.curve_z]
+            )
+        ]))
+        # rotation angle of each interval
+        orientations = np.asarray(bone_data.orientations, dtype="float")
+        angles = 2 * np.arccos(np.clip((orientations[1:] * orientations[:-1]).sum(axis=1), -1., 1.))
+        angle_error = float((angles * MMDCurveInterp.get_easing_error_bound(
+            np.asarray(bone_data.curve_rot)[1:], easing_table_size,
+        )).max())
+        return position_error, angle_error, lever
+
+    @_synchronized
+    def get_lpf_full_positions_bones(self, time_delay, bone_names=None):
+        # type: (float, list[str] | None) -> dict[str, VmdBoneData]
+        # loop to apply low-pass filter to position for each bone (or given bones)
+        return {
+            name: self._get_lpf_full_positions_bone(name, time_delay)
+                for name in self._get_bone_names(bone_names)
+        }
+
+    @_synchronized
     def _get_lpf_full_positions_bone(self, bone_name, time_delay):
-        # type: (str, float) -> np.ndarray
-        if bone_name in self._bones_full_position_lpf:
-            return self._bones_full_position_lpf[bone_name]
+        # type: (str, float) -> VmdBoneData
+        key = (self._STAGE_LPF, bone_name, (float(time_delay),))
+        bone_lpf = self._get_cache(key)
+        if bone_lpf is not None:
+            return bone_lpf
         bone_full_pose = self._get_full_pose_bone(bone_name)
-        bone_lpf = VmdBoneData(bone_name, bone_full_pose.get_frame_num())
-        bone_lpf.frame_ids = bone_full_pose.frame_ids
-        bone_lpf.positions = self._apply_lpf(bone_full_pose.positions, time_delay)
-        self._bones_full_position_lpf[bone_name] = bone_lpf
-        return self._bones_full_position_lpf[bone_name]
+        # low-pass filter doesn't change constant
+        if self._check_is_constant_full_bone(bone_full_pose):
+            positions_lpf = bone_full_pose.positions
+        else:
+            if self._thread_num > 1 and self._lpf_executor is None:
+                self._lpf_executor = concurrent.futures.ThreadPoolExecutor(self._thread_num)
+            positions_lpf = self.apply_lpf(
+                bone_full_pose.positions, time_delay,
+                thread_num=self._thread_num, executor=self._lpf_executor,
+            ).astype(self._dtype, copy=False)
+        bone_lpf = self._gen_full_bone(
+            bone_name, positions_lpf,
+            np.broadcast_to(VmdBoneData._QUATERNION_DEFAULT, (len(self._full_frame_ids), 4)),
+        )
+        # positions are not copied by zero time delay
+        return self._put_cache(key, bone_lpf, shared=bone_full_pose.positions)
+
+    def iter_lpf_positions_chunks(self, time_delay, bone_names=None, chunk_frame_num=4096):
+        # type: (float, list[str] | None, int) -> collections.abc.Iterator[dict[str, VmdBoneData]]
+        # the same as get_lpf_full_positions_bones chunk by chunk of full timeline,
+        # whose memory is bounded by chunk instead of full timeline (nothing is
+        # cached), and low-pass filter continues from the previous chunk
+        bone_names = self._get_bone_names(bone_names)
+        positions_prev = {}  # type: dict[str, np.ndarray]
+        for start in range(0, len(self._full_frame_ids), max(chunk_frame_num, 1)):
+            frame_ids = self._full_frame_ids[start:start+chunk_frame_num]
+            bones_pose = self._get_timeline_pose_bones_at(bone_names, frame_ids)
+            bones_lpf = {}  # type: dict[str, VmdBoneData]
+            for bone_name in bone_names:
+                positions = self.apply_lpf(
+                    bones_pose[bone_name].positions, time_delay, positions_prev.get(bone_name),
+                ).astype(self._dtype, copy=False)
+                positions_prev[bone_name] = positions[-1]
+                bone_lpf = VmdBoneData(bone_name, len(frame_ids))
+                bone_lpf.frame_ids = frame_ids
+                bone_lpf.positions = positions
+                bones_lpf[bone_name] = bone_lpf
+            yield bones_lpf
+
+    def get_lpf_full_positions_bones_by_chunks(self, time_delay, bone_names=None, chunk_frame_num=4096):
+        # type: (float, list[str] | None, int) -> dict[str, VmdBoneData]
+        # the same output as get_lpf_full_positions_bones, which is gathered
+        # from chunks without cache of other stages
+        full_frame_num = len(self._full_frame_ids)
+        bone_names = self._get_bone_names(bone_names)
+        positions = {
+            bone_name: np.empty([full_frame_num, 3], dtype=self._dtype) for bone_name in bone_names
+        }  # type: dict[str, np.ndarray]
+        start = 0
+        for bones_lpf in self.iter_lpf_positions_chunks(time_delay, bone_names, chunk_frame_num):
+            chunk_num = 0
+            for bone_name, bone_lpf in bones_lpf.items():
+                chunk_num = bone_lpf.get_frame_num()
+                positions[bone_name][start:start+chunk_num] = bone_lpf.positions
+            start += chunk_num
+        return {
+            bone_name: self._gen_full_bone(
+                bone_name, positions[bone_name],
+                np.broadcast_to(VmdBoneData._QUATERNION_DEFAULT, (full_frame_num, 4)),
+            ) for bone_name in bone_names
+        }
 
     @staticmethod
-    def _apply_lpf(x, time_delay):
-        # type: (np.ndarray, float) -> np.ndarray
+    def apply_lpf(x, time_delay, y_prev=None, thread_num=1, executor=None):
+        # type: (np.ndarray, float, np.ndarray | None, int, concurrent.futures.Executor | None) -> np.ndarray
+        # output continues from y_prev (the last output before x),
+        # or starts from steady state of the first input if not given
+        # (zero y_prev gives the zero-state response, see apply_lpf_carry)
+        # segments of thread_num run on executor, or on threads of this call if not given
         if time_delay == 0:
             return x
         else:
-            def lpf_by_for_loop(x, lag_ratio, update_ratio):
-                # type: (np.ndarray, float, float) -> np.ndarray
+            def lpf_by_chunks(x, lag_ratio, update_ratio, y_prev):
+                # type: (np.ndarray, float, float, np.ndarray) -> np.ndarray
+                # output of a chunk of frames (x is frame-by-channel) is its
+                # response from zero state (product of lower triangular toeplitz
+                # matrix) plus the decay of the last output of the previous chunk
+                chunk_len = BonesPoseCalculator._LPF_CHUNK_LEN
+                lags = np.arange(chunk_len).reshape(-1, 1) - np.arange(chunk_len)
+                response = np.where(
+                    lags >= 0, update_ratio * lag_ratio ** np.maximum(lags, 0), 0.0,
+                )
+                decay = lag_ratio ** np.arange(1, chunk_len + 1).reshape(-1, 1)
                 y = np.empty_like(x)  # type: np.ndarray
-                y[0] = x[0]
-                for i in range(1, len(x)):
-                    # 1-st order low-pass filter with backward difference approach
-                    y[i] = lag_ratio * y[i-1] + update_ratio * x[i]
+                for start in range(0, len(x), chunk_len):
+                    x_chunk = x[start:start+chunk_len]
+                    chunk_num = len(x_chunk)
+                    y[start:start+chunk_num] = response[:chunk_num, :chunk_num] @ x_chunk \
+                        + decay[:chunk_num] * y_prev
+                    y_prev = y[start+chunk_num-1]
                 return y
 
-            def lpf_by_scipy_lfilter(x, lag_ratio, update_ratio):
-                # type: (np.ndarray, float, float) -> np.ndarray
-                # apply digital filter
-                b = np.array([update_ratio])
-                a = np.array([1.0, -lag_ratio])
-                zi = scipy.signal.lfilter_zi(b, a)    # https://docs.scipy.org/doc/scipy/reference/generated/scipy.signal.lfilter_zi.html
-                y, _ = scipy.signal.lfilter(b, a, x, axis=0, zi=zi*np.array([x[0]]))
+            def lpf_by_segments(x, lag_ratio, update_ratio, y_prev, lpf, executor):
+                # type: (np.ndarray, float, float, np.ndarray, callable, concurrent.futures.Executor) -> np.ndarray
+                # zero-state responses of segments are filtered in parallel,
+                # then the true last output before each segment is scanned
+                # sequentially (one step per segment), and its decay is added
+                # to the segment in parallel
+                segment_len = max(-(-len(x) // thread_num), BonesPoseCalculator._LPF_SEGMENT_MIN_LEN)
+                starts = list(range(0, len(x), segment_len))
+                y = np.empty_like(x)  # type: np.ndarray
+                y_zero = np.zeros_like(y_prev)
+
+                def filter_segment(start):
+                    y[start:start+segment_len] = lpf(
+                        x[start:start+segment_len], lag_ratio, update_ratio, y_zero,
+                    )
+
+                def carry_segment(start, y_prev):
+                    BonesPoseCalculator._add_lpf_decay(
+                        y[start:start+segment_len], lag_ratio, y_prev,
+                    )
+
+                y_prevs = []  # type: list[np.ndarray]
+                list(executor.map(filter_segment, starts))
+                for start in starts:
+                    y_prevs.append(y_prev)
+                    segment_num = len(x[start:start+segment_len])
+                    y_prev = y[start+segment_num-1] + lag_ratio**segment_num * y_prev
+                list(executor.map(carry_segment, starts, y_prevs))
                 return y
 
-            # low pass filter constant
-            dt = 1/30.0
-            time_constant = time_delay/2.5  # time delay is defined as the rise time
-                                            # for reaching about 90% of step input
-            pole_mag = 1.0/time_constant
-            lag_ratio = 1.0 / (1.0 + pole_mag*dt)
-            update_ratio = 1.0 - lag_ratio
-            # y = lpf_by_for_loop(x, lag_ratio, update_ratio)
-            y = lpf_by_scipy_lfilter(x, lag_ratio, update_ratio)
+            lag_ratio, update_ratio = BonesPoseCalculator._get_lpf_ratios(time_delay)
+            if len(x) == 0:
+                return np.array(x, dtype="float")
+            x_2d = np.asarray(x, dtype="float").reshape(len(x), -1)
+            if y_prev is None:
+                # start from steady state of the first input
+                y_prev = x_2d[0]
+            y_prev = np.asarray(y_prev, dtype="float").reshape(-1)
+            kernels = JitBackend.get_kernels()
+            # compiled for loop, or product of chunks
+            lpf = kernels.lpf if kernels is not None else lpf_by_chunks
+            if thread_num > 1 and len(x_2d) >= 2 * BonesPoseCalculator._LPF_SEGMENT_MIN_LEN:
+                if executor is not None:
+                    y = lpf_by_segments(x_2d, lag_ratio, update_ratio, y_prev, lpf, executor)
+                else:
+                    with concurrent.futures.ThreadPoolExecutor(thread_num) as executor:
+                        y = lpf_by_segments(x_2d, lag_ratio, update_ratio, y_prev, lpf, executor)
+            else:
+                y = lpf(x_2d, lag_ratio, update_ratio, y_prev)
+            return y.reshape(np.shape(x))
+
+    @classmethod
+    def apply_lpf_carry(cls, y_zero_state, time_delay, y_prev):
+        # type: (np.ndarray, float, np.ndarray) -> np.ndarray
+        # output of a segment continued from y_prev (the last output before it),
+        # given its zero-state response (apply_lpf with zero y_prev), so that
+        # segments of a timeline can be filtered separately (e.g. by other
+        # processes) and joined in order, where the last output of a segment
+        # is y_prev of the next one
+        y = np.array(y_zero_state, dtype="float")
+        if time_delay == 0 or len(y) == 0:
             return y
+        lag_ratio, _ = cls._get_lpf_ratios(time_delay)
+        y_2d = y.reshape(len(y), -1)
+        cls._add_lpf_decay(y_2d, lag_ratio, np.asarray(y_prev, dtype="float").reshape(-1))
+        return y
+
+    @staticmethod
+    def _add_lpf_decay(y, lag_ratio, y_prev):
+        # type: (np.ndarray, float, np.ndarray) -> None
+        # response of y_prev decays along frames (y is frame-by-channel),
+        # which is added only to the frames before it underflows
+        decay_len = len(y)
+        if 0.0 < lag_ratio < 1.0:
+            decay_len = min(decay_len, int(np.log(np.finfo("float").tiny) / np.log(lag_ratio)) + 1)
+        elif lag_ratio == 0.0:
+            decay_len = 0
+        y[:decay_len] += lag_ratio ** np.arange(1, decay_len + 1).reshape(-1, 1) * y_prev
+
+    @staticmethod
+    def _get_lpf_ratios(time_delay):
+        # type: (float) -> tuple[float, float]
+        # low pass filter constant
+        dt = 1/30.0
+        time_constant = time_delay/2.5  # time delay is defined as the rise time
+                                        # for reaching about 90% of step input
+        pole_mag = 1.0/time_constant
+        lag_ratio = 1.0 / (1.0 + pole_mag*dt)
+        update_ratio = 1.0 - lag_ratio
+        return lag_ratio, update_ratio
@@ -1,6 +1,10 @@
+import concurrent.futures
+import copy
+import functools
+
 import numpy as np
-import scipy.interpolate
 
+from .jit_backend import JitBackend
 from .mmd_curve_interp import MMDCurveInterp
 from .transform import Transform
 from .vmd_profile import (
@@ -9,19 +13,34 @@ from .vmd_profile import (
 )
 
 
+class CameraInterpResult(object):
+
+    # result of CameraSmoother.interp_result(), which can be given as previous
+    # result to the smoother of edited camera data, for incremental update
+
+    def __init__(self, camera_data, params, seg_keys, seg_frame_interp_loc, camera_data_unmasked):
+        # type: (VmdCameraData, tuple, dict[bytes, int], np.ndarray, VmdCameraData) -> None
+        self.camera_data = camera_data
+        self.params = params
+        # raw keyframes of each segment, and location of segment in the result before masking
+        self.seg_keys = seg_keys
+        self.seg_frame_interp_loc = seg_frame_interp_loc
+        self.camera_data_unmasked = camera_data_unmasked
+
+
 class CameraSmoother(object):
 
-    def __init__(self, camera_data, interp_frame_interval=2):
-        # type: (VmdCameraData, int) -> None
+    def __init__(self, camera_data, interp_frame_interval=2, thread_num=1, batch_size=64):
+        # type: (VmdCameraData, int, int, int) -> None
         self._camera_data = camera_data  # type: VmdCameraData
+        self._thread_num = thread_num
+        self._batch_size = batch_size
         self._interp_fram_ids = np.zeros(0, dtype="int")
         self._interp_frame_loc = np.zeros(0, dtype="int")
         self._seg_frame_loc = np.zeros(0, dtype="int")
         self._seg_frame_interp_loc = np.zeros(0, dtype="int")
         self._interp_frame_interval = interp_frame_interval
         self._determine_interp_frame_num()
-        self._camera_data_interp = VmdCameraData(len(self._interp_fram_ids))
-        self._camera_data_interp.frame_ids = self._interp_fram_ids
 
     def _determine_interp_frame_num(self):
         interp_frame_ids = []
@@ -55,66 +74,383 @@ class CameraSmoother(object):
 
     def interp(self, need_smooth, need_smooth_fov_angles=False):
         # type: (bool, bool) -> VmdCameraData
+        return self.interp_result(need_smooth, need_smooth_fov_angles).camera_data
+
+    def interp_result(self, need_smooth, need_smooth_fov_angles=False, previous=None):
+        # type: (bool, bool, CameraInterpResult | None) -> CameraInterpResult
+        # allocate output for each call, so that nothing is shared between calls
+        camera_data_interp = VmdCameraData(len(self._interp_fram_ids))
+        camera_data_interp.frame_ids = self._interp_fram_ids.copy()
+        # with the result of previous run, segments whose keyframes are not
+        # changed are copied from it, and only the others are computed
+        params = (need_smooth, need_smooth_fov_angles, self._interp_frame_interval)
+        seg_keys = self._get_seg_keys()
+        seg_ranges = self._splice_previous(camera_data_interp, params, seg_keys, previous)
+        tasks = []
+        for seg_start, seg_stop in seg_ranges:
+            tasks += self._gen_tasks(
+                camera_data_interp, need_smooth, need_smooth_fov_angles, seg_start, seg_stop,
+            )
+        self._run_tasks(tasks)
+        camera_data_unmasked = copy.copy(camera_data_interp)
+        # just check how much overshoot is in the interpolation
+        need_plot_curve_for_debug = False
+        if need_plot_curve_for_debug:
+            self._plot_for_debug(camera_data_interp)
+        # mask of fov
+        if need_smooth_fov_angles:
+            mask = np.ones(camera_data_interp.get_frame_num(), dtype="bool")
+        else:
+            mask = self._get_various_mask_for_default(
+                self._camera_data.fov_angles, camera_data_interp.fov_angles
+            )
+        # apply mask
+        camera_data_interp.apply_mask(mask)
+        # return
+        return CameraInterpResult(
+            camera_data_interp, params, seg_keys, self._seg_frame_interp_loc, camera_data_unmasked,
+        )
+
+    def _gen_tasks(self, camera_data_interp, need_smooth, need_smooth_fov_angles, seg_start, seg_stop):
+        # type: (VmdCameraData, bool, bool, int, int) -> list[functools.partial]
+        # tasks to interpolate the segments in seg_start ~ seg_stop-1, where
+        # functions of mmd curve work on the intervals of keyframes in the segments
+        interval_start = self._seg_frame_loc[seg_start]
+        interval_stop = min(self._seg_frame_loc[seg_stop], self._camera_data.get_frame_num()-1)
+
+        def split_interp_default(values, curves, values_interp):
+            return self._split_tasks(
+                self._interp_default, values, curves, values_interp,
+                interval_start, interval_stop,
+            )
+
+        def split_interp_smooth(values, curves, values_interp):
+            return self._split_tasks(
+                self._interp_smooth, values, curves, values_interp,
+                seg_start, seg_stop,
+            )
+
         # most
         if need_smooth:
-            fun_interp = self._interp_smooth
+            fun_split = split_interp_smooth
         else:
-            fun_interp = self._interp_default
-        fun_interp(
+            fun_split = split_interp_default
+        # each channel (and each batch of its segments) is independent,
+        # and writes to its own part of the output allocated by interp()
+        tasks = []
+        tasks += fun_split(
             self._camera_data.positions[:,0], self._camera_data.curve_x,
-            self._camera_data_interp.positions[:,0],
+            camera_data_interp.positions[:,0],
         )
-        fun_interp(
+        tasks += fun_split(
             self._camera_data.positions[:,1], self._camera_data.curve_y,
-            self._camera_data_interp.positions[:,1],
+            camera_data_interp.positions[:,1],
         )
-        fun_interp(
+        tasks += fun_split(
             self._camera_data.positions[:,2], self._camera_data.curve_z,
-            self._camera_data_interp.positions[:,2],
+            camera_data_interp.positions[:,2],
         )
-        fun_interp(
+        tasks += fun_split(
             self._camera_data.orientations, self._camera_data.curve_rot,
-            self._camera_data_interp.orientations,
+            camera_data_interp.orientations,
         )
-        fun_interp(
+        tasks += fun_split(
             self._camera_data.distances, self._camera_data.curve_dis,
-            self._camera_data_interp.distances,
+            camera_data_interp.distances,
         )
-        # just check how much overshoot is in the interpolation
-        need_plot_curve_for_debug = False
-        if need_plot_curve_for_debug:
-            self._plot_for_debug()
         # fov
         if need_smooth_fov_angles:
-            self._interp_smooth(
+            tasks += split_interp_smooth(
                 self._camera_data.fov_angles, self._camera_data.curve_fov,
-                self._camera_data_interp.fov_angles,
+                camera_data_interp.fov_angles,
             )
-            mask = np.ones(self._camera_data_interp.get_frame_num(), dtype="bool")
         else:
-            self._interp_default(
+            tasks += split_interp_default(
                 self._camera_data.fov_angles, self._camera_data.curve_fov,
-                self._camera_data_interp.fov_angles,
-            )
-            mask = self._get_various_mask_for_default(
-                self._camera_data.fov_angles, self._camera_data_interp.fov_angles
+                camera_data_interp.fov_angles,
             )
         # perspective
-        self._interp_constant(
+        tasks.append(functools.partial(
+            self._interp_constant,
             self._camera_data.perspective_flags,
-            self._camera_data_interp.perspective_flags,
+            camera_data_interp.perspective_flags,
+            interval_start, interval_stop,
+        ))
+        return tasks
+
+    def _get_seg_keys(self):
+        # type: () -> dict[bytes, int]
+        # raw keyframes of each segment, which determine its result completely
+        camera_data = self._camera_data
+        keyframes = np.column_stack([
+            camera_data.frame_ids, camera_data.distances,
+            camera_data.positions, camera_data.orientations,
+            camera_data.curve_x, camera_data.curve_y, camera_data.curve_z,
+            camera_data.curve_rot, camera_data.curve_dis, camera_data.curve_fov,
+            camera_data.fov_angles, camera_data.perspective_flags,
+        ]).astype("float")
+        seg_frame_loc = self._seg_frame_loc
+        return {
+            keyframes[seg_frame_loc[i]:seg_frame_loc[i+1]].tobytes(): i
+                for i in range(len(seg_frame_loc)-1)
+        }
+
+    def _splice_previous(self, camera_data_interp, params, seg_keys, previous):
+        # type: (VmdCameraData, tuple, dict[bytes, int], CameraInterpResult | None) -> list[tuple[int, int]]
+        # copy unchanged segments from the previous result,
+        # and return the ranges of segments which still need to be computed
+        seg_num = len(self._seg_frame_loc)-1
+        if previous is None or previous.params != params \
+                or self._camera_data.get_frame_num() <= 1:
+            return [(0, seg_num)]
+        prev_seg_keys = previous.seg_keys
+        prev_interp = previous.camera_data_unmasked
+        prev_seg_frame_interp_loc = previous.seg_frame_interp_loc
+        seg_frame_interp_loc = self._seg_frame_interp_loc
+        is_dirty = np.ones(seg_num, dtype="bool")
+        for seg_key, i in seg_keys.items():
+            j = prev_seg_keys.get(seg_key)
+            if j is None:
+                continue
+            is_dirty[i] = False
+            loc0, loc1 = seg_frame_interp_loc[i:i+2]
+            prev_loc0, prev_loc1 = prev_seg_frame_interp_loc[j:j+2]
+            for member_name in ["distances", "positions", "orientations",
+                                "fov_angles", "perspective_flags"]:
+                getattr(camera_data_interp, member_name)[loc0:loc1] = \
+                    getattr(prev_interp, member_name)[prev_loc0:prev_loc1]
+        # consecutive dirty segments are gathered into a range
+        dirty_edges = np.diff(np.concatenate([[0], is_dirty.astype("int"), [0]]))
+        return list(zip(np.where(dirty_edges == 1)[0], np.where(dirty_edges == -1)[0]))
+
+    def interp_at(self, times, need_smooth, need_smooth_fov_angles=False, easing_table_size=None):
+        # type: (np.ndarray, bool, bool, int | None) -> VmdCameraData
+        # evaluate camera data at arbitrary (sub-frame) times,
+        # which gives the same result as interp() on the interpolation frames
+        # (mmd curves are approximated by table if easing_table_size is given)
+        times = self._hold_camera_cut(np.asarray(times, dtype="float"))
+        camera_data_at = VmdCameraData(len(times))
+        camera_data_at.frame_ids = times
+        # remain default value if 0 frame
+        if self._camera_data.get_frame_num() == 0:
+            return camera_data_at
+        if need_smooth:
+            fun_interp_at = self._interp_smooth_at
+        else:
+            fun_interp_at = self._interp_default_at
+        for i, curves in enumerate(
+                [self._camera_data.curve_x, self._camera_data.curve_y, self._camera_data.curve_z]
+            ):
+            camera_data_at.positions[:,i] = fun_interp_at(
+                self._camera_data.positions[:,i], curves, times, easing_table_size,
+            )
+        camera_data_at.orientations = fun_interp_at(
+            self._camera_data.orientations, self._camera_data.curve_rot, times,
+            easing_table_size,
         )
-        # apply mask
-        self._camera_data_interp.apply_mask(mask)
-        # return
-        return self._camera_data_interp
+        camera_data_at.distances = fun_interp_at(
+            self._camera_data.distances, self._camera_data.curve_dis, times,
+            easing_table_size,
+        )
+        # fov
+        if need_smooth_fov_angles:
+            fun_interp_fov_at = self._interp_smooth_at
+        else:
+            fun_interp_fov_at = self._interp_default_at
+        camera_data_at.fov_angles = fun_interp_fov_at(
+            self._camera_data.fov_angles, self._camera_data.curve_fov, times,
+            easing_table_size,
+        )
+        # perspective
+        ind = np.searchsorted(self._camera_data.frame_ids, times, side="right") - 1
+        camera_data_at.perspective_flags = \
+            self._camera_data.perspective_flags[np.maximum(ind, 0)]
+        return camera_data_at
 
-    def _interp_default(self, values, curves, values_interp):
-        # type: (np.ndarray, np.ndarray, np.ndarray) -> None
-        if self._camera_data.get_frame_num() > 1:
+    def interp_progressive(
+            self, need_smooth, need_smooth_fov_angles=False,
+            frame_strides=(8, 1), easing_table_size=32,
+        ):
+        # type: (bool, bool, list[int], int) -> Iterator[tuple[VmdCameraData, dict[str, float]]]
+        # yield coarse results on the frames of interp() with the given strides,
+        # which get denser on each request, together with the bounds of their
+        # error to the exact result, where frames computed in coarser steps are
+        # reused in finer steps, so their error of easing table doesn't shrink
+        # until the last step (stride not longer than interpolation interval),
+        # which recomputes all frames by interp() for the exact result
+        interp_num = len(self._interp_fram_ids)
+        # location of each interpolation frame in its interval of keyframes,
+        # and keyframes are always included, so that camera cuts are kept
+        interval_loc = np.repeat(
+            self._interp_frame_loc, np.diff(np.append(self._interp_frame_loc, interp_num)),
+        )
+        local_ind = np.arange(interp_num) - interval_loc
+        # frames computed in coarser steps are reused in finer steps
+        camera_data_all = VmdCameraData(interp_num)
+        camera_data_all.frame_ids = self._interp_fram_ids.copy()
+        is_computed = np.zeros(interp_num, dtype="bool")
+        easing_errors = self._get_easing_errors(need_smooth, need_smooth_fov_angles, easing_table_size)
+        for frame_stride in frame_strides:
+            step = frame_stride // self._interp_frame_interval
+            if step <= 1:
+                # exact result (full recompute, since no frame computed so far is exact)
+                yield self.interp(need_smooth, need_smooth_fov_angles), {
+                    name: 0.0 for name in easing_errors
+                }
+                return
+            mask = local_ind % step == 0
+            mask_new = mask & ~is_computed
+            camera_data_new = self.interp_at(
+                self._interp_fram_ids[mask_new], need_smooth, need_smooth_fov_angles,
+                easing_table_size,
+            )
+            for member_name in ["distances", "positions", "orientations",
+                                "fov_angles", "perspective_flags"]:
+                getattr(camera_data_all, member_name)[mask_new] = \
+                    getattr(camera_data_new, member_name)
+            is_computed |= mask_new
+            camera_data_coarse = copy.copy(camera_data_all)
+            camera_data_coarse.apply_mask(mask)
+            yield camera_data_coarse, self._get_coarse_error_bounds(
+                camera_data_coarse, np.where(mask)[0], easing_errors,
+            )
+
+    def _get_easing_errors(self, need_smooth, need_smooth_fov_angles, easing_table_size):
+        # type: (bool, bool, int) -> dict[str, float]
+        # bound of error at the evaluated frames caused by easing table,
+        # for the intervals interpolated by mmd curve instead of smooth curve
+        camera_data = self._camera_data
+        interval_num = camera_data.get_frame_num()-1
+        if interval_num < 1:
+            return {name: 0.0 for name in ["positions", "orientations", "distances", "fov_angles"]}
+        seg_len = np.diff(self._seg_frame_loc)
+        seg_ind = np.searchsorted(self._seg_frame_loc, np.arange(interval_num), side="right") - 1
+        is_curve_smooth = seg_len[seg_ind] <= 2
+
+        def get_error(values, curves, need_smooth_values):
+            value_diff = np.abs(np.diff(values, axis=0)).reshape(interval_num, -1).max(axis=1)
+            errors = value_diff * MMDCurveInterp.get_easing_error_bound(curves[1:], easing_table_size)
+            if need_smooth_values:
+                errors = errors[is_curve_smooth]
+            return float(errors.max()) if len(errors) else 0.0
+
+        return {
+            "positions": max([
+                get_error(camera_data.positions[:,i], curves, need_smooth) for i, curves in
+                    enumerate([camera_data.curve_x, camera_data.curve_y, camera_data.curve_z])
+            ]),
+            "orientations": get_error(camera_data.orientations, camera_data.curve_rot, need_smooth),
+            "distances": get_error(camera_data.distances, camera_data.curve_dis, need_smooth),
+            "fov_angles": get_error(
+                camera_data.fov_angles.astype("float"), camera_data.curve_fov, need_smooth_fov_angles,
+            ),
+        }
+
+    @staticmethod
+    def _get_coarse_error_bounds(camera_data_coarse, coarse_loc, easing_errors):
+        # type: (VmdCameraData, np.ndarray, dict[str, float]) -> dict[str, float]
+        # the exact result is monotonic between 2 adjacent coarse frames (in the
+        # same interval of keyframes for both mmd curve and pchip), so the error of
+        # linear interpolation between them is bounded by their difference,
+        # in addition to the error of them, and it's only the latter if there is
+        # no skipped frame between them (e.g. camera cut)
+        has_skipped = np.diff(coarse_loc) > 1
+        error_bounds = {}  # type: dict[str, float]
+        for name, easing_error in easing_errors.items():
+            values = getattr(camera_data_coarse, name).astype("float")
+            value_diff = np.abs(np.diff(values, axis=0))[has_skipped]
+            error_bounds[name] = (value_diff.max() if value_diff.size else 0.0) + 3*easing_error
+        return error_bounds
+
+    def _hold_camera_cut(self, times):
+        # type: (np.ndarray) -> np.ndarray
+        # keep the camera cut (keyframes with 1 frame interval) as a jump
+        # instead of interpolating it in sub-frame times
+        frame_ids = self._camera_data.frame_ids
+        if len(frame_ids) < 2:
+            return times
+        ind = np.searchsorted(frame_ids, times, side="right") - 1
+        ind = np.clip(ind, 0, len(frame_ids)-2)
+        mask_cut = (frame_ids[ind+1] - frame_ids[ind] == 1) & (times < frame_ids[ind+1])
+        times_hold = times.copy()
+        times_hold[mask_cut] = frame_ids[ind[mask_cut]]
+        return times_hold
+
+    def _interp_default_at(self, values, curves, times, easing_table_size=None):
+        # type: (np.ndarray, np.ndarray, np.ndarray, int | None) -> np.ndarray
+        return MMDCurveInterp.interp_keyframes(
+            self._camera_data.frame_ids, values, curves, times, easing_table_size,
+        )
+
+    def _interp_smooth_at(self, values, curves, times, easing_table_size=None):
+        # type: (np.ndarray, np.ndarray, np.ndarray, int | None) -> np.ndarray
+        frame_ids = self._camera_data.frame_ids
+        seg_frame_loc = self._seg_frame_loc
+        # segments of 2 frames (or less) use mmd curve
+        values_at = MMDCurveInterp.interp_keyframes(
+            frame_ids, values, curves, times, easing_table_size,
+        )
+        # locate the segment of each time, and gather the times of each segment
+        ind = np.searchsorted(frame_ids, times, side="right") - 1
+        seg_ind = np.searchsorted(seg_frame_loc, np.maximum(ind, 0), side="right") - 1
+        order = np.argsort(seg_ind, kind="stable")
+        seg_ind_sorted = seg_ind[order]
+        seg_bounds = np.searchsorted(seg_ind_sorted, np.arange(len(seg_frame_loc)))
+        for i in np.unique(seg_ind):
+            loc0, loc1 = seg_frame_loc[i:i+2]
+            if loc1 - loc0 > 2:
+                ind_seg = order[seg_bounds[i]:seg_bounds[i+1]]
+                values_at[ind_seg] = SmoothInterp.interp(
+                    frame_ids = frame_ids[loc0:loc1],
+                    values = values[loc0:loc1],
+                    frame_ids_desired = np.clip(
+                        times[ind_seg], frame_ids[loc0], frame_ids[loc1-1],
+                    ),
+                )
+        return values_at
+
+    def _run_tasks(self, tasks):
+        # type: (list[functools.partial]) -> None
+        if self._thread_num > 1 and len(tasks) > 1:
+            with concurrent.futures.ThreadPoolExecutor(self._thread_num) as executor:
+                futures = [executor.submit(task) for task in tasks]
+                for future in futures:
+                    future.result()
+        else:
+            for task in tasks:
+                task()
+
+    def _split_tasks(self, fun, values, curves, values_interp, start, stop):
+        # type: (callable, np.ndarray, np.ndarray, np.ndarray, int, int) -> list[functools.partial]
+        # split the intervals (or segments) in start ~ stop-1 into batches
+        batch_size = stop - start if self._thread_num <= 1 else max(1, self._batch_size)
+        starts = list(range(start, max(stop, start+1), max(batch_size, 1)))
+        return [
+            functools.partial(
+                fun, values, curves, values_interp, batch_start, min(batch_start + batch_size, stop),
+            ) for batch_start in starts
+        ]
+
+    def _interp_default(self, values, curves, values_interp, start=0, stop=None):
+        # type: (np.ndarray, np.ndarray, np.ndarray, int, int | None) -> None
+        # do data interpolation for the intervals in start ~ stop-1
+        interval_num = self._camera_data.get_frame_num()-1
+        stop = interval_num if stop is None else min(stop, interval_num)
+        kernels = JitBackend.get_kernels()
+        if self._camera_data.get_frame_num() > 1 and kernels is not None:
+            # compiled loop over the intervals, which writes to the output
+            # through views of (frame, channel)
+            kernels.interp_intervals(
+                self._camera_data.frame_ids, values.reshape(len(values), -1), curves,
+                self._interp_fram_ids, self._interp_frame_loc, start, stop,
+                values_interp.reshape(len(values_interp), -1),
+            )
+            if stop == interval_num:
+                values_interp[-1] = values[-1]
+        elif self._camera_data.get_frame_num() > 1:
             frame_ids = self._camera_data.frame_ids
             interp_fram_ids = self._interp_fram_ids
-            for i in range(self._camera_data.get_frame_num()-1):
+            for i in range(start, stop):
                 loc0, loc1 = self._interp_frame_loc[i:i+2]
                 # start frame
                 values_interp[loc0] = values[i]
@@ -126,7 +462,8 @@ class CameraSmoother(object):
                     frame_ids_desired = interp_fram_ids[loc0+1 : loc1],
                 )
             # append the last frame
-            values_interp[-1] = values[-1]
+            if stop == interval_num:
+                values_interp[-1] = values[-1]
         # padding constant data for single frame
         elif self._camera_data.get_frame_num() == 1:
             values_interp[:] = values[0]
@@ -134,14 +471,17 @@ class CameraSmoother(object):
         else:
             pass
 
-    def _interp_smooth(self, values, curves, values_interp):
-        # type: (np.ndarray, np.ndarray, np.ndarray) -> None
+    def _interp_smooth(self, values, curves, values_interp, start=0, stop=None):
+        # type: (np.ndarray, np.ndarray, np.ndarray, int, int | None) -> None
+        # do data interpolation for the segments in start ~ stop-1
         if self._camera_data.get_frame_num() > 1:
             frame_ids = self._camera_data.frame_ids
             interp_fram_ids = self._interp_fram_ids
             seg_frame_loc = self._seg_frame_loc
             seg_frame_interp_loc = self._seg_frame_interp_loc
-            for i in range(len(seg_frame_loc)-1):
+            seg_num = len(seg_frame_loc)-1
+            stop = seg_num if stop is None else min(stop, seg_num)
+            for i in range(start, stop):
                 loc0, loc1 = seg_frame_loc[i:i+2]
                 interp_loc0, interp_loc1 = seg_frame_interp_loc[i:i+2]
                 if loc1 - loc0 > 2:
@@ -170,15 +510,19 @@ class CameraSmoother(object):
         else:
             pass
 
-    def _interp_constant(self, values, values_interp):
-        # type: (np.ndarray, np.ndarray) -> None
+    def _interp_constant(self, values, values_interp, start=0, stop=None):
+        # type: (np.ndarray, np.ndarray, int, int | None) -> None
+        # hold the value for the intervals in start ~ stop-1
+        interval_num = self._camera_data.get_frame_num()-1
+        stop = interval_num if stop is None else min(stop, interval_num)
         if self._camera_data.get_frame_num() > 1:
-            for i in range(self._camera_data.get_frame_num()-1):
+            for i in range(start, stop):
                 loc0, loc1 = self._interp_frame_loc[i:i+2]
                 # start frame
                 values_interp[loc0:loc1] = values[i]
             # append the last frame
-            values_interp[-1] = values[-1]
+            if stop == interval_num:
+                values_interp[-1] = values[-1]
         # padding constant data for single frame
         elif self._camera_data.get_frame_num() == 1:
             values_interp[:] = values[0]
@@ -186,11 +530,12 @@ class CameraSmoother(object):
         else:
             pass
 
-    def _plot_for_debug(self):
+    def _plot_for_debug(self, camera_data_interp):
+        # type: (VmdCameraData) -> None
         def plot(y, y_interp):
             import matplotlib.pyplot as plt
             x = self._camera_data.frame_ids
-            x_interp = self._camera_data_interp.frame_ids
+            x_interp = camera_data_interp.frame_ids
             plt.plot(x, y, ".")
             plt.plot(x_interp, y_interp)
             plt.grid()
@@ -198,7 +543,7 @@ class CameraSmoother(object):
 
         plot(
             self._camera_data.orientations[:,0],
-            self._camera_data_interp.orientations[:,0]
+            camera_data_interp.orientations[:,0]
         )
 
     def _get_various_mask_for_default(self, values, values_interp):
@@ -243,9 +588,9 @@ class CameraSmoother(object):
 
 class CameraTracer(object):
 
-    @staticmethod
-    def trace_bone(camera_interp_data, bone_full_interp_data):
-        # type: (VmdCameraData, VmdBoneData) -> np.ndarray
+    @classmethod
+    def trace_bone(cls, camera_interp_data, bone_full_interp_data, weights=None):
+        # type: (VmdCameraData, VmdBoneData | list[VmdBoneData], list[float] | None) -> np.ndarray
         # convert camera motion from camera local frame to global frame
         camera_local_motion = np.zeros_like(camera_interp_data.positions)
         camera_local_motion[:, 0:2] = camera_interp_data.positions[:, 0:2]
@@ -255,29 +600,72 @@ class CameraTracer(object):
             ),
             camera_local_motion.T
         ).T
-        # align bone data length with camera data length
-        bone_frame_num = bone_full_interp_data.get_frame_num()
-        if bone_frame_num > camera_interp_data.frame_ids[-1]:
-            bone_motion = bone_full_interp_data.positions[camera_interp_data.frame_ids]
+        # evaluate bone position at camera frames, where several bones (e.g. of
+        # members of group dance) are blended to their weighted centroid
+        if isinstance(bone_full_interp_data, (list, tuple)):
+            bone_motion = cls.blend_bones(
+                bone_full_interp_data, camera_interp_data.frame_ids, weights,
+            ).positions
         else:
-            bone_motion_padding = np.zeros([camera_interp_data.frame_ids[-1]+1, 3])
-            bone_motion_padding[:bone_frame_num] = bone_full_interp_data.positions
-            bone_motion_padding[bone_frame_num:] = bone_full_interp_data.positions[-1]
-            bone_motion = bone_motion_padding[camera_interp_data.frame_ids]
+            bone_motion = cls._get_bone_positions_at(
+                bone_full_interp_data, camera_interp_data.frame_ids,
+            )
         # camera total motion for tracing bone
         camera_total_motion = bone_motion + camera_motion
         return camera_total_motion
 
+    @classmethod
+    def blend_bones(cls, bones_data, frame_ids, weights=None):
+        # type: (list[VmdBoneData], np.ndarray, list[float] | None) -> VmdBoneData
+        # weighted centroid of the positions of bones at given frames
+        if not bones_data:
+            raise ValueError("no bone to blend")
+        if weights is None:
+            weights = np.ones(len(bones_data))
+        weights = np.asarray(weights, dtype="float")
+        if weights.shape != (len(bones_data),):
+            raise ValueError(
+                "%d weights are given for %d bones" % (weights.size, len(bones_data))
+            )
+        if np.any(weights < 0) or not weights.sum() > 0:
+            raise ValueError("weights have to be non-negative with positive sum")
+        # positions of all bones in shape of (bone, frame, xyz), which are blended at once
+        positions = np.stack([
+            cls._get_bone_positions_at(bone_data, frame_ids) for bone_data in bones_data
+        ])
+        bone_blend = VmdBoneData("centroid", len(frame_ids))
+        bone_blend.frame_ids = frame_ids
+        bone_blend.positions = np.tensordot(weights / weights.sum(), positions, axes=1)
+        return bone_blend
+
+    @staticmethod
+    def _get_bone_positions_at(bone_data, frame_ids):
+        # type: (VmdBoneData, np.ndarray) -> np.ndarray
+        # bone already evaluated at the frames needs no interpolation, otherwise
+        # it accepts not only fully interpolated data but also keyframes with
+        # redundant frames removed
+        if np.array_equal(bone_data.frame_ids, frame_ids):
+            return np.asarray(bone_data.positions, dtype="float")
+        return np.column_stack([
+            MMDCurveInterp.interp_keyframes(
+                bone_data.frame_ids, bone_data.positions[:,i], curve, frame_ids,
+            ) for i, curve in enumerate([
+                bone_data.curve_x,
+                bone_data.curve_y,
+                bone_data.curve_z,
+            ])
+        ])
+
     @classmethod
     def add_camera_shake(
             cls, camera_interp_data,
-            camera_shake_interval=1.0, camera_shake_amplitude=0.0,
+            camera_shake_interval=1.0, camera_shake_amplitude=0.0, seed=None,
         ):
-        # type: (VmdCameraData, float, float) -> np.ndarray
+        # type: (VmdCameraData, float, float, int | None) -> np.ndarray
         shake_local_motion = np.zeros_like(camera_interp_data.positions)
         shake_local_motion[:, 0:2] = cls._gen_2d_shake_motion(
             camera_interp_data.frame_ids, camera_shake_interval,
-            camera_shake_amplitude,
+            camera_shake_amplitude, np.random.default_rng(seed),
         )
         shake_motion = Transform.rotate_vector(
             Transform.convert_mmd_euler_angles_to_quaternion(
@@ -289,8 +677,8 @@ class CameraTracer(object):
         return camera_motion_with_shake
 
     @staticmethod
-    def _gen_2d_shake_motion(frame_ids, camera_shake_interval, camera_shake_amplitude):
-        # type: (np.ndarray, float, float) -> np.ndarray
+    def _gen_2d_shake_motion(frame_ids, camera_shake_interval, camera_shake_amplitude, rng):
+        # type: (np.ndarray, float, float, np.random.Generator) -> np.ndarray
         # calculate how many shake points are needed
         fps = 30.0
         frame_per_interval = camera_shake_interval * fps
@@ -301,7 +689,7 @@ class CameraTracer(object):
         mmd_length_unit_per_meter = 1.0 / 0.08
         camera_shake_amplitude_std = camera_shake_amplitude / 3.0
         shake_points = (camera_shake_amplitude_std * mmd_length_unit_per_meter) \
-            * np.random.randn(len(shake_frame_ids), 2)
+            * rng.standard_normal((len(shake_frame_ids), 2))
         # smooth
         shake_motion = SmoothInterp.interp(shake_frame_ids, shake_points, frame_ids)
         return shake_motion
@@ -313,6 +701,51 @@ class SmoothInterp(object):
     def interp(cls, frame_ids, values, frame_ids_desired):
         # type: (np.ndarray, np.ndarray, np.ndarray) -> np.ndarray
         # f = scipy.interpolate.interp1d(frame_ids, values, kind="cubic", axis=0)
-        f = scipy.interpolate.PchipInterpolator(frame_ids, values, axis=0)
-        values_desired = f(frame_ids_desired)
-        return values_desired
+        # f = scipy.interpolate.PchipInterpolator(frame_ids, values, axis=0)
+        # monotonic piecewise cubic hermite interpolation (pchip) the same as
+        # scipy.interpolate.PchipInterpolator, without importing scipy
+        x = np.asarray(frame_ids, dtype="float")
+        values = np.asarray(values, dtype="float")
+        if len(x) < 2:
+            raise ValueError("pchip needs at least 2 points")
+        y = values.reshape(len(x), -1)
+        # local power basis of each interval (ends are extrapolated)
+        h = (x[1:] - x[:-1]).reshape(-1, 1)
+        slopes = (y[1:] - y[:-1]) / h
+        dydx = cls._get_pchip_derivatives(h, slopes)
+        t = (dydx[:-1] + dydx[1:] - 2 * slopes) / h
+        c3 = t / h
+        c2 = (slopes - dydx[:-1]) / h - t
+        xi = np.asarray(frame_ids_desired, dtype="float")
+        loc = np.clip(np.searchsorted(x, xi, side="right") - 1, 0, len(x) - 2)
+        s = (xi - x[loc]).reshape(-1, 1)
+        values_desired = ((c3[loc] * s + c2[loc]) * s + dydx[loc]) * s + y[loc]
+        return values_desired.reshape(xi.shape + values.shape[1:])
+
+    @classmethod
+    def _get_pchip_derivatives(cls, h, slopes):
+        # type: (np.ndarray, np.ndarray) -> np.ndarray
+        # derivatives at points by weighted harmonic mean of slopes (fritsch-butland),
+        # which are zero at local extrema to keep monotonicity
+        if len(slopes) == 1:
+            return np.concatenate([slopes, slopes])
+        dydx = np.zeros((len(slopes) + 1, slopes.shape[1]))
+        signs = np.sign(slopes)
+        is_extremum = (signs[1:] != signs[:-1]) | (slopes[1:] == 0) | (slopes[:-1] == 0)
+        w1 = 2 * h[1:] + h[:-1]
+        w2 = h[1:] + 2 * h[:-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            whmean = (w1 / slopes[:-1] + w2 / slopes[1:]) / (w1 + w2)
+            dydx[1:-1] = np.where(is_extremum, 0.0, 1.0 / whmean)
+        dydx[0] = cls._get_pchip_edge_derivative(h[0], h[1], slopes[0], slopes[1])
+        dydx[-1] = cls._get_pchip_edge_derivative(h[-1], h[-2], slopes[-1], slopes[-2])
+        return dydx
+
+    @staticmethod
+    def _get_pchip_edge_derivative(h0, h1, m0, m1):
+        # type: (np.ndarray, np.ndarray, np.ndarray, np.ndarray) -> np.ndarray
+        # one-sided three-point estimate, which keeps the shape of end interval
+        d = ((2 * h0 + h1) * m0 - h0 * m1) / (h0 + h1)
+        is_opposite = np.sign(d) != np.sign(m0)
+        is_overshoot = (np.sign(m0) != np.sign(m1)) & (np.abs(d) > 3 * np.abs(m0))
+        return np.where(is_opposite, 0.0, np.where(is_overshoot, 3 * m0, d))
@@ -0,0 +1,48 @@
+import os
+import threading
+
+
+class JitBackend(object):
+
+    # optional compiled kernels (numba) for the sequential loops, the numpy
+    # paths are used instead if numba is not installed, or the backend is
+    # disabled (by set_enabled or environment variable MMD_VMD_INTERPOLATION_NO_JIT=1)
+    _ENV_NO_JIT = "MMD_VMD_INTERPOLATION_NO_JIT"
+    _is_enabled = os.environ.get(_ENV_NO_JIT, "") in ["", "0"]
+    _is_loaded = False
+    _kernels = None  # type: object | None
+    _lock = threading.Lock()
+
+    @classmethod
+    def set_enabled(cls, is_enabled):
+        # type: (bool) -> None
+        cls._is_enabled = is_enabled
+
+    @classmethod
+    def is_available(cls):
+        # type: () -> bool
+        return cls._load() is not None
+
+    @classmethod
+    def get_kernels(cls):
+        # type: () -> object | None
+        # module of kernels, or None for numpy paths
+        if not cls._is_enabled:
+            return None
+        return cls._load()
+
+    @classmethod
+    def _load(cls):
+        # type: () -> object | None
+        # numba is imported at the first use instead of startup since it is slow,
+        # and kernels are compiled at their first call (and cached on disk)
+        if not cls._is_loaded:
+            with cls._lock:
+                if not cls._is_loaded:
+                    try:
+                        from . import jit_kernels
+                        cls._kernels = jit_kernels
+                    except ImportError:
+                        cls._kernels = None
+                    cls._is_loaded = True
+        return cls._kernels
@@ -0,0 +1,121 @@
+import numba
+import numpy as np
+
+# kernels compiled by numba for the loops which don't vectorize well,
+# this module is imported only by JitBackend since importing numba is slow,
+# and each kernel does the same arithmetic as its numpy counterpart
+
+
+@numba.njit(cache=True, nogil=True)
+def lpf(x, lag_ratio, update_ratio, y_prev):
+    # type: (np.ndarray, float, float, np.ndarray) -> np.ndarray
+    # 1-st order low-pass filter of (frame, channel) along frames,
+    # which continues from the last output y_prev before x
+    y = np.empty_like(x)
+    for j in range(x.shape[1]):
+        y_last = y_prev[j]
+        for i in range(x.shape[0]):
+            y_last = lag_ratio * y_last + update_ratio * x[i, j]
+            y[i, j] = y_last
+    return y
+
+
+@numba.njit(cache=True, nogil=True)
+def _solve_cubic_equation_real_root_between_0_1(a, b, c, d):
+    # type: (float, float, float, float) -> float
+    ca = c/a
+    b3a = b/(3*a)
+    p = ca - 3*(b3a**2)
+    q = d/a + 2*(b3a**3) - ca*b3a
+    delta = q**2 + (4/27.0)*(p**3)  # discriminant of cubic equation
+    # single real root or triple real roots
+    if delta >= 0:
+        delta_sqrt = np.sqrt(delta)
+        return np.cbrt(0.5*(-q + delta_sqrt)) + np.cbrt(0.5*(-q - delta_sqrt)) - b3a
+    # 3 real roots (find the solution in interval 0~1)
+    th0 = np.arctan2(np.sqrt(-delta), -q)
+    sol = 0.0
+    for k in range(3):
+        sol = 2. * np.sqrt(-p/3.0) * np.cos((th0 + 2.*k*np.pi) / 3.0) - b3a
+        if 0.0 <= sol <= 1.0:
+            break
+    return sol
+
+
+@numba.njit(cache=True, nogil=True)
+def _solve_curve_y_from_x(p1x, p1y, p2x, p2y, x):
+    # type: (float, float, float, float, float) -> float
+    # y on cubic bezier curve of given x, where control points are in 0 ~ 1
+    if not (0.0 < x < 1.0):
+        # prevent endpoints for boundary precision issue
+        return x
+    t = _solve_cubic_equation_real_root_between_0_1(
+        1 + 3*p1x - 3*p2x, 3*p2x - 6*p1x, 3*p1x, -x,
+    )
+    return (1 + 3*p1y - 3*p2y) * t**3 + (3*p2y - 6*p1y) * t**2 + 3*p1y * t
+
+
+@numba.njit(cache=True, nogil=True)
+def solve_curves_y_from_x(curve_params, x):
+    # type: (np.ndarray, np.ndarray) -> np.ndarray
+    # each x has its own mmd curve parameters (n-by-4)
+    y = np.empty(x.shape[0])
+    for i in range(x.shape[0]):
+        y[i] = _solve_curve_y_from_x(
+            curve_params[i, 0] / 127.0, curve_params[i, 1] / 127.0,
+            curve_params[i, 2] / 127.0, curve_params[i, 3] / 127.0, x[i],
+        )
+    return y
+
+
+@numba.njit(cache=True, nogil=True)
+def solve_curve_y_from_x(curve_param, x):
+    # type: (np.ndarray, np.ndarray) -> np.ndarray
+    # all x share the same mmd curve parameters
+    p1x, p1y = curve_param[0] / 127.0, curve_param[1] / 127.0
+    p2x, p2y = curve_param[2] / 127.0, curve_param[3] / 127.0
+    y = np.empty(x.shape[0])
+    for i in range(x.shape[0]):
+        y[i] = _solve_curve_y_from_x(p1x, p1y, p2x, p2y, x[i])
+    return y
+
+
+@numba.njit(cache=True, nogil=True)
+def interp_intervals(
+        frame_ids, values, curves, interp_frame_ids, interp_frame_loc,
+        start, stop, values_interp,
+    ):
+    # type: (np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, int, int, np.ndarray) -> None
+    # mmd curve interpolation of (frame, channel) for the intervals of keyframes
+    # in start ~ stop-1, where interval i covers the frames of
+    # interp_frame_loc[i] ~ interp_frame_loc[i+1]-1 of the output
+    for i in range(start, stop):
+        loc0 = interp_frame_loc[i]
+        loc1 = interp_frame_loc[i+1]
+        fid0 = frame_ids[i]
+        fid1 = frame_ids[i+1]
+        # start frame
+        values_interp[loc0, :] = values[i, :]
+        # needn't do interpolation for flat data
+        is_flat = True
+        for k in range(values.shape[1]):
+            if values[i+1, k] != values[i, k]:
+                is_flat = False
+        if is_flat:
+            for j in range(loc0+1, loc1):
+                values_interp[j, :] = values[i, :]
+            continue
+        p1x, p1y = curves[i+1, 0] / 127.0, curves[i+1, 1] / 127.0
+        p2x, p2y = curves[i+1, 2] / 127.0, curves[i+1, 3] / 127.0
+        for j in range(loc0+1, loc1):
+            frame_id = interp_frame_ids[j]
+            # prevent endpoints
+            if frame_id == fid0:
+                values_interp[j, :] = values[i, :]
+            elif frame_id == fid1:
+                values_interp[j, :] = values[i+1, :]
+            else:
+                x = (frame_id - fid0) / float(fid1 - fid0)
+                y = _solve_curve_y_from_x(p1x, p1y, p2x, p2y, x)
+                for k in range(values.shape[1]):
+                    values_interp[j, k] = values[i, k] + y*(values[i+1, k] - values[i, k])
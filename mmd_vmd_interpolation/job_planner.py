@@ -0,0 +1,161 @@
+from .vmd_profile import VmdSimpleProfile
+
+
+class JobPlanner(object):
+
+    # estimate peak memory and time of a job from vmd headers only (section
+    # frame numbers and frame id range), and decide how to run it in a budget
+
+    # memory modes of bones on full timeline, in order of preference at the same time
+    # (float32 halves memory with less precision, chunked evaluates chunks of frames
+    # without cache)
+    MODE_FULL = "full"
+    MODE_FLOAT32 = "float32"
+    MODE_CHUNKED = "chunked"
+    MODES = [MODE_FULL, MODE_FLOAT32, MODE_CHUNKED]
+    MODE_AUTO = "auto"
+    CHUNK_FRAME_NUM = 4096
+
+    # decisions of admission
+    DECISION_RUN = "run"
+    DECISION_QUEUE = "queue"
+    DECISION_REFUSE = "refuse"
+
+    # costs measured by tools/benchmark_job_planner.py
+    _BASE_BYTES = 1 << 20
+    _BYTES_PER_RECORD = 150             # raw and decoded keyframe
+    _BYTES_PER_BONE_FRAME = {           # cached stages of an evaluated bone on timeline
+        MODE_FULL: 110,
+        MODE_FLOAT32: 55,
+        MODE_CHUNKED: 0,
+    }
+    _BYTES_PER_CHUNK_BONE_FRAME = 550   # temporaries of a chunk of an evaluated bone
+    _BYTES_PER_OUTPUT_FRAME = {         # low-pass filtered positions of an exported bone
+        MODE_FULL: 24,
+        MODE_FLOAT32: 12,
+        MODE_CHUNKED: 24,
+    }
+    _BYTES_PER_REDUCE_FRAME = 190       # keyframe reduction of an exported bone
+    _BYTES_PER_CAMERA_FRAME = 600       # interpolated camera frame with temporaries
+    _BYTES_PER_DANCER_FRAME = 150       # posed bone chain of a dancer at a frame
+    _SECONDS_PER_RECORD = 5e-7
+    _SECONDS_PER_INTERVAL = {           # interpolation of an interval of keyframes
+        MODE_FULL: 7e-4,
+        MODE_FLOAT32: 7e-4,
+        MODE_CHUNKED: 0.0,
+    }
+    _SECONDS_PER_BONE_FRAME = {
+        MODE_FULL: 1e-6,
+        MODE_FLOAT32: 1e-6,
+        MODE_CHUNKED: 3e-6,
+    }
+    _SECONDS_PER_CAMERA_FRAME = 2e-6
+    _SECONDS_PER_DANCER_FRAME = 4e-6
+
+    @classmethod
+    def read_summary(cls, src):
+        # type: (str | bytes | memoryview) -> dict
+        # frame numbers of sections and frame id range of bones or camera
+        vp = VmdSimpleProfile(src)
+        frame_nums = vp.read_frame_nums()
+        is_camera = vp.check_is_camera()
+        frame_id_range = vp.read_frame_id_range("camera" if is_camera else "bone")
+        return {
+            "is_camera": is_camera,
+            "frame_nums": frame_nums,
+            "frame_id_range": frame_id_range or (0, 0),
+        }
+
+    @classmethod
+    def estimate_nonrotatable_bones(
+            cls, summary, bone_num, output_bone_num, motion_time_delay=0.0, mode=MODE_FULL,
+        ):
+        # type: (dict, int, int, float, str) -> dict
+        # every evaluated bone (exported ones and their ancestors) is assumed
+        # to have keyframes over the whole timeline
+        record_num = summary["frame_nums"]["bone"]
+        frame_id_min, frame_id_max = summary["frame_id_range"]
+        frame_num = frame_id_max - frame_id_min
+        peak_bytes = cls._BASE_BYTES + record_num * cls._BYTES_PER_RECORD \
+            + bone_num * frame_num * cls._BYTES_PER_BONE_FRAME[mode]
+        if motion_time_delay > 0. or mode == cls.MODE_CHUNKED:
+            peak_bytes += output_bone_num * frame_num * cls._BYTES_PER_OUTPUT_FRAME[mode]
+        # temporaries of chunks are released before keyframe reduction
+        peak_bytes += max(
+            output_bone_num * frame_num * cls._BYTES_PER_REDUCE_FRAME,
+            bone_num * min(frame_num, cls.CHUNK_FRAME_NUM) * cls._BYTES_PER_CHUNK_BONE_FRAME
+                if mode == cls.MODE_CHUNKED else 0,
+        )
+        seconds = record_num * (cls._SECONDS_PER_RECORD + cls._SECONDS_PER_INTERVAL[mode]) \
+            + bone_num * frame_num * cls._SECONDS_PER_BONE_FRAME[mode]
+        return {
+            "mode": mode,
+            "frame_num": frame_num,
+            "record_num": record_num,
+            "peak_bytes": int(peak_bytes),
+            "seconds": seconds,
+        }
+
+    @classmethod
+    def estimate_bone_tracing_camera(
+            cls, summary, interp_frame_interval=2, bone_summaries=(), bone_num=1,
+            motion_time_delay=0.0,
+        ):
+        # type: (dict, int, list[dict], int, float) -> dict
+        # traced bone is loaded from each of bone_summaries (nonrotatable bone or dancers),
+        # and bone_num bones (the traced bone and its ancestors) are evaluated
+        record_num = summary["frame_nums"]["camera"]
+        frame_id_min, frame_id_max = summary["frame_id_range"]
+        # interpolated frames with the given interval (and every frame around cuts)
+        camera_frame_num = (frame_id_max - frame_id_min) // max(interp_frame_interval, 1) \
+            + record_num
+        peak_bytes = cls._BASE_BYTES + record_num * cls._BYTES_PER_RECORD \
+            + camera_frame_num * cls._BYTES_PER_CAMERA_FRAME
+        seconds = record_num * cls._SECONDS_PER_RECORD \
+            + camera_frame_num * cls._SECONDS_PER_CAMERA_FRAME
+        # traced bone on every frame for low-pass filter, or on camera frames
+        bone_frame_num = frame_id_max + 1 if motion_time_delay > 0. else camera_frame_num
+        for bone_summary in bone_summaries:
+            bone_record_num = bone_summary["frame_nums"]["bone"]
+            peak_bytes += bone_record_num * cls._BYTES_PER_RECORD \
+                + bone_num * bone_frame_num * cls._BYTES_PER_DANCER_FRAME
+            seconds += bone_record_num * cls._SECONDS_PER_RECORD \
+                + bone_num * bone_frame_num * cls._SECONDS_PER_DANCER_FRAME
+        return {
+            "mode": cls.MODE_FULL,
+            "frame_num": camera_frame_num,
+            "record_num": record_num,
+            "peak_bytes": int(peak_bytes),
+            "seconds": seconds,
+        }
+
+    @classmethod
+    def plan(cls, estimates, budget_bytes=None, in_use_bytes=0):
+        # type: (list[dict], int | None, int) -> dict
+        # the fastest estimate (the first one of the same time) which fits the budget,
+        # which is queued if it doesn't fit the memory not in use now,
+        # and the job is refused if no estimate fits the budget
+        fitted = [
+            estimate for estimate in estimates
+                if budget_bytes is None or estimate["peak_bytes"] <= budget_bytes
+        ]
+        if not fitted:
+            smallest = min(estimates, key=lambda estimate: estimate["peak_bytes"])
+            return dict(smallest, decision=cls.DECISION_REFUSE, reason=(
+                "estimated peak memory %.1f MB exceeds budget %.1f MB"
+                % (smallest["peak_bytes"] / 1e6, budget_bytes / 1e6)
+            ))
+        fastest = min(fitted, key=lambda estimate: estimate["seconds"])
+        plan = dict(fastest, decision=cls.DECISION_RUN, reason="")
+        if budget_bytes is not None and plan["peak_bytes"] + in_use_bytes > budget_bytes:
+            plan["decision"] = cls.DECISION_QUEUE
+            plan["reason"] = "%.1f MB of budget is in use" % (in_use_bytes / 1e6)
+        return plan
+
+    @classmethod
+    def describe(cls, plan):
+        # type: (dict) -> str
+        return "%s in %s mode, estimated peak memory %.1f MB and time %.1f sec%s" % (
+            plan["decision"], plan["mode"], plan["peak_bytes"] / 1e6, plan["seconds"],
+            " (%s)" % plan["reason"] if plan.get("reason") else "",
+        )
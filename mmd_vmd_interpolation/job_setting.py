@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from .bones_pose_calculator import BonesTree
+from .keyframe_validator import KeyframeValidator
+from .pmx_profile import PmxSimpleProfile
+from .vmd_profile import (
+    VmdBoneData,
+    VmdCameraData,
+)
+
+
+# settings shared by the jobs of tools
+
+
+# quality levels: full, coarse preview only,
+# and coarse preview which is then refined to full
+QUALITY_FULL = "full"
+QUALITY_PREVIEW = "preview"
+QUALITY_PROGRESSIVE = "progressive"
+QUALITIES = [QUALITY_FULL, QUALITY_PREVIEW, QUALITY_PROGRESSIVE]
+
+PREVIEW_EASING_TABLE_SIZE = 32
+PREVIEW_STRIDE = 8
+
+# bones of built-in body shape
+DESIRED_BONES_NAMES = [
+    "全ての親", "センター", "グルーブ", "腰",
+    "上半身", "上半身2", "首", "頭", "面",
+    "右肩P", "右肩", "右腕", "左肩P", "左肩", "左腕",
+]
+BONES_LIST = [
+    ["全ての親", None, np.array([0., 0., 0.])],
+    ["センター", "全ての親", np.array([0., 8., 0.])],
+    ["グルーブ", "センター", np.array([0., 8.2, 0.])],
+    ["腰", "グルーブ", np.array([0., 12., 0.255])],
+    ["上半身", "腰", np.array([0., 12.8, -0.5])],
+    ["上半身2", "上半身", np.array([0., 13.9, -0.46])],
+    ["首", "上半身2", np.array([0., 16.34, -0.11])],
+    ["頭", "首", np.array([0., 17.2, -0.12])],
+    ["面", "頭", np.array([0., 17.8, -1.0])],
+    ["右肩P", "上半身2", np.array([-0.235, 16.06, -0.15])],
+    ["右肩", "右肩P", np.array([-0.235, 16.06, -0.15])],
+    ["右腕", "右肩", np.array([-1.1, 15.8, -0.13])],
+    ["左肩P", "上半身2", np.array([0.235, 16.06, -0.15])],
+    ["左肩", "左肩P", np.array([0.235, 16.06, -0.15])],
+    ["左腕", "左肩", np.array([1.1, 15.8, -0.13])],
+]
+BONES_NAME_REMAP = {
+    "全ての親":"parent of all",
+    "センター":"center",
+    "グルーブ":"groove",
+    "腰":"waist",
+    "上半身":"upper body",
+    "上半身2":"upper body 2",
+    "首":"neck",
+    "頭":"head",
+    "面":"face",
+    "右肩": "right shoulder",
+    "右腕": "right arm",
+    "左肩": "left shoulder",
+    "左腕": "left arm",
+}
+
+
+def get_bones_setting(bones_names=None, src_model=None):
+    # type: (list[str] | None, str | None) -> tuple[list[str], list[tuple[str, str, np.ndarray]], dict[str, str]]
+    # bones to load, their positions, and names of exported nonrotatable bones
+    desired_bones_names = list(DESIRED_BONES_NAMES)
+    bones_list = BONES_LIST
+    bones_name_remap = dict(BONES_NAME_REMAP)
+
+    # selected bones, whose ancestors are also loaded for successive transformation
+    if bones_names:
+        desired_bones_names = get_motion_bones_names(bones_names)
+        bones_name_remap = {
+            name: BONES_NAME_REMAP.get(name, name) for name in desired_bones_names
+        }
+
+    # bone positions of actual model (or built-in body shape)
+    if src_model or bones_names:
+        bones_list = select_bones_list(desired_bones_names, src_model)
+        bones_names_in_model = {bone[0] for bone in bones_list}
+        desired_bones_names = [bone[0] for bone in bones_list]
+        bones_name_remap = {
+            old_name: new_name for old_name, new_name in bones_name_remap.items() \
+                if old_name in bones_names_in_model
+        }
+    return desired_bones_names, bones_list, bones_name_remap
+
+
+def get_motion_bones_names(bones_names):
+    # type: (list[str]) -> list[str]
+    # bones can be given in the name of either motion or nonrotatable bone
+    bones_name_unmap = {new_name: old_name for old_name, new_name in BONES_NAME_REMAP.items()}
+    return [bones_name_unmap.get(name, name) for name in bones_names]
+
+
+def select_bones_list(desired_bones_names, src_model=None):
+    # type: (list[str], str | None) -> list[tuple[str, str, np.ndarray]]
+    # desired bones and their ancestors in pmx model or built-in body shape
+    if src_model:
+        return load_model_bones_list(src_model, desired_bones_names)
+    bones_list = BonesTree.select(BONES_LIST, desired_bones_names)
+    bones_names_in_list = {bone[0] for bone in bones_list}
+    for bone_name in desired_bones_names:
+        if bone_name not in bones_names_in_list:
+            print("Warning: bone %s is not in built-in body shape" % bone_name)
+    return bones_list
+
+
+def load_model_bones_list(src_model, desired_bones_names):
+    # type: (str, list[str]) -> list[tuple[str, str, np.ndarray]]
+    # desired bones and their ancestors in pmx model
+    pp = PmxSimpleProfile(src_model)
+    print("loading bones from model: %s ..." % pp.read_model_name())
+    bones_list = BonesTree.select(pp.read_bones_list(), desired_bones_names)
+    bones_names_in_model = {bone[0] for bone in bones_list}
+    for bone_name in desired_bones_names:
+        if bone_name not in bones_names_in_model:
+            print("Warning: bone %s is not in model" % bone_name)
+    return bones_list
+
+
+def validate_camera_data(camera_data, validation_policy):
+    # type: (VmdCameraData, str) -> VmdCameraData
+    camera_data, issues = KeyframeValidator.validate_camera(camera_data, validation_policy)
+    if issues:
+        print("Warning: invalid keyframes of camera: %s" % KeyframeValidator.describe(issues))
+    return camera_data
+
+
+def validate_bones_data(bones_data, validation_policy):
+    # type: (dict[str, VmdBoneData], str) -> dict[str, VmdBoneData]
+    bones_data, bones_issues = KeyframeValidator.validate_bones(bones_data, validation_policy)
+    for bone_name, issues in bones_issues.items():
+        print("Warning: invalid keyframes of bone %s: %s" % (bone_name, KeyframeValidator.describe(issues)))
+    return bones_data
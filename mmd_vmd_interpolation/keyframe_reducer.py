@@ -0,0 +1,74 @@
+import numpy as np
+
+from .vmd_profile import (
+    VmdBoneData,
+    VmdDataBase,
+)
+
+
+class KeyframeReducer(object):
+
+    @classmethod
+    def reduce_bones(cls, bones_data):
+        # type: (dict[str, VmdBoneData]) -> dict[str, VmdBoneData]
+        return {
+            name: cls.reduce_bone(bone_data) for name, bone_data in bones_data.items()
+        }
+
+    @classmethod
+    def reduce_bone(cls, bone_data):
+        # type: (VmdBoneData) -> VmdBoneData
+        mask = ~cls.get_redundant_mask(bone_data)
+        bone_reduced = VmdBoneData(bone_data.name, int(mask.sum()))
+        bone_reduced.frame_ids = bone_data.frame_ids[mask]
+        bone_reduced.positions = bone_data.positions[mask]
+        bone_reduced.orientations = bone_data.orientations[mask]
+        bone_reduced.curve_x = bone_data.curve_x[mask]
+        bone_reduced.curve_y = bone_data.curve_y[mask]
+        bone_reduced.curve_z = bone_data.curve_z[mask]
+        bone_reduced.curve_rot = bone_data.curve_rot[mask]
+        return bone_reduced
+
+    @classmethod
+    def get_redundant_mask(cls, bone_data):
+        # type: (VmdBoneData) -> np.ndarray
+        # keyframes (sorted along time) which can be removed without changing
+        # any interpolated frame, the first and the last keyframes are always kept
+        frame_num = bone_data.get_frame_num()
+        redundant = np.zeros(frame_num, dtype="bool")
+        if frame_num < 3:
+            return redundant
+        # values are stored as 32-bit float in vmd file, so compare them in that precision
+        positions = bone_data.positions.astype("float32").astype("float")
+        orientations = bone_data.orientations.astype("float32")
+        frame_ids = np.asarray(bone_data.frame_ids, dtype="float")
+        # the slopes of both sides of an interior keyframe are the same
+        # if the second difference (scaled by interval lengths) vanishes
+        frame_diff = np.diff(frame_ids).reshape(-1, 1)
+        position_diff = np.diff(positions, axis=0)
+        is_linear = \
+            position_diff[1:] * frame_diff[:-1] == position_diff[:-1] * frame_diff[1:]
+        is_constant = (position_diff[1:] == 0.) & (position_diff[:-1] == 0.)
+        # a linear run is kept linear only if both intervals use linear curve,
+        # since the curve of the next keyframe governs the merged interval
+        is_curve_linear = np.column_stack([
+            cls._is_default_curve(bone_data.curve_x),
+            cls._is_default_curve(bone_data.curve_y),
+            cls._is_default_curve(bone_data.curve_z),
+        ])
+        is_curve_linear_both_sides = is_curve_linear[1:-1] & is_curve_linear[2:]
+        is_position_redundant = (
+            is_constant | (is_linear & is_curve_linear_both_sides)
+        ).all(axis=1)
+        # orientation has to be constant (curve is meaningless for constant value)
+        is_orientation_redundant = (
+            (orientations[1:-1] == orientations[:-2])
+            & (orientations[1:-1] == orientations[2:])
+        ).all(axis=1)
+        redundant[1:-1] = is_position_redundant & is_orientation_redundant
+        return redundant
+
+    @staticmethod
+    def _is_default_curve(curves):
+        # type: (np.ndarray) -> np.ndarray
+        return (np.asarray(curves) == VmdDataBase._CURVE_DEFAULT).all(axis=1)
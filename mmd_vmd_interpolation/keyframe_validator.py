@@ -0,0 +1,152 @@
+import numpy as np
+
+from .vmd_profile import (
+    VmdBoneData,
+    VmdCameraData,
+)
+
+
+class KeyframeValidator(object):
+
+    # what to do with invalid keyframes
+    POLICY_IGNORE = "ignore"
+    POLICY_REPAIR = "repair"
+    POLICY_ERROR = "error"
+    POLICIES = [POLICY_IGNORE, POLICY_REPAIR, POLICY_ERROR]
+
+    _CURVE_MAX = 127
+    _QUATERNION_NORM_TOLERANCE = 1e-3
+    _QUATERNION_NORM_MIN = 1e-6
+
+    _BONE_MEMBERS = [
+        "frame_ids", "positions", "orientations",
+        "curve_x", "curve_y", "curve_z", "curve_rot",
+    ]
+    _BONE_CURVES = ["curve_x", "curve_y", "curve_z", "curve_rot"]
+    _CAMERA_MEMBERS = [
+        "frame_ids", "distances", "positions", "orientations",
+        "curve_x", "curve_y", "curve_z", "curve_rot", "curve_dis", "curve_fov",
+        "fov_angles", "perspective_flags",
+    ]
+    _CAMERA_CURVES = ["curve_x", "curve_y", "curve_z", "curve_rot", "curve_dis", "curve_fov"]
+
+    @classmethod
+    def validate_bones(cls, bones_data, policy=POLICY_REPAIR):
+        # type: (dict[str, VmdBoneData], str) -> tuple[dict[str, VmdBoneData], dict[str, dict[str, int]]]
+        # return validated bones and the issues of the bones which have any
+        bones_valid = {}  # type: dict[str, VmdBoneData]
+        bones_issues = {}  # type: dict[str, dict[str, int]]
+        for name, bone_data in bones_data.items():
+            bones_valid[name], issues = cls.validate_bone(bone_data, policy)
+            if issues:
+                bones_issues[name] = issues
+        return bones_valid, bones_issues
+
+    @classmethod
+    def validate_bone(cls, bone_data, policy=POLICY_REPAIR):
+        # type: (VmdBoneData, str) -> tuple[VmdBoneData, dict[str, int]]
+        orientations = np.asarray(bone_data.orientations)
+        keep_loc, issues = cls._check(
+            bone_data.frame_ids,
+            [bone_data.positions, orientations],
+            [getattr(bone_data, name) for name in cls._BONE_CURVES],
+        )
+        # quaternion has to be unit, and zero one can't be fixed
+        norms = np.linalg.norm(orientations, axis=1) if len(orientations) else np.zeros(0)
+        is_zero = ~(norms > cls._QUATERNION_NORM_MIN)
+        is_unnormalized = np.abs(norms - 1.0) > cls._QUATERNION_NORM_TOLERANCE
+        keep_loc, zero_num = cls._drop(keep_loc, is_zero)
+        unnormalized_num = int(is_unnormalized[keep_loc].sum())
+        if zero_num:
+            issues["zero_quaternions"] = zero_num
+        if unnormalized_num:
+            issues["unnormalized_quaternions"] = unnormalized_num
+        if not issues or policy == cls.POLICY_IGNORE:
+            return bone_data, issues
+        if policy == cls.POLICY_ERROR:
+            raise ValueError(
+                "invalid keyframes of bone %s: %s" % (bone_data.name, cls.describe(issues))
+            )
+        bone_valid = VmdBoneData(bone_data.name, len(keep_loc))
+        cls._copy_members(bone_data, bone_valid, cls._BONE_MEMBERS, cls._BONE_CURVES, keep_loc)
+        if unnormalized_num:
+            bone_valid.orientations = bone_valid.orientations / norms[keep_loc].reshape(-1, 1)
+        return bone_valid, issues
+
+    @classmethod
+    def validate_camera(cls, camera_data, policy=POLICY_REPAIR):
+        # type: (VmdCameraData, str) -> tuple[VmdCameraData, dict[str, int]]
+        keep_loc, issues = cls._check(
+            camera_data.frame_ids,
+            [camera_data.distances, camera_data.positions, camera_data.orientations,
+             camera_data.fov_angles],
+            [getattr(camera_data, name) for name in cls._CAMERA_CURVES],
+        )
+        if not issues or policy == cls.POLICY_IGNORE:
+            return camera_data, issues
+        if policy == cls.POLICY_ERROR:
+            raise ValueError("invalid keyframes of camera: %s" % cls.describe(issues))
+        camera_valid = VmdCameraData(len(keep_loc))
+        cls._copy_members(
+            camera_data, camera_valid, cls._CAMERA_MEMBERS, cls._CAMERA_CURVES, keep_loc,
+        )
+        return camera_valid, issues
+
+    @staticmethod
+    def describe(issues):
+        # type: (dict[str, int]) -> str
+        return ", ".join(["%d %s" % (num, name.replace("_", " ")) for name, num in issues.items()])
+
+    @classmethod
+    def _check(cls, frame_ids, values_list, curves_list):
+        # type: (np.ndarray, list[np.ndarray], list[np.ndarray]) -> tuple[np.ndarray, dict[str, int]]
+        # whole-array checks over a track, which return the locations of keyframes
+        # to keep (sorted along time), and the numbers of the issues found
+        frame_ids = np.asarray(frame_ids)
+        issues = {}  # type: dict[str, int]
+        # frames out of order (stable, so the order of duplicates is kept)
+        if np.any(frame_ids[1:] < frame_ids[:-1]):
+            keep_loc = np.argsort(frame_ids, kind="stable")
+            issues["unsorted_frames"] = 1
+        else:
+            keep_loc = np.arange(len(frame_ids))
+        # non-finite value
+        is_finite = np.ones(len(frame_ids), dtype="bool")
+        for values in values_list:
+            values = np.asarray(values)
+            is_finite &= np.isfinite(values.reshape(len(values), -1)).all(axis=1)
+        keep_loc, non_finite_num = cls._drop(keep_loc, ~is_finite)
+        if non_finite_num:
+            issues["non_finite_keyframes"] = non_finite_num
+        # duplicate frames of valid keyframes, where the last one is kept
+        # like registering keyframe in mmd
+        frame_ids_kept = frame_ids[keep_loc]
+        is_duplicate = np.zeros(len(keep_loc), dtype="bool")
+        is_duplicate[:-1] = frame_ids_kept[1:] == frame_ids_kept[:-1]
+        duplicate_num = int(is_duplicate.sum())
+        if duplicate_num:
+            keep_loc = keep_loc[~is_duplicate]
+            issues["duplicate_frames"] = duplicate_num
+        # curve control points are in 0 ~ 127
+        is_out_of_range = np.zeros(len(frame_ids), dtype="bool")
+        for curves in curves_list:
+            curves = np.asarray(curves)
+            is_out_of_range |= ((curves < 0) | (curves > cls._CURVE_MAX)).any(axis=1)
+        out_of_range_num = int(is_out_of_range[keep_loc].sum())
+        if out_of_range_num:
+            issues["out_of_range_curves"] = out_of_range_num
+        return keep_loc, issues
+
+    @staticmethod
+    def _drop(keep_loc, is_invalid):
+        # type: (np.ndarray, np.ndarray) -> tuple[np.ndarray, int]
+        is_invalid_kept = is_invalid[keep_loc]
+        return keep_loc[~is_invalid_kept], int(is_invalid_kept.sum())
+
+    @classmethod
+    def _copy_members(cls, src, dst, member_names, curve_names, keep_loc):
+        for member_name in member_names:
+            value = np.asarray(getattr(src, member_name))[keep_loc]
+            if member_name in curve_names:
+                value = np.clip(value, 0, cls._CURVE_MAX)
+            setattr(dst, member_name, value)
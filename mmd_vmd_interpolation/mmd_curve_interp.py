@@ -1,10 +1,47 @@
+import collections
+import threading
+
 import numpy as np
 
+from .jit_backend import JitBackend
 from .transform import Transform
 
 
 class MMDCurveInterp(object):
 
+    # optional cache of solved curve (y of given x), which is shared by all
+    # intervals with the same curve parameters and frame positions, and is
+    # bounded by bytes of keys and values
+    _curve_cache = None  # type: collections.OrderedDict | None
+    _curve_cache_max_bytes = 0
+    _curve_cache_bytes = 0
+    _curve_cache_stats = {"hits": 0, "misses": 0}
+    _curve_cache_lock = threading.Lock()
+
+    @classmethod
+    def enable_curve_cache(cls, max_bytes=64 * 2**20):
+        # type: (int) -> None
+        with cls._curve_cache_lock:
+            cls._curve_cache = collections.OrderedDict()
+            cls._curve_cache_max_bytes = max_bytes
+            cls._curve_cache_bytes = 0
+            cls._curve_cache_stats = {"hits": 0, "misses": 0}
+
+    @classmethod
+    def disable_curve_cache(cls):
+        with cls._curve_cache_lock:
+            cls._curve_cache = None
+            cls._curve_cache_bytes = 0
+
+    @classmethod
+    def get_curve_cache_stats(cls):
+        # type: () -> dict[str, int]
+        with cls._curve_cache_lock:
+            stats = dict(cls._curve_cache_stats)
+            stats["size"] = len(cls._curve_cache) if cls._curve_cache is not None else 0
+            stats["bytes"] = cls._curve_cache_bytes
+            return stats
+
     @classmethod
     def interp(cls, frame_id_endpoint, value_endpoint, curve_param, frame_ids_desired):
         # type: (np.ndarray, np.ndarray, np.ndarray, np.ndarray) -> np.ndarray
@@ -37,16 +74,11 @@ class MMDCurveInterp(object):
                 return np.full(len(frame_ids_desired), value_endpoint[0])
             else:
                 return np.tile(value_endpoint[0,:], [len(frame_ids_desired), 1])
-        # get 4 control points from mmd curve parameters (4-by-2)
-        control_points = cls._get_bezier_curve_control_points(curve_param)
-        # get the coefficints of time polynomial of x, y on cubic bezier curve
-        # by give 4 control points
-        cubic_bezier_coeffs = cls._get_cubic_bezier_coeffs(control_points)
         # map frame index to x data with range 0 ~ 1
         x = (frame_ids_desired - frame_id_endpoint[0]) \
             / float(frame_id_endpoint[1] - frame_id_endpoint[0])
         # solve y on cubic bezier curve from given x
-        y = cls._solve_cubic_bezier_y_from_x(cubic_bezier_coeffs, x)
+        y = cls._solve_curve_y_from_x(curve_param, x)
         # map y with range 0 ~1 to value space
         if value_endpoint.ndim == 1:
             values = value_endpoint[0] + y*(value_endpoint[1] - value_endpoint[0])
@@ -55,6 +87,49 @@ class MMDCurveInterp(object):
                 + y.reshape(-1,1)*(value_endpoint[1,:] - value_endpoint[0,:])
         return values
 
+    @classmethod
+    def _solve_curve_y_from_x(cls, curve_param, x):
+        # type: (np.ndarray, np.ndarray) -> np.ndarray
+        # cache may be disabled or reset by other thread meanwhile
+        with cls._curve_cache_lock:
+            curve_cache = cls._curve_cache
+        if curve_cache is None:
+            return cls._solve_curve_y_from_x_without_cache(curve_param, x)
+        key = (tuple(np.asarray(curve_param).tolist()), x.tobytes())
+        with cls._curve_cache_lock:
+            cached = curve_cache.get(key)
+            if cached is not None:
+                curve_cache.move_to_end(key)
+                cls._curve_cache_stats["hits"] += 1
+                return cached[0]
+            cls._curve_cache_stats["misses"] += 1
+        y = cls._solve_curve_y_from_x_without_cache(curve_param, x)
+        y.setflags(write=False)
+        nbytes = len(key[1]) + y.nbytes
+        with cls._curve_cache_lock:
+            if curve_cache is cls._curve_cache and key not in curve_cache:
+                curve_cache[key] = (y, nbytes)
+                cls._curve_cache_bytes += nbytes
+                while cls._curve_cache_bytes > cls._curve_cache_max_bytes and curve_cache:
+                    _, (_, evicted_nbytes) = curve_cache.popitem(last=False)
+                    cls._curve_cache_bytes -= evicted_nbytes
+        return y
+
+    @classmethod
+    def _solve_curve_y_from_x_without_cache(cls, curve_param, x):
+        # type: (np.ndarray, np.ndarray) -> np.ndarray
+        kernels = JitBackend.get_kernels()
+        if kernels is not None:
+            return kernels.solve_curve_y_from_x(
+                np.asarray(curve_param, dtype="float"), np.asarray(x, dtype="float"),
+            )
+        # get 4 control points from mmd curve parameters (4-by-2)
+        control_points = cls._get_bezier_curve_control_points(curve_param)
+        # get the coefficints of time polynomial of x, y on cubic bezier curve
+        # by give 4 control points
+        cubic_bezier_coeffs = cls._get_cubic_bezier_coeffs(control_points)
+        return cls._solve_cubic_bezier_y_from_x(cubic_bezier_coeffs, x)
+
     @classmethod
     def interp_position(
             cls, frame_id_endpoint, position_endpoint,
@@ -93,6 +168,156 @@ class MMDCurveInterp(object):
         ).T
         return quaternions
 
+    @classmethod
+    def interp_keyframes(cls, frame_ids, values, curve_params, times, easing_table_size=None):
+        # type: (np.ndarray, np.ndarray, np.ndarray, np.ndarray, int | None) -> np.ndarray
+        # evaluate keyframes sorted along time at arbitrary (sub-frame) times,
+        # curve_params[i] is the curve of the interval from keyframe i-1 to i,
+        # and curves are approximated by table if easing_table_size is given
+        times = np.asarray(times, dtype="float")
+        frame_ids, values, curve_params = cls._drop_duplicate_keyframes(
+            frame_ids, values, curve_params,
+        )
+        if len(frame_ids) < 2:
+            return values[np.zeros(len(times), dtype="int")]
+        ind, x = cls._locate_intervals(frame_ids, times)
+        y = cls._solve_curves_y_from_x(curve_params[ind+1], x, easing_table_size)
+        value_diff = values[ind+1] - values[ind]
+        if values.ndim == 1:
+            values_interp = values[ind] + y*value_diff
+        else:
+            values_interp = values[ind] + y.reshape(-1,1)*value_diff
+        # prevent end point
+        mask_end = x >= 1.0
+        values_interp[mask_end] = values[ind[mask_end]+1]
+        return values_interp
+
+    @classmethod
+    def interp_keyframes_quaternion(
+            cls, frame_ids, quaternions, curve_params, times, easing_table_size=None,
+        ):
+        # type: (np.ndarray, np.ndarray, np.ndarray, np.ndarray, int | None) -> np.ndarray
+        times = np.asarray(times, dtype="float")
+        frame_ids, quaternions, curve_params = cls._drop_duplicate_keyframes(
+            frame_ids, quaternions, curve_params,
+        )
+        if len(frame_ids) < 2:
+            return quaternions[np.zeros(len(times), dtype="int")]
+        ind, x = cls._locate_intervals(frame_ids, times)
+        # rotation of each interval in the form of axis-angle
+        q_diff = Transform.divide_left_quaternion(
+            quaternions[:-1].T, quaternions[1:].T
+        )
+        sinth2 = np.sqrt(q_diff[0]**2 + q_diff[1]**2 + q_diff[2]**2)
+        angles = 2 * np.arctan2(sinth2, q_diff[3])
+        axes = np.zeros_like(q_diff[:3])
+        mask = sinth2 > 0.
+        axes[:, mask] = q_diff[:3, mask] / sinth2[mask]
+        # rotate from the start of interval along the ratio of angle
+        y = cls._solve_curves_y_from_x(curve_params[ind+1], x, easing_table_size)
+        quaternions_diff_interp = Transform.form_quaternion(axes[:, ind], y*angles[ind])
+        quaternions_interp = Transform.product_quaternion(
+            quaternions[ind].T, quaternions_diff_interp
+        ).T
+        # keep the keyframe itself for flat interval
+        mask_flat = ~mask[ind]
+        quaternions_interp[mask_flat] = quaternions[ind[mask_flat]]
+        # prevent end point
+        mask_end = x >= 1.0
+        quaternions_interp[mask_end] = quaternions[ind[mask_end]+1]
+        return quaternions_interp
+
+    @staticmethod
+    def _drop_duplicate_keyframes(frame_ids, values, curve_params):
+        # type: (np.ndarray, np.ndarray, np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]
+        # the last one of keyframes on the same frame is kept (the same as
+        # repairing keyframes), since interval of 0 frame has no ratio
+        frame_ids = np.asarray(frame_ids)
+        is_duplicate = frame_ids[1:] == frame_ids[:-1]
+        if not is_duplicate.any():
+            return frame_ids, values, curve_params
+        mask = np.append(~is_duplicate, True)
+        return frame_ids[mask], np.asarray(values)[mask], np.asarray(curve_params)[mask]
+
+    @staticmethod
+    def _locate_intervals(frame_ids, times):
+        # type: (np.ndarray, np.ndarray) -> tuple[np.ndarray, np.ndarray]
+        # find the interval index i such that frame_ids[i] <= t < frame_ids[i+1]
+        # and the ratio in the interval, times out of range are clipped to the ends
+        ind = np.searchsorted(frame_ids, times, side="right") - 1
+        ind = np.clip(ind, 0, len(frame_ids)-2)
+        fid0 = frame_ids[ind]
+        fid1 = frame_ids[ind+1]
+        x = np.clip((times - fid0) / (fid1 - fid0).astype("float"), 0.0, 1.0)
+        return ind, x
+
+    @classmethod
+    def get_easing_tables(cls, curve_params, table_size):
+        # type: (np.ndarray, int) -> tuple[np.ndarray, np.ndarray]
+        # points (x, y) on bezier curves at evenly spaced curve parameter,
+        # which need no root solving (each row for each curve)
+        t = np.linspace(0., 1., table_size)
+        basis1 = 3 * (1-t)**2 * t
+        basis2 = 3 * (1-t) * t**2
+        basis3 = t**3
+        p = np.asarray(curve_params, dtype="float").reshape(-1, 4) / 127.0
+        xs = p[:, [0]]*basis1 + p[:, [2]]*basis2 + basis3
+        ys = p[:, [1]]*basis1 + p[:, [3]]*basis2 + basis3
+        return xs, ys
+
+    @classmethod
+    def get_easing_error_bound(cls, curve_params, table_size):
+        # type: (np.ndarray, int) -> np.ndarray
+        # x and y are monotonic along curve parameter (control points in 0 ~ 1),
+        # so both curve and its table lie in the same cell, whose height bounds the error
+        _, ys = cls.get_easing_tables(curve_params, table_size)
+        return np.diff(ys, axis=1).max(axis=1)
+
+    @classmethod
+    def _approx_curves_y_from_x(cls, curve_params, x, table_size):
+        # type: (np.ndarray, np.ndarray, int) -> np.ndarray
+        # linear interpolation of easing table instead of solving cubic equation
+        xs, ys = cls.get_easing_tables(curve_params, table_size)
+        cell = (xs[:, 1:-1] <= x.reshape(-1, 1)).sum(axis=1)
+        rows = np.arange(len(x))
+        x0, x1 = xs[rows, cell], xs[rows, cell+1]
+        y0, y1 = ys[rows, cell], ys[rows, cell+1]
+        width = x1 - x0
+        ratio = np.divide(x - x0, width, out=np.zeros_like(width), where=width > 0)
+        return y0 + np.clip(ratio, 0., 1.)*(y1 - y0)
+
+    @classmethod
+    def _solve_curves_y_from_x(cls, curve_params, x, easing_table_size=None):
+        # type: (np.ndarray, np.ndarray, int | None) -> np.ndarray
+        # same as _solve_cubic_bezier_y_from_x but each x has its own curve
+        y = np.array(x, dtype="float")
+        # prevent endpoints for boundary precision issue
+        mask = (x > 0.0) & (x < 1.0)
+        if not mask.any():
+            return y
+        if easing_table_size:
+            y[mask] = cls._approx_curves_y_from_x(curve_params[mask], x[mask], easing_table_size)
+            return y
+        kernels = JitBackend.get_kernels()
+        if kernels is not None:
+            return kernels.solve_curves_y_from_x(np.asarray(curve_params, dtype="float"), y)
+        p1 = curve_params[mask, 0:2] / 127.0
+        p2 = curve_params[mask, 2:4] / 127.0
+        # coefficients of time polynomial of x, y (columns: t^3, t^2, t^1, t^0)
+        coeffs_x = np.column_stack([
+            1 + 3*p1[:,0] - 3*p2[:,0],
+            3*p2[:,0] - 6*p1[:,0],
+            3*p1[:,0],
+            -x[mask],
+        ])
+        t_sol = cls._solve_cubic_equation_real_root_between_0_1(coeffs_x)
+        y[mask] = (
+            (1 + 3*p1[:,1] - 3*p2[:,1]) * t_sol**3
+            + (3*p2[:,1] - 6*p1[:,1]) * t_sol**2
+            + 3*p1[:,1] * t_sol
+        )
+        return y
+
     @staticmethod
     def _get_bezier_curve_control_points(curve_param):
         # type: (np.ndarray) -> np.ndarray
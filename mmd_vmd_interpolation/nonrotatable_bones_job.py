@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from .bones_pose_calculator import (
+    BonesPoseCalculator,
+    BonesTree,
+)
+from .job_planner import JobPlanner
+from .job_setting import (
+    PREVIEW_EASING_TABLE_SIZE,
+    PREVIEW_STRIDE,
+    QUALITY_FULL,
+    QUALITY_PREVIEW,
+    QUALITY_PROGRESSIVE,
+    get_bones_setting,
+    validate_bones_data,
+)
+from .keyframe_reducer import KeyframeReducer
+from .keyframe_validator import KeyframeValidator
+from .timeline_profile import TimelineProfile
+from .vmd_profile import (
+    VmdBoneData,
+    VmdSimpleProfile,
+)
+
+
+def generate_nonrotatable_bones_data(
+        src, dst, motion_time_delay=0.0, need_reduce=True, src_model=None,
+        dst_timeline=None, validation_policy=KeyframeValidator.POLICY_REPAIR,
+        quality=QUALITY_FULL, preview_stride=PREVIEW_STRIDE, bones_names=None,
+        memory_mode=JobPlanner.MODE_FULL, memory_budget=None, thread_num=1,
+    ):
+
+    vp = VmdSimpleProfile(src)
+
+    if vp.check_is_camera():
+        print("Not bones data but camera data: %s" % (src,))
+        return
+
+    # setting
+    desired_bones_names, bones_list, bones_name_remap = get_bones_setting(bones_names, src_model)
+    bones_tree = BonesTree.get(bones_list)
+    dst_model_name = "nonrotatable_bone"
+
+    # admission by estimated peak memory
+    if memory_mode == JobPlanner.MODE_AUTO or memory_budget is not None:
+        plan = plan_nonrotatable_bones_data(
+            src, motion_time_delay, src_model, bones_names, memory_mode, memory_budget,
+            bones_setting=(desired_bones_names, bones_list, bones_name_remap),
+        )
+        print("memory plan: %s" % JobPlanner.describe(plan))
+        if plan["decision"] == JobPlanner.DECISION_REFUSE:
+            raise MemoryError(plan["reason"])
+        memory_mode = plan["mode"]
+
+    # load
+    model_name = vp.read_model_name()
+    print("loading bonse data from model: %s ..." % model_name)
+    bones_dict = vp.read_desired_bones(desired_bones_names)
+    bones_dict = validate_bones_data(bones_dict, validation_policy)
+    for bone_name in desired_bones_names:
+        bone_data = bones_dict[bone_name]
+        print("load %d frames of bone %s" % (bone_data.get_frame_num(), bone_data.name))
+
+    # create object to processing bone data
+    bpc = BonesPoseCalculator(
+        bones_dict, bones_tree,
+        dtype="float32" if memory_mode == JobPlanner.MODE_FLOAT32 else "float",
+        thread_num=thread_num,
+    )
+
+    # coarse preview without smoothing
+    if quality != QUALITY_FULL:
+        print("generating preview of nonrotatable bones with stride %d frames..." % preview_stride)
+        print("error bound of positions at preview frames: %f" % max(
+            bpc.get_position_error_bounds(PREVIEW_EASING_TABLE_SIZE, list(bones_name_remap)).values(),
+            default=0.0,
+        ))
+        bones_coarse = bpc.get_coarse_pose_bones(
+            preview_stride, PREVIEW_EASING_TABLE_SIZE, list(bones_name_remap),
+        )
+        nonrotatable_bones_preview = {}  # type: dict[str, VmdBoneData]
+        for old_name, new_name in bones_name_remap.items():
+            bone_coarse = bones_coarse[old_name]
+            bone_preview = VmdBoneData(new_name, bone_coarse.get_frame_num())
+            bone_preview.frame_ids = bone_coarse.frame_ids
+            bone_preview.positions = bone_coarse.positions
+            nonrotatable_bones_preview[new_name] = bone_preview
+        print("exporting preview of nonrotatable bone data to file: '%s' ..." % dst)
+        vp.write_bones(dst, dst_model_name, nonrotatable_bones_preview)
+        if quality == QUALITY_PREVIEW:
+            print("done!")
+            return
+
+    if memory_mode == JobPlanner.MODE_CHUNKED:
+        # interpolation and smoothing chunk by chunk of frames
+        print(
+            "generating nonrotatable bones by chunks of %d frames "
+            "with %f sec of time delay..." % (JobPlanner.CHUNK_FRAME_NUM, motion_time_delay)
+        )
+        nonrotatable_bones = bpc.get_lpf_full_positions_bones_by_chunks(
+            motion_time_delay, list(bones_name_remap), JobPlanner.CHUNK_FRAME_NUM,
+        )
+    else:
+        # interpolation
+        print("doing interpolation of bone data...")
+        bones_interp_data = bpc.get_full_interp_bones()
+
+        # generate nonrotatable bones
+        print(
+            "generating nonrotatable bones "
+            "with %f sec of time delay..." % motion_time_delay
+        )
+        nonrotatable_bones = bpc.get_lpf_full_positions_bones(
+            motion_time_delay, list(bones_name_remap),
+        )
+    nonrotatable_bones_remap = {
+        new_name: nonrotatable_bones[old_name] \
+            for old_name, new_name in bones_name_remap.items()
+    }
+
+    # actual error of preview (with linear interpolation in mmd)
+    if quality == QUALITY_PROGRESSIVE:
+        print("max position error of preview: %f" % max([
+            np.abs(
+                np.column_stack([
+                    np.interp(
+                        bone_full.frame_ids, nonrotatable_bones_preview[name].frame_ids,
+                        nonrotatable_bones_preview[name].positions[:,i],
+                    ) for i in range(3)
+                ]) - bone_full.positions
+            ).max() if bone_full.get_frame_num() else 0.0
+                for name, bone_full in nonrotatable_bones_remap.items()
+        ] or [0.0]))
+
+    # dense timeline for other tools
+    if dst_timeline:
+        print("exporting dense timeline of nonrotatable bones to: '%s' ..." % dst_timeline)
+        TimelineProfile.write_bones(dst_timeline, dst_model_name, nonrotatable_bones_remap)
+
+    # remove redundant frames
+    if need_reduce:
+        print("removing redundant frames...")
+        nonrotatable_bones_remap = KeyframeReducer.reduce_bones(nonrotatable_bones_remap)
+        print("remain %d frames" % sum(
+            [b.get_frame_num() for b in nonrotatable_bones_remap.values()]
+        ))
+
+    # write to file
+    print("exporting nonrotatable bone data to file: '%s' ..." % dst)
+    vp.write_bones(dst, dst_model_name, nonrotatable_bones_remap)
+    print("done!")
+
+
+def plan_nonrotatable_bones_data(
+        src, motion_time_delay=0.0, src_model=None, bones_names=None,
+        memory_mode=JobPlanner.MODE_AUTO, memory_budget=None, in_use_bytes=0,
+        bones_setting=None,
+    ):
+    # type: (str, float, str | None, list[str] | None, str, float | None, int, tuple | None) -> dict
+    # estimate the job in the memory mode (or all modes for auto) from vmd header,
+    # and decide whether it runs, waits for in_use_bytes or is refused in budget (MB)
+    _, bones_list, bones_name_remap = bones_setting or get_bones_setting(bones_names, src_model)
+    summary = JobPlanner.read_summary(src)
+    modes = JobPlanner.MODES if memory_mode == JobPlanner.MODE_AUTO else [memory_mode]
+    estimates = [
+        JobPlanner.estimate_nonrotatable_bones(
+            summary, len(bones_list), len(bones_name_remap), motion_time_delay, mode,
+        ) for mode in modes
+    ]
+    budget_bytes = None if memory_budget is None else int(memory_budget * 1e6)
+    return JobPlanner.plan(estimates, budget_bytes, in_use_bytes)
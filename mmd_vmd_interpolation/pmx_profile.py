@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+import mmap
+import struct
+
+import numpy as np
+
+
+class PmxSimpleProfile:
+
+    ## pmx format
+    ## https://gist.github.com/felixjones/f8a06bd48f9da9a4539f
+
+    _SIGNATURE = b"PMX "
+    _CODINGS = {
+        0: "utf-16-le",
+        1: "utf-8",
+    }
+
+    _INT_FORMAT = struct.Struct("<i")
+    _FLAG_FORMAT = struct.Struct("<H")
+    _INDEX_FORMATS = {
+        1: struct.Struct("<b"),
+        2: struct.Struct("<h"),
+        4: struct.Struct("<i"),
+    }
+
+    # vertex: position, normal, uv (+ additional uv), weight type, (weight), edge scale
+    _VERTEX_FIXED_LEN = 3*4 + 3*4 + 2*4
+    _ADDITIONAL_UV_LEN = 4*4
+    _EDGE_SCALE_LEN = 4
+    # vertices of the same weight type before the following ones are checked at once
+    _VERTEX_RUN_MIN_LEN = 16
+    # material: diffuse, specular, specular strength, ambient, flag, edge color, edge scale
+    _MATERIAL_FIXED_LEN = 4*4 + 3*4 + 4 + 3*4 + 1 + 4*4 + 4
+
+    # bone flags
+    _BONE_FLAG_INDEXED_TAIL = 0x0001
+    _BONE_FLAG_IK = 0x0020
+    _BONE_FLAG_INHERIT_ROTATION = 0x0100
+    _BONE_FLAG_INHERIT_TRANSLATION = 0x0200
+    _BONE_FLAG_FIXED_AXIS = 0x0400
+    _BONE_FLAG_LOCAL_COORDINATE = 0x0800
+    _BONE_FLAG_EXTERNAL_PARENT = 0x2000
+
+    def __init__(self, src):
+        # type: (str) -> None
+        self.src = src
+
+    def _parse_globals(self, buf):
+        # type: (memoryview) -> tuple[dict[str, int], int]
+        if bytes(buf[0:4]) != self._SIGNATURE:
+            raise ValueError("Not pmx file: " + str(self.src))
+        globals_num = buf[8]
+        globals_raw = bytes(buf[9:9+globals_num])
+        pmx_globals = {
+            "coding": globals_raw[0],
+            "additional_uv_num": globals_raw[1],
+            "vertex_index_size": globals_raw[2],
+            "texture_index_size": globals_raw[3],
+            "material_index_size": globals_raw[4],
+            "bone_index_size": globals_raw[5],
+            "morph_index_size": globals_raw[6],
+            "rigid_body_index_size": globals_raw[7],
+        }
+        return pmx_globals, 9 + globals_num
+
+    def _get_int(self, buf, loc):
+        # type: (memoryview, int) -> int
+        return self._INT_FORMAT.unpack_from(buf, loc)[0]
+
+    def _skip_text(self, buf, loc):
+        # type: (memoryview, int) -> int
+        return loc + 4 + self._get_int(buf, loc)
+
+    def _get_text(self, buf, loc, pmx_globals):
+        # type: (memoryview, int, dict[str, int]) -> tuple[str, int]
+        text_len = self._get_int(buf, loc)
+        loc_end = loc + 4 + text_len
+        text = bytes(buf[loc+4:loc_end]).decode(self._CODINGS[pmx_globals["coding"]])
+        return text, loc_end
+
+    def _skip_model_info(self, buf, loc):
+        # type: (memoryview, int) -> int
+        # name (local, universal) and comment (local, universal)
+        for _ in range(4):
+            loc = self._skip_text(buf, loc)
+        return loc
+
+    def _skip_vertices(self, buf, loc, pmx_globals):
+        # type: (memoryview, int, dict[str, int]) -> int
+        vertex_num = self._get_int(buf, loc)
+        loc += 4
+        bone_index_size = pmx_globals["bone_index_size"]
+        # length from weight type to the next vertex for each weight type
+        weight_lens = [
+            bone_index_size,  # BDEF1
+            2*bone_index_size + 4,  # BDEF2
+            4*bone_index_size + 4*4,  # BDEF4
+            2*bone_index_size + 4 + 3*3*4,  # SDEF
+            4*bone_index_size + 4*4,  # QDEF
+        ]
+        weight_type_offset = self._VERTEX_FIXED_LEN \
+            + pmx_globals["additional_uv_num"] * self._ADDITIONAL_UV_LEN
+        vertex_lens = [
+            weight_type_offset + 1 + weight_len + self._EDGE_SCALE_LEN
+                for weight_len in weight_lens
+        ]
+        # vertex length is determined by its weight type only, so just hop over
+        # weight type bytes, where vertices of the same weight type are usually
+        # gathered (e.g. by mesh), and weight type bytes of the following ones
+        # in a long run are checked at once with stride of its vertex length
+        buf_array = np.frombuffer(buf, dtype="uint8")
+        vertex_id = 0
+        run_weight_type = None
+        run_num = 0
+        while vertex_id < vertex_num:
+            weight_type = buf[loc + weight_type_offset]
+            vertex_len = vertex_lens[weight_type]
+            if weight_type != run_weight_type:
+                run_weight_type = weight_type
+                run_num = 0
+            if run_num < self._VERTEX_RUN_MIN_LEN:
+                loc += vertex_len
+                vertex_id += 1
+                run_num += 1
+                continue
+            # as many as the run so far, which doubles while it continues
+            check_num = min(run_num, vertex_num - vertex_id)
+            weight_type_loc = loc + weight_type_offset
+            is_same = buf_array[
+                weight_type_loc:weight_type_loc + check_num*vertex_len:vertex_len
+            ] == weight_type
+            # the first one differs, or all of them are the same
+            same_num = int(np.argmin(is_same)) or len(is_same)
+            loc += same_num * vertex_len
+            vertex_id += same_num
+            run_num += same_num
+        return loc
+
+    def _skip_faces(self, buf, loc, pmx_globals):
+        # type: (memoryview, int, dict[str, int]) -> int
+        face_index_num = self._get_int(buf, loc)
+        return loc + 4 + face_index_num * pmx_globals["vertex_index_size"]
+
+    def _skip_textures(self, buf, loc):
+        # type: (memoryview, int) -> int
+        texture_num = self._get_int(buf, loc)
+        loc += 4
+        for _ in range(texture_num):
+            loc = self._skip_text(buf, loc)
+        return loc
+
+    def _skip_materials(self, buf, loc, pmx_globals):
+        # type: (memoryview, int, dict[str, int]) -> int
+        material_num = self._get_int(buf, loc)
+        loc += 4
+        texture_index_size = pmx_globals["texture_index_size"]
+        for _ in range(material_num):
+            # name (local, universal)
+            loc = self._skip_text(buf, loc)
+            loc = self._skip_text(buf, loc)
+            # fixed part, texture index, environment index, environment blend mode
+            loc += self._MATERIAL_FIXED_LEN + 2*texture_index_size + 1
+            # toon reference
+            toon_reference = buf[loc]
+            loc += 1
+            loc += texture_index_size if toon_reference == 0 else 1
+            # meta data
+            loc = self._skip_text(buf, loc)
+            # surface count
+            loc += 4
+        return loc
+
+    def _get_bones_list(self, buf, loc, pmx_globals):
+        # type: (memoryview, int, dict[str, int]) -> list[tuple[str, str | None, np.ndarray]]
+        bone_num = self._get_int(buf, loc)
+        loc += 4
+        bone_index_size = pmx_globals["bone_index_size"]
+        bone_index_format = self._INDEX_FORMATS[bone_index_size]
+        names = []  # type: list[str]
+        parent_ids = np.zeros(bone_num, dtype="int")
+        position_locs = np.zeros(bone_num, dtype="int")
+        for i in range(bone_num):
+            name, loc = self._get_text(buf, loc, pmx_globals)
+            names.append(name)
+            loc = self._skip_text(buf, loc)
+            position_locs[i] = loc
+            loc += 3*4
+            parent_ids[i] = bone_index_format.unpack_from(buf, loc)[0]
+            loc += bone_index_size
+            # layer
+            loc += 4
+            flag = self._FLAG_FORMAT.unpack_from(buf, loc)[0]
+            loc += 2
+            # tail position
+            loc += bone_index_size if flag & self._BONE_FLAG_INDEXED_TAIL else 3*4
+            if flag & (self._BONE_FLAG_INHERIT_ROTATION | self._BONE_FLAG_INHERIT_TRANSLATION):
+                loc += bone_index_size + 4
+            if flag & self._BONE_FLAG_FIXED_AXIS:
+                loc += 3*4
+            if flag & self._BONE_FLAG_LOCAL_COORDINATE:
+                loc += 2*3*4
+            if flag & self._BONE_FLAG_EXTERNAL_PARENT:
+                loc += 4
+            if flag & self._BONE_FLAG_IK:
+                # target, loop count, limit angle
+                loc += bone_index_size + 4 + 4
+                link_num = self._get_int(buf, loc)
+                loc += 4
+                for _ in range(link_num):
+                    loc += bone_index_size
+                    has_limits = buf[loc]
+                    loc += 1
+                    if has_limits:
+                        loc += 2*3*4
+        # gather positions at once
+        positions = np.frombuffer(buf, dtype="uint8")[
+            position_locs.reshape(-1, 1) + np.arange(3*4)
+        ].view("<f4").astype("float")
+        bones_list = []  # type: list[tuple[str, str | None, np.ndarray]]
+        for name, parent_id, position in zip(names, parent_ids, positions):
+            parent_name = names[parent_id] if 0 <= parent_id < bone_num else None
+            bones_list.append((name, parent_name, position))
+        return bones_list
+
+    def _read_with_buffer(self, fun):
+        with open(self.src, "rb") as fp:
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                buf = memoryview(mm)
+                try:
+                    return fun(buf)
+                finally:
+                    buf.release()
+
+    def read_model_name(self):
+        # type: () -> str
+        def read(buf):
+            pmx_globals, loc = self._parse_globals(buf)
+            model_name, _ = self._get_text(buf, loc, pmx_globals)
+            return model_name
+        return self._read_with_buffer(read)
+
+    def read_bones_list(self):
+        # type: () -> list[tuple[str, str | None, np.ndarray]]
+        # jump over vertices, faces, textures and materials to bones directly
+        def read(buf):
+            pmx_globals, loc = self._parse_globals(buf)
+            loc = self._skip_model_info(buf, loc)
+            loc = self._skip_vertices(buf, loc, pmx_globals)
+            loc = self._skip_faces(buf, loc, pmx_globals)
+            loc = self._skip_textures(buf, loc)
+            loc = self._skip_materials(buf, loc, pmx_globals)
+            return self._get_bones_list(buf, loc, pmx_globals)
+        return self._read_with_buffer(read)
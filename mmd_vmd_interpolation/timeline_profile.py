@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+
+from .vmd_profile import (
+    VmdBoneData,
+    VmdCameraData,
+    VmdMotionTable,
+)
+
+
+class TimelineProfile:
+
+    # dense timeline (one frame per frame) of bones or camera stored as
+    # contiguous arrays, in a directory of .npy files (which can be memory-mapped)
+    # or in a single .npz file, with a small metadata header
+
+    _FORMAT = "mmd_vmd_interpolation.timeline"
+    _VERSION = 1
+    _META_NAME = "meta"
+    _CAMERA_HEADER_NAME = "カメラ・照明"
+
+    _BONE_MEMBERS = [
+        "frame_ids", "positions", "orientations",
+        "curve_x", "curve_y", "curve_z", "curve_rot",
+    ]
+    _CAMERA_MEMBERS = [
+        "frame_ids", "distances", "positions", "orientations",
+        "curve_x", "curve_y", "curve_z", "curve_rot", "curve_dis", "curve_fov",
+        "fov_angles", "perspective_flags",
+    ]
+
+    def __init__(self, src):
+        # type: (str) -> None
+        self.src = src
+
+    @staticmethod
+    def is_timeline(src):
+        # type: (str) -> bool
+        return isinstance(src, str) and (os.path.isdir(src) or src.endswith(".npz"))
+
+    def _read_meta(self):
+        # type: () -> dict
+        if os.path.isdir(self.src):
+            with open(os.path.join(self.src, self._META_NAME + ".json"), "rb") as fp:
+                meta = json.loads(fp.read().decode("utf-8"))
+        else:
+            with np.load(self.src) as npz:
+                meta = json.loads(str(npz[self._META_NAME]))
+        if meta.get("format") != self._FORMAT:
+            raise ValueError("Not timeline data: %s" % self.src)
+        return meta
+
+    def _read_arrays(self, names):
+        # type: (list[str]) -> dict[str, np.ndarray]
+        if os.path.isdir(self.src):
+            # memory-mapped, so nothing is loaded until it is used
+            return {
+                name: np.load(os.path.join(self.src, name + ".npy"), mmap_mode="r")
+                    for name in names
+            }
+        else:
+            with np.load(self.src) as npz:
+                return {name: npz[name] for name in names}
+
+    def read_model_name(self):
+        # type: () -> str
+        return self._read_meta()["model_name"]
+
+    def check_is_camera(self):
+        # type: () -> bool
+        return self._read_meta()["kind"] == "camera"
+
+    def read_motion_table(self):
+        # type: () -> VmdMotionTable
+        meta = self._read_meta()
+        arrays = self._read_arrays(self._BONE_MEMBERS + ["bone_ids", "offsets"])
+        return VmdMotionTable.from_sorted(meta["names"], **arrays)
+
+    def read_desired_bones(self, desired_bones_names):
+        # type: (list[str]) -> dict[str, VmdBoneDataView]
+        motion_table = self.read_motion_table()
+        return {name: motion_table.get_bone(name) for name in desired_bones_names}
+
+    def read_camera(self):
+        # type: () -> VmdCameraData
+        arrays = self._read_arrays(self._CAMERA_MEMBERS)
+        camera_data = VmdCameraData(0)
+        for name, value in arrays.items():
+            setattr(camera_data, name, value)
+        return camera_data
+
+    @classmethod
+    def write_bones(cls, dst, model_name, bones_data):
+        # type: (str, str, dict[str, VmdBoneData]) -> None
+        names = list(bones_data.keys())
+        frame_nums = [len(bones_data[name].frame_ids) for name in names]
+        arrays = {
+            member_name: np.concatenate([
+                np.asarray(getattr(bones_data[name], member_name)) for name in names
+            ]) if names else np.zeros(0)
+                for member_name in cls._BONE_MEMBERS
+        }
+        arrays["bone_ids"] = np.repeat(np.arange(len(names)), frame_nums)
+        arrays["offsets"] = np.concatenate([[0], np.cumsum(frame_nums)]).astype("int")
+        meta = {
+            "format": cls._FORMAT,
+            "version": cls._VERSION,
+            "kind": "bones",
+            "model_name": model_name,
+            "names": names,
+        }
+        cls._write(dst, meta, arrays)
+
+    @classmethod
+    def write_camera(cls, dst, camera_data):
+        # type: (str, VmdCameraData) -> None
+        arrays = {
+            member_name: np.asarray(getattr(camera_data, member_name))
+                for member_name in cls._CAMERA_MEMBERS
+        }
+        meta = {
+            "format": cls._FORMAT,
+            "version": cls._VERSION,
+            "kind": "camera",
+            "model_name": cls._CAMERA_HEADER_NAME,
+        }
+        cls._write(dst, meta, arrays)
+
+    @classmethod
+    def _write(cls, dst, meta, arrays):
+        # type: (str, dict, dict[str, np.ndarray]) -> None
+        arrays = {name: np.ascontiguousarray(value) for name, value in arrays.items()}
+        meta["frame_nums"] = {name: len(value) for name, value in arrays.items()}
+        meta_raw = json.dumps(meta, ensure_ascii=False)
+        # write to a sibling temporary path and swap it with existing data, so that
+        # readers (memory-mapped ones keep old files) never see partial rewrite
+        dst = os.path.normpath(dst)
+        temp_dst = "%s.%s.tmp" % (dst, uuid.uuid4().hex[:8])
+        try:
+            if dst.endswith(".npz"):
+                with open(temp_dst, "wb") as fp:
+                    np.savez(fp, **dict(arrays, **{cls._META_NAME: np.array(meta_raw)}))
+                os.replace(temp_dst, dst)
+            else:
+                if os.path.isdir(dst) and os.listdir(dst) \
+                        and not os.path.isfile(os.path.join(dst, cls._META_NAME + ".json")):
+                    raise ValueError("Not timeline data: %s" % dst)
+                os.makedirs(temp_dst)
+                for name, value in arrays.items():
+                    np.save(os.path.join(temp_dst, name + ".npy"), value)
+                with open(os.path.join(temp_dst, cls._META_NAME + ".json"), "wb") as fp:
+                    fp.write(meta_raw.encode("utf-8"))
+                if os.path.isdir(dst):
+                    # directory can't be replaced at once
+                    os.rename(dst, temp_dst + ".old")
+                    os.rename(temp_dst, dst)
+                    shutil.rmtree(temp_dst + ".old")
+                else:
+                    os.rename(temp_dst, dst)
+        finally:
+            if os.path.isdir(temp_dst):
+                shutil.rmtree(temp_dst)
+            elif os.path.exists(temp_dst):
+                os.remove(temp_dst)
@@ -0,0 +1,155 @@
+import numpy as np
+
+from .vmd_profile import (
+    VmdCameraData,
+    VmdMotionTable,
+    VmdSimpleProfile,
+)
+
+
+class VmdComparator(object):
+
+    _BONE_FIELDS = ["positions", "orientations"]
+    _BONE_CURVES = ["curve_x", "curve_y", "curve_z", "curve_rot"]
+    _CAMERA_FIELDS = ["distances", "positions", "orientations", "fov_angles"]
+    _CAMERA_CURVES = ["curve_x", "curve_y", "curve_z", "curve_rot", "curve_dis", "curve_fov"]
+
+    @classmethod
+    def compare_files(cls, src_a, src_b, atol=1e-4, rtol=0.0, curve_tol=0):
+        # type: (str, str, float, float, int) -> dict
+        # compare bones or camera of 2 vmd files, where a is the reference
+        vp_a = VmdSimpleProfile(src_a)
+        vp_b = VmdSimpleProfile(src_b)
+        is_camera = vp_a.check_is_camera()
+        if is_camera != vp_b.check_is_camera():
+            raise ValueError("can't compare camera data with bone data")
+        if is_camera:
+            return cls.compare_cameras(
+                vp_a.read_camera(), vp_b.read_camera(), atol, rtol, curve_tol,
+            )
+        return cls.compare_motion_tables(
+            vp_a.read_motion_table(), vp_b.read_motion_table(), atol, rtol, curve_tol,
+        )
+
+    @classmethod
+    def compare_motion_tables(cls, table_a, table_b, atol=1e-4, rtol=0.0, curve_tol=0):
+        # type: (VmdMotionTable, VmdMotionTable, float, float, int) -> dict
+        # tracks are aligned by (bone, frame) over the union of bone names
+        names = list(dict.fromkeys(table_a.names + table_b.names))
+        name_to_id = {name: i for i, name in enumerate(names)}
+        frame_end = max([int(table.frame_ids.max()) + 1 for table in [table_a, table_b]
+            if table.get_frame_num()] or [1])
+        keys_a = cls._get_bone_keys(table_a, name_to_id, frame_end)
+        keys_b = cls._get_bone_keys(table_b, name_to_id, frame_end)
+        report = cls._compare(
+            table_a, table_b, keys_a, keys_b,
+            cls._BONE_FIELDS, cls._BONE_CURVES, atol, rtol, curve_tol,
+        )
+        # which bones have the keys missing or extra
+        for name in ["missing", "extra"]:
+            bone_ids = report.pop(name + "_keys") // frame_end
+            report[name + "_bones"] = {
+                names[bone_id]: int(num) for bone_id, num in
+                    enumerate(np.bincount(bone_ids, minlength=len(names))) if num
+            }
+        return report
+
+    @classmethod
+    def compare_cameras(cls, camera_a, camera_b, atol=1e-4, rtol=0.0, curve_tol=0):
+        # type: (VmdCameraData, VmdCameraData, float, float, int) -> dict
+        report = cls._compare(
+            camera_a, camera_b,
+            np.asarray(camera_a.frame_ids, dtype="int64"),
+            np.asarray(camera_b.frame_ids, dtype="int64"),
+            cls._CAMERA_FIELDS, cls._CAMERA_CURVES, atol, rtol, curve_tol,
+        )
+        for name in ["missing", "extra"]:
+            report[name + "_frames"] = report.pop(name + "_keys")
+        return report
+
+    @classmethod
+    def check_is_equal(cls, report):
+        # type: (dict) -> bool
+        # whether 2 data are the same within tolerances
+        return report["missing"] == 0 and report["extra"] == 0 \
+            and report["duplicates"] == 0 \
+            and all([field["exceeded"] == 0 for field in report["fields"].values()]) \
+            and all([num == 0 for num in report["curves"].values()]) \
+            and report.get("perspective_flags", 0) == 0
+
+    @staticmethod
+    def _get_bone_keys(table, name_to_id, frame_end):
+        # type: (VmdMotionTable, dict[str, int], int) -> np.ndarray
+        # a key of (bone, frame) as an integer, whose order is that of (bone, frame)
+        table_to_id = np.array([name_to_id[name] for name in table.names], dtype="int64")
+        return table_to_id[table.bone_ids] * frame_end + table.frame_ids
+
+    @classmethod
+    def _compare(cls, data_a, data_b, keys_a, keys_b, fields, curves, atol, rtol, curve_tol):
+        # type: (object, object, np.ndarray, np.ndarray, list[str], list[str], float, float, int) -> dict
+        loc_a, dup_a = cls._get_unique_loc(keys_a)
+        loc_b, dup_b = cls._get_unique_loc(keys_b)
+        # sorted join of the keys
+        _, match_a, match_b = np.intersect1d(
+            keys_a[loc_a], keys_b[loc_b], assume_unique=True, return_indices=True,
+        )
+        match_a = loc_a[match_a]
+        match_b = loc_b[match_b]
+        # keys of a not in b, and keys of b not in a
+        is_missing = np.zeros(len(keys_a), dtype="bool")
+        is_missing[loc_a] = True
+        is_missing[match_a] = False
+        is_extra = np.zeros(len(keys_b), dtype="bool")
+        is_extra[loc_b] = True
+        is_extra[match_b] = False
+        report = {
+            "matched": len(match_a),
+            "missing": int(is_missing.sum()),
+            "extra": int(is_extra.sum()),
+            "duplicates": dup_a + dup_b,
+            "missing_keys": keys_a[is_missing],
+            "extra_keys": keys_b[is_extra],
+            "fields": {},
+            "curves": {},
+        }  # type: dict
+        # deviation of values in (key, component)
+        for name in fields:
+            values_a = np.asarray(getattr(data_a, name), dtype="float")[match_a]
+            values_b = np.asarray(getattr(data_b, name), dtype="float")[match_b]
+            values_a = values_a.reshape(len(match_a), -1)
+            values_b = values_b.reshape(len(match_b), -1)
+            if name == "orientations" and values_a.shape[1] == 4:
+                # q and -q are the same rotation
+                signs = np.where(np.sum(values_a * values_b, axis=1) < 0, -1.0, 1.0)
+                values_b = values_b * signs.reshape(-1, 1)
+            deviations = np.abs(values_a - values_b)
+            is_exceeded = deviations > atol + rtol * np.abs(values_a)
+            report["fields"][name] = {
+                "max": float(deviations.max()) if deviations.size else 0.0,
+                "mean": float(deviations.mean()) if deviations.size else 0.0,
+                "exceeded": int(is_exceeded.any(axis=1).sum()),
+            }
+        # number of keys whose curve control points differ
+        for name in curves:
+            curves_a = np.asarray(getattr(data_a, name), dtype="int")[match_a]
+            curves_b = np.asarray(getattr(data_b, name), dtype="int")[match_b]
+            report["curves"][name] = int(
+                (np.abs(curves_a - curves_b) > curve_tol).any(axis=1).sum()
+            )
+        if hasattr(data_a, "perspective_flags"):
+            report["perspective_flags"] = int(np.sum(
+                np.asarray(data_a.perspective_flags)[match_a]
+                    != np.asarray(data_b.perspective_flags)[match_b]
+            ))
+        return report
+
+    @staticmethod
+    def _get_unique_loc(keys):
+        # type: (np.ndarray) -> tuple[np.ndarray, int]
+        # locations of unique keys, where the last one of duplicate keys is kept
+        # like registering keyframe in mmd, and the number of duplicates
+        order = np.argsort(keys, kind="stable")
+        keys_sorted = keys[order]
+        is_last = np.ones(len(keys), dtype="bool")
+        is_last[:-1] = keys_sorted[1:] != keys_sorted[:-1]
+        return order[is_last], int(len(keys) - is_last.sum())
@@ -1,6 +1,11 @@
 # -*- coding: utf-8 -*-
-import struct
+import contextlib
+import gzip
 import io
+import lzma
+import os
+import struct
+import zipfile
 
 import numpy as np
 
@@ -36,14 +41,118 @@ class VmdSimpleProfile:
     _LIGHT_FORMAT = struct.Struct("I3f3f")
     _LIGHT_LEN = 4 + 3*4 + 3*4
 
+    ## numpy structured types for decoding whole data block at once
+    _BONE_DTYPE = np.dtype([
+        ("name", "S15"),
+        ("frame_id", "<u4"),
+        ("position", "<f4", (3,)),
+        ("orientation", "<f4", (4,)),
+        ("interp", "i1", (64,)),
+    ])
+    _CAMERA_DTYPE = np.dtype([
+        ("frame_id", "<u4"),
+        ("distance", "<f4"),
+        ("position", "<f4", (3,)),
+        ("orientation", "<f4", (3,)),
+        ("interp", "u1", (24,)),
+        ("fov_angle", "<u4"),
+        ("perspective_flag", "?"),
+    ])
+
     _BONE_NAME_LEN = 15
     _BONE_BIN_LEN = _BONE_LEN - _BONE_NAME_LEN
     _MORPH_NAME_LEN = 15
     _MORPH_BIN_LEN = _MORPH_LEN - _MORPH_NAME_LEN
 
-    def __init__(self, src):
-        # type: (str) -> None
+    ## sections in order, with the length and the offset of frame id of a record
+    _SECTIONS = ["bone", "morph", "camera", "light"]
+    _RECORD_LEN = {"bone": _BONE_LEN, "morph": _MORPH_LEN, "camera": _CAMERA_LEN, "light": _LIGHT_LEN}
+    _FRAME_ID_OFFSET = {"bone": _BONE_NAME_LEN, "morph": _MORPH_NAME_LEN, "camera": 0, "light": 0}
+    _SCAN_CHUNK_LEN = 1 << 16  # records read at once to scan frame ids
+
+    ## compressed source is detected by its magic number
+    _GZIP_MAGIC = b"\x1f\x8b"
+    _XZ_MAGIC = b"\xfd7zXZ\x00"
+    _ZIP_MAGIC = b"PK\x03\x04"
+    _MAGIC_LEN = 6
+    _ZIP_EXT = ".zip"
+    _VMD_EXT = ".vmd"
+    _ZIP_UTF8_FLAG = 0x800
+
+    def __init__(self, src, member=None):
+        # type: (str | bytes | bytearray | memoryview | io.IOBase, str | None) -> None
+        # vmd data of file object starts at its current position,
+        # and non-seekable stream can be read only once, so keep its content
+        src_offset = 0
+        if hasattr(src, "read"):
+            if getattr(src, "seekable", lambda: False)():
+                src_offset = src.tell()
+            else:
+                src = src.read()
+        # member of zip archive can be given in path, e.g. "motion.zip/camera.vmd"
+        if isinstance(src, str) and member is None:
+            src, member = self.split_archive_path(src)
         self.src = src
+        self.src_offset = src_offset
+        self.member = member
+
+    @classmethod
+    def split_archive_path(cls, path):
+        # type: (str) -> tuple[str, str | None]
+        if os.path.exists(path):
+            return path, None
+        path_lower = path.lower()
+        for sep in {"/", os.sep}:
+            loc = path_lower.find(cls._ZIP_EXT + sep)
+            while loc >= 0:
+                archive = path[:loc + len(cls._ZIP_EXT)]
+                if os.path.isfile(archive):
+                    member = path[loc + len(cls._ZIP_EXT) + 1:].replace(os.sep, "/")
+                    return archive, member
+                loc = path_lower.find(cls._ZIP_EXT + sep, loc + 1)
+        return path, None
+
+    @contextlib.contextmanager
+    def _open(self):
+        with contextlib.ExitStack() as stack:
+            fp = stack.enter_context(self._open_raw())
+            # compressed data is decompressed as far as read, and seeking forward
+            # (e.g. past bones block) decompresses it without keeping it
+            # (file object given might have been read already)
+            fp.seek(0, 0)
+            magic = bytes(fp.read(self._MAGIC_LEN))
+            fp.seek(0, 0)
+            is_gzip = magic.startswith(self._GZIP_MAGIC)
+            is_xz = magic.startswith(self._XZ_MAGIC)
+            is_zip = magic.startswith(self._ZIP_MAGIC)
+            if (is_gzip or is_xz or is_zip) and isinstance(fp, VmdBufferReader):
+                fp = io.BytesIO(fp.read())
+            if is_gzip:
+                fp = stack.enter_context(gzip.GzipFile(fileobj=fp, mode="rb"))
+            elif is_xz:
+                fp = stack.enter_context(lzma.LZMAFile(fp, "rb"))
+            elif is_zip:
+                zf = stack.enter_context(zipfile.ZipFile(fp))
+                fp = stack.enter_context(zf.open(self._find_zip_member(zf, self.member)))
+            yield fp
+
+    @contextlib.contextmanager
+    def _open_raw(self):
+        if isinstance(self.src, str):
+            with open(self.src, "rb") as fp:
+                yield fp
+        elif isinstance(self.src, io.BytesIO):
+            # read the underlying buffer directly
+            with self.src.getbuffer() as buf, buf[self.src_offset:] as buf_vmd:
+                yield VmdBufferReader(buf_vmd)
+        elif hasattr(self.src, "read"):
+            if self.src_offset == 0:
+                yield self.src
+            else:
+                yield VmdOffsetReader(self.src, self.src_offset)
+        else:
+            with memoryview(self.src) as buf:
+                yield VmdBufferReader(buf)
 
     def _seek(self, fp, part):
         # type: (io.BufferedReader, str) -> None
@@ -79,6 +188,45 @@ class VmdSimpleProfile:
         # type: (io.BufferedReader) -> int
         return self._FRAME_NUM_FORMAT.unpack(fp.read(self._FRAME_NUM_LEN))[0]
 
+    def _get_frame_nums(self, fp):
+        # type: (io.BufferedReader) -> dict[str, int]
+        # frame number of each section from header only, skipping the records
+        # (old files may end before morph, camera or light section)
+        self._seek(fp, "bone")
+        frame_nums = {}  # type: dict[str, int]
+        for section in self._SECTIONS:
+            raw = fp.read(self._FRAME_NUM_LEN)
+            if len(raw) < self._FRAME_NUM_LEN:
+                frame_nums[section] = 0
+                continue
+            frame_nums[section] = self._FRAME_NUM_FORMAT.unpack(raw)[0]
+            fp.seek(frame_nums[section] * self._RECORD_LEN[section], 1)
+        return frame_nums
+
+    def _get_frame_id_range(self, fp, section):
+        # type: (io.BufferedReader, str) -> tuple[int, int] | None
+        # min and max frame ids of a section by strided views over raw records,
+        # chunk by chunk without decoding, None if no frame
+        self._seek(fp, section)
+        frame_num = self._get_frame_num(fp)
+        record_len = self._RECORD_LEN[section]
+        frame_id_min, frame_id_max = None, None
+        for start in range(0, frame_num, self._SCAN_CHUNK_LEN):
+            chunk_num = min(self._SCAN_CHUNK_LEN, frame_num - start)
+            raw = fp.read(chunk_num * record_len)
+            if len(raw) < chunk_num * record_len:
+                raise ValueError("truncated %s section" % section)
+            frame_ids = np.ndarray(
+                (chunk_num,), dtype="<u4", buffer=raw,
+                offset=self._FRAME_ID_OFFSET[section], strides=(record_len,),
+            )
+            chunk_min, chunk_max = int(frame_ids.min()), int(frame_ids.max())
+            frame_id_min = chunk_min if frame_id_min is None else min(frame_id_min, chunk_min)
+            frame_id_max = chunk_max if frame_id_max is None else max(frame_id_max, chunk_max)
+        if frame_id_min is None:
+            return None
+        return frame_id_min, frame_id_max
+
     def _get_header_version(self, fp):
         # type: (io.BufferedReader) -> str
         header_version_raw = fp.read(self._VERSION_LEN)
@@ -94,76 +242,134 @@ class VmdSimpleProfile:
         bone_name_raw = fp.read(self._BONE_NAME_LEN)
         return self._decode_text(bone_name_raw)
 
-    def _get_bones_list(self, fp):
-        # type: (io.BufferedReader) -> dict[str, int]
+    def _get_bones_records(self, fp):
+        # type: (io.BufferedReader) -> np.ndarray
+        # decode the whole bones data block at once
         self._seek(fp, "bone")
         bone_frame_num = self._get_frame_num(fp)
+        raw = fp.read(bone_frame_num * self._BONE_LEN)
+        return np.frombuffer(raw, dtype=self._BONE_DTYPE, count=bone_frame_num)
+
+    def _get_bones_list(self, fp):
+        # type: (io.BufferedReader) -> dict[str, int]
+        records = self._get_bones_records(fp)
+        raw_names, raw_name_ids = np.unique(records["name"], return_inverse=True)
+        counts = np.bincount(raw_name_ids.ravel(), minlength=len(raw_names))
         bones_list = {}   # type: dict[str, int]
-        for _ in range(bone_frame_num):
-            bone_name = self._get_bone_name(fp)
-            if bone_name not in bones_list:
-                bones_list[bone_name] = 1
-            else:
-                bones_list[bone_name] += 1
-            # skip binary data
-            fp.seek(self._BONE_BIN_LEN, 1)
+        for raw_name, count in zip(raw_names, counts):
+            bone_name = self._decode_text(raw_name)
+            bones_list[bone_name] = bones_list.get(bone_name, 0) + int(count)
         return bones_list
 
+    def _get_motion_table(self, fp, required_bones_names=None):
+        # type: (io.BufferedReader, list[str] | None) -> VmdMotionTable
+        records = self._get_bones_records(fp)
+        # map bone name of each record to bone index
+        raw_names, raw_name_ids = np.unique(records["name"], return_inverse=True)
+        decoded_names = [self._decode_text(raw_name) for raw_name in raw_names]
+        if required_bones_names is None:
+            bones_names = list(dict.fromkeys(decoded_names))
+        else:
+            bones_names = list(required_bones_names)
+        name_to_id = {name: i for i, name in enumerate(bones_names)}
+        raw_to_id = np.array(
+            [name_to_id.get(name, -1) for name in decoded_names], dtype="int",
+        )
+        bone_ids = raw_to_id[raw_name_ids.ravel()]
+        # skip the bones which are not required
+        mask = bone_ids >= 0
+        if not mask.all():
+            records = records[mask]
+            bone_ids = bone_ids[mask]
+        interps = records["interp"]
+        return VmdMotionTable(
+            bones_names,
+            bone_ids,
+            frame_ids = records["frame_id"],
+            positions = records["position"],
+            orientations = records["orientation"],
+            curve_x = interps[:, 0:16:4],
+            curve_y = interps[:, 16:32:4],
+            curve_z = interps[:, 32:48:4],
+            curve_rot = interps[:, 48::4],
+        )
+
     def _get_desired_bones_data(self, fp, required_bones_names):
-        # type: (io.BufferedReader, list[str]) -> dict[str, VmdBoneData]
-        # initialize
-        data_dict = dict.fromkeys(required_bones_names)  # type: dict[str, VmdBoneData]
-        for bone_name in required_bones_names:
-            data_dict[bone_name] = VmdBoneData(bone_name)
-        # seek required bones in bones data block
-        self._seek(fp, "bone")
-        bone_frame_num = self._get_frame_num(fp)
-        for _ in range(bone_frame_num):
-            bone_name = self._get_bone_name(fp)
-            if bone_name not in data_dict:
-                # skip
-                fp.seek(self._BONE_BIN_LEN, 1)
-            else:
-                # decode binary data to numerical data
-                raw = self._BONE_FORMAT.unpack(fp.read(self._BONE_BIN_LEN))
-                data_dict[bone_name].append(
-                    frame_id =raw[0],
-                    position = raw[1:4],
-                    orientation = raw[4:8],
-                    curve_x = raw[ 8:24:4],
-                    curve_y = raw[24:40:4],
-                    curve_z = raw[40:56:4],
-                    curve_rot = raw[56::4],
-                )
-        # reindex
-        for bone_name in required_bones_names:
-            data_dict[bone_name].sort_frame()
-        return data_dict
+        # type: (io.BufferedReader, list[str]) -> dict[str, VmdBoneDataView]
+        motion_table = self._get_motion_table(fp, required_bones_names)
+        return motion_table.get_bones()
 
     def _get_camera_data(self, fp):
         # type: (io.BufferedReader) -> VmdCameraData
         self._seek(fp, "camera")
         camera_frame_num = self._get_frame_num(fp)
+        raw = fp.read(camera_frame_num * self._CAMERA_LEN)
+        records = np.frombuffer(raw, dtype=self._CAMERA_DTYPE, count=camera_frame_num)
         data = VmdCameraData(camera_frame_num)
-        for i in range(camera_frame_num):
-            raw = self._CAMERA_FORMAT.unpack(fp.read(self._CAMERA_LEN))
-            data.frame_ids[i] = raw[0]
-            data.distances[i] = raw[1]
-            data.positions[i] = raw[2:5]
-            data.orientations[i] = raw[5:8]
-            data.curve_x[i][[0,2,1,3]] = raw[ 8:12]
-            data.curve_y[i][[0,2,1,3]] = raw[12:16]
-            data.curve_z[i][[0,2,1,3]] = raw[16:20]
-            data.curve_rot[i][[0,2,1,3]] = raw[20:24]
-            data.curve_dis[i][[0,2,1,3]] = raw[24:28]
-            data.curve_fov[i][[0,2,1,3]] = raw[28:32]
-            data.fov_angles[i] = float(raw[32])
-            data.perspective_flags[i] = raw[33]
+        data.frame_ids[:] = records["frame_id"]
+        data.distances[:] = records["distance"]
+        data.positions[:] = records["position"]
+        data.orientations[:] = records["orientation"]
+        interps = records["interp"]
+        data.curve_x[:] = interps[:, 0:4][:, [0,2,1,3]]
+        data.curve_y[:] = interps[:, 4:8][:, [0,2,1,3]]
+        data.curve_z[:] = interps[:, 8:12][:, [0,2,1,3]]
+        data.curve_rot[:] = interps[:, 12:16][:, [0,2,1,3]]
+        data.curve_dis[:] = interps[:, 16:20][:, [0,2,1,3]]
+        data.curve_fov[:] = interps[:, 20:24][:, [0,2,1,3]]
+        data.fov_angles[:] = records["fov_angle"]
+        data.perspective_flags[:] = records["perspective_flag"]
         data.sort_frame()
         return data
 
+    @classmethod
+    def _get_zip_member_name(cls, info):
+        # type: (zipfile.ZipInfo) -> str
+        # name not flagged as utf-8 is usually in shift-jis (decoded as cp437 by zipfile)
+        if info.flag_bits & cls._ZIP_UTF8_FLAG:
+            return info.filename
+        try:
+            return info.filename.encode("cp437").decode(cls._CODING)
+        except UnicodeError:
+            return info.filename
+
+    @classmethod
+    def _find_zip_member(cls, zf, member=None):
+        # type: (zipfile.ZipFile, str | None) -> zipfile.ZipInfo
+        infos = {
+            cls._get_zip_member_name(info): info for info in zf.infolist() if not info.is_dir()
+        }
+        if member is not None:
+            if member not in infos:
+                raise ValueError("no member %s in zip archive" % member)
+            return infos[member]
+        # the only vmd file can be omitted
+        vmd_names = [name for name in infos if name.lower().endswith(cls._VMD_EXT)]
+        if len(vmd_names) != 1:
+            raise ValueError(
+                "member of zip archive has to be given among %d vmd files: %s"
+                % (len(vmd_names), ", ".join(vmd_names))
+            )
+        return infos[vmd_names[0]]
+
+    def read_members(self):
+        # type: () -> list[str]
+        # names of vmd files in zip archive
+        with self._open_raw() as fp:
+            fp.seek(0, 0)
+            if bytes(fp.read(self._MAGIC_LEN)).startswith(self._ZIP_MAGIC):
+                fp.seek(0, 0)
+                if isinstance(fp, VmdBufferReader):
+                    fp = io.BytesIO(fp.read())
+                with zipfile.ZipFile(fp) as zf:
+                    return [
+                        name for name in map(self._get_zip_member_name, zf.infolist())
+                            if name.lower().endswith(self._VMD_EXT)
+                    ]
+        return []
+
     def read_model_name(self):
-        with open(self.src, "rb") as fp:
+        with self._open() as fp:
             header_version = self._get_header_version(fp)
             model_name = self._get_model_name(fp, header_version)
             return model_name
@@ -172,90 +378,88 @@ class VmdSimpleProfile:
         model_name = self.read_model_name()
         return model_name.startswith(self._CAMERA_HEADER_NAME)
 
+    def read_frame_nums(self):
+        # type: () -> dict[str, int]
+        with self._open() as fp:
+            return self._get_frame_nums(fp)
+
+    def read_frame_id_range(self, section="bone"):
+        # type: (str) -> tuple[int, int] | None
+        with self._open() as fp:
+            return self._get_frame_id_range(fp, section)
+
+    def read_bones_list(self):
+        with self._open() as fp:
+            return self._get_bones_list(fp)
+
     def read_desired_bones(self, desired_bones_names):
-        with open(self.src, "rb") as fp:
+        with self._open() as fp:
             bone_data = self._get_desired_bones_data(fp, desired_bones_names)
             return bone_data
 
+    def read_motion_table(self, desired_bones_names=None):
+        with self._open() as fp:
+            return self._get_motion_table(fp, desired_bones_names)
+
     def read_camera(self):
-        with open(self.src, "rb") as fp:
+        with self._open() as fp:
             return self._get_camera_data(fp)
 
     @classmethod
     def write_bones(cls, dst, model_name, bones_data):
         # type: (str, str, dict[str, VmdBoneData]) -> None
-        with open(dst,"wb") as fp:
-            # header
-            version_header_raw = cls._encode_text(cls._NEW_VERSION_HEADER, cls._VERSION_LEN)
-            fp.write(version_header_raw)
-            # model name
-            model_name_len = cls._MODEL_NAME_LEN[cls._NEW_VERSION_HEADER]
-            model_name_raw = cls._encode_text(model_name, model_name_len)
-            fp.write(model_name_raw)
-            # bone
-            bones_frames_num = sum([len(b.frame_ids) for b in bones_data.values()])
-            fp.write(cls._FRAME_NUM_FORMAT.pack(bones_frames_num))
-            raw = [0] * cls._BONE_ATTR_NUM
-            for name, bone_data in bones_data.items():
-                name_raw = cls._encode_text(name, cls._BONE_NAME_LEN)
-                for i in range(len(bone_data.frame_ids)):
-                    fp.write(name_raw)
-                    raw[0] = bone_data.frame_ids[i]
-                    raw[1:4] = bone_data.positions[i]
-                    raw[4:8] = bone_data.orientations[i]
-                    raw[ 8:24:4] = bone_data.curve_x[i]
-                    raw[24:40:4] = bone_data.curve_y[i]
-                    raw[40:56:4] = bone_data.curve_z[i]
-                    raw[56::4] = bone_data.curve_rot[i]
-                    fp.write(cls._BONE_FORMAT.pack(*raw))
-            # morph
-            fp.write(cls._FRAME_NUM_FORMAT.pack(0))
-            # camera
-            fp.write(cls._FRAME_NUM_FORMAT.pack(0))
-            # light
-            fp.write(cls._FRAME_NUM_FORMAT.pack(0))
+        bones_frames_num = sum([len(b.frame_ids) for b in bones_data.values()])
+        with VmdStreamWriter(dst, model_name, bone_frame_num=bones_frames_num) as writer:
+            writer.write_bone_chunks(bones_data.items())
 
     @classmethod
     def write_camera(cls, dst, camera_data):
         # type: (str, VmdCameraData) -> None
-        with open(dst,"wb") as fp:
-            # header
-            version_header_raw = cls._encode_text(cls._NEW_VERSION_HEADER, cls._VERSION_LEN)
-            fp.write(version_header_raw)
-            # model name
-            model_name_len = cls._MODEL_NAME_LEN[cls._NEW_VERSION_HEADER]
-            model_name_raw = cls._encode_text(cls._CAMERA_HEADER_NAME, model_name_len)
-            fp.write(model_name_raw)
-            # bone
-            fp.write(cls._FRAME_NUM_FORMAT.pack(0))
-            # morph
-            fp.write(cls._FRAME_NUM_FORMAT.pack(0))
-            # camera
-            frame_num = camera_data.get_frame_num()
-            fp.write(cls._FRAME_NUM_FORMAT.pack(frame_num))
-            raw = [0] * cls._CAMERA_ATTR_NUM
-            for i in range(frame_num):
-                raw[0] = camera_data.frame_ids[i]
-                raw[1] = camera_data.distances[i]
-                raw[2:5] = camera_data.positions[i]
-                raw[5:8] = camera_data.orientations[i]
-                raw[ 8:12] = camera_data.curve_x[i][[0,2,1,3]]
-                raw[12:16] = camera_data.curve_y[i][[0,2,1,3]]
-                raw[16:20] = camera_data.curve_z[i][[0,2,1,3]]
-                raw[20:24] = camera_data.curve_rot[i][[0,2,1,3]]
-                raw[24:28] = camera_data.curve_dis[i][[0,2,1,3]]
-                raw[28:32] = camera_data.curve_fov[i][[0,2,1,3]]
-                raw[32] = int(round(camera_data.fov_angles[i]))
-                raw[33] = camera_data.perspective_flags[i]
-                fp.write(cls._CAMERA_FORMAT.pack(*raw))
-            # light
-            fp.write(cls._FRAME_NUM_FORMAT.pack(0))
+        with VmdStreamWriter(
+                dst, cls._CAMERA_HEADER_NAME,
+                bone_frame_num=0, camera_frame_num=camera_data.get_frame_num(),
+            ) as writer:
+            writer.write_camera(camera_data)
+
+    @classmethod
+    def _pack_bone_records(cls, name, bone_data):
+        # type: (str, VmdBoneData) -> bytes
+        records = np.zeros(len(bone_data.frame_ids), dtype=cls._BONE_DTYPE)
+        records["name"] = cls._encode_text(name, cls._BONE_NAME_LEN)
+        records["frame_id"] = bone_data.frame_ids
+        records["position"] = bone_data.positions
+        records["orientation"] = bone_data.orientations
+        interps = records["interp"]
+        interps[:, 0:16:4] = bone_data.curve_x
+        interps[:, 16:32:4] = bone_data.curve_y
+        interps[:, 32:48:4] = bone_data.curve_z
+        interps[:, 48::4] = bone_data.curve_rot
+        return records.tobytes()
+
+    @classmethod
+    def _pack_camera_records(cls, camera_data):
+        # type: (VmdCameraData) -> bytes
+        records = np.zeros(len(camera_data.frame_ids), dtype=cls._CAMERA_DTYPE)
+        records["frame_id"] = camera_data.frame_ids
+        records["distance"] = camera_data.distances
+        records["position"] = camera_data.positions
+        records["orientation"] = camera_data.orientations
+        interps = records["interp"]
+        interps[:, 0:4] = camera_data.curve_x[:, [0,2,1,3]]
+        interps[:, 4:8] = camera_data.curve_y[:, [0,2,1,3]]
+        interps[:, 8:12] = camera_data.curve_z[:, [0,2,1,3]]
+        interps[:, 12:16] = camera_data.curve_rot[:, [0,2,1,3]]
+        interps[:, 16:20] = camera_data.curve_dis[:, [0,2,1,3]]
+        interps[:, 20:24] = camera_data.curve_fov[:, [0,2,1,3]]
+        records["fov_angle"] = np.round(camera_data.fov_angles)
+        records["perspective_flag"] = camera_data.perspective_flags
+        return records.tobytes()
 
     @classmethod
     def _decode_text(cls, raw):
         # type: (bytes) -> str
         # ignore the string behind "\x00"
-        raw = raw.split(b"\x00")[0]
+        raw = bytes(raw).split(b"\x00")[0]
         # convert bytes to string
         text = raw.decode(cls._CODING)
         return text
@@ -270,6 +474,228 @@ class VmdSimpleProfile:
         return raw
 
 
+class VmdBufferReader(object):
+
+    # file-like reader over a memory buffer, which returns slices without copy
+
+    __slots__ = ("_buf", "_loc")
+
+    def __init__(self, buf):
+        # type: (memoryview) -> None
+        self._buf = buf.cast("B") if buf.format != "B" or buf.ndim != 1 else buf
+        self._loc = 0
+
+    def read(self, size=-1):
+        # type: (int) -> memoryview
+        loc_end = len(self._buf) if size < 0 else min(self._loc + size, len(self._buf))
+        raw = self._buf[self._loc:loc_end]
+        self._loc = loc_end
+        return raw
+
+    def seek(self, offset, whence=0):
+        # type: (int, int) -> int
+        if whence == 0:
+            self._loc = offset
+        elif whence == 1:
+            self._loc += offset
+        else:
+            self._loc = len(self._buf) + offset
+        return self._loc
+
+    def tell(self):
+        # type: () -> int
+        return self._loc
+
+
+class VmdOffsetReader(object):
+
+    # file-like reader over a seekable file object whose vmd data starts at offset,
+    # so that vmd data is read as if it starts at 0
+
+    __slots__ = ("_fp", "_offset")
+
+    def __init__(self, fp, offset):
+        # type: (io.IOBase, int) -> None
+        self._fp = fp
+        self._offset = offset
+
+    def read(self, size=-1):
+        # type: (int) -> bytes
+        return self._fp.read(size)
+
+    def seek(self, offset, whence=0):
+        # type: (int, int) -> int
+        if whence == 0:
+            offset += self._offset
+        return self._fp.seek(offset, whence) - self._offset
+
+    def tell(self):
+        # type: () -> int
+        return self._fp.tell() - self._offset
+
+    def seekable(self):
+        return True
+
+
+class VmdStreamWriter(object):
+
+    # write vmd file section by section with chunks of frames,
+    # the frame number of each section is patched when the section is finished
+    # unless it is given in advance (required for non-seekable stream)
+
+    _SECTIONS = ["bone", "morph", "camera", "light"]
+    # same as zip, which is much faster than the default of gzip with similar size
+    _GZIP_LEVEL = 6
+
+    def __init__(self, dst, model_name, bone_frame_num=None, camera_frame_num=None):
+        # type: (str | io.RawIOBase, str, int | None, int | None) -> None
+        self._fp_stack = contextlib.ExitStack()
+        if isinstance(dst, str):
+            self._fp, is_compressed = self._open_path(dst)
+            self._need_close_fp = True
+        else:
+            self._fp, is_compressed = dst, False
+            self._need_close_fp = False
+        # compressed stream can't be patched
+        self._seekable = self._fp.seekable() and not is_compressed
+        self._frame_num_given = {
+            "bone": bone_frame_num,
+            "morph": 0,
+            "camera": camera_frame_num,
+            "light": 0,
+        }  # type: dict[str, int | None]
+        self._section_index = 0
+        self._section_frame_num = 0
+        self._section_frame_num_loc = 0
+        self._closed = False
+        # header
+        self._fp.write(VmdSimpleProfile._encode_text(
+            VmdSimpleProfile._NEW_VERSION_HEADER, VmdSimpleProfile._VERSION_LEN,
+        ))
+        # model name
+        self._fp.write(VmdSimpleProfile._encode_text(
+            model_name,
+            VmdSimpleProfile._MODEL_NAME_LEN[VmdSimpleProfile._NEW_VERSION_HEADER],
+        ))
+        self._begin_section()
+
+    def _open_path(self, dst):
+        # type: (str) -> tuple[io.IOBase, bool]
+        # compressed by the extension of path, where zip archive has a vmd file
+        # named after the archive
+        root, ext = os.path.splitext(dst)
+        ext = ext.lower()
+        if ext == ".gz":
+            return self._fp_stack.enter_context(
+                gzip.open(dst, "wb", compresslevel=self._GZIP_LEVEL),
+            ), True
+        if ext == ".xz":
+            return self._fp_stack.enter_context(lzma.open(dst, "wb")), True
+        if ext == VmdSimpleProfile._ZIP_EXT:
+            zf = self._fp_stack.enter_context(
+                zipfile.ZipFile(dst, "w", compression=zipfile.ZIP_DEFLATED),
+            )
+            member = os.path.basename(root)
+            if not member.lower().endswith(VmdSimpleProfile._VMD_EXT):
+                member += VmdSimpleProfile._VMD_EXT
+            return self._fp_stack.enter_context(zf.open(member, "w")), True
+        return self._fp_stack.enter_context(open(dst, "wb")), False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._need_close_fp:
+            self._fp_stack.close()
+
+    def write_bone(self, name, bone_data):
+        # type: (str, VmdBoneData) -> None
+        self._goto_section("bone")
+        self._fp.write(VmdSimpleProfile._pack_bone_records(name, bone_data))
+        self._section_frame_num += len(bone_data.frame_ids)
+
+    def write_bone_chunks(self, chunks):
+        # type: (Iterable[tuple[str, VmdBoneData]]) -> None
+        for name, bone_data in chunks:
+            self.write_bone(name, bone_data)
+
+    def write_camera(self, camera_data):
+        # type: (VmdCameraData) -> None
+        self._goto_section("camera")
+        self._fp.write(VmdSimpleProfile._pack_camera_records(camera_data))
+        self._section_frame_num += len(camera_data.frame_ids)
+
+    def write_camera_chunks(self, chunks):
+        # type: (Iterable[VmdCameraData]) -> None
+        for camera_data in chunks:
+            self.write_camera(camera_data)
+
+    def close(self):
+        if self._closed:
+            return
+        # finish all remaining sections
+        self._goto_section(None)
+        self._fp.flush()
+        if self._need_close_fp:
+            self._fp_stack.close()
+        self._closed = True
+
+    def _goto_section(self, section):
+        # type: (str | None) -> None
+        if self._closed:
+            raise ValueError("write to closed vmd writer")
+        if section is None:
+            target_index = len(self._SECTIONS)
+        else:
+            target_index = self._SECTIONS.index(section)
+        if target_index < self._section_index:
+            raise ValueError(
+                "section '%s' has been finished, vmd sections must be written in order: %s"
+                % (section, ", ".join(self._SECTIONS))
+            )
+        while self._section_index < target_index:
+            self._end_section()
+            self._section_index += 1
+            if self._section_index < len(self._SECTIONS):
+                # the section is skipped if it isn't the target
+                self._begin_section(is_empty=self._section_index < target_index)
+
+    def _begin_section(self, is_empty=False):
+        # type: (bool) -> None
+        section = self._SECTIONS[self._section_index]
+        if is_empty and self._frame_num_given[section] is None:
+            self._frame_num_given[section] = 0
+        frame_num_given = self._frame_num_given[section]
+        if frame_num_given is None:
+            if not self._seekable:
+                raise ValueError(
+                    "frame number of section '%s' is required for non-seekable stream"
+                    % section
+                )
+            # placeholder which will be patched at the end of section
+            self._section_frame_num_loc = self._fp.tell()
+            frame_num_given = 0
+        self._fp.write(VmdSimpleProfile._FRAME_NUM_FORMAT.pack(frame_num_given))
+        self._section_frame_num = 0
+
+    def _end_section(self):
+        section = self._SECTIONS[self._section_index]
+        frame_num_given = self._frame_num_given[section]
+        if frame_num_given is None:
+            # patch frame number
+            loc_end = self._fp.tell()
+            self._fp.seek(self._section_frame_num_loc)
+            self._fp.write(VmdSimpleProfile._FRAME_NUM_FORMAT.pack(self._section_frame_num))
+            self._fp.seek(loc_end)
+        elif frame_num_given != self._section_frame_num:
+            raise ValueError(
+                "%d frames are written to section '%s' but %d frames are given"
+                % (self._section_frame_num, section, frame_num_given)
+            )
+
+
 class VmdDataBase(object):
 
     _CURVE_DEFAULT = np.array([20, 20, 107, 107])
@@ -278,10 +704,12 @@ class VmdDataBase(object):
     def sort_frame(self):
         # order of vmd frame data is along the order the registration instead of time
         # but to process them, it has better to be sorted along time
-        sort_order = np.argsort(self.frame_ids)
-        for member_name, member_value in self.__dict__.items():
-            if type(member_value) is np.ndarray:
-                member_value[:] = member_value[sort_order]
+        # (stable for duplicated frames, and replace arrays instead of modifying
+        # them in place, since they might be shared with others)
+        sort_order = np.argsort(self.frame_ids, kind="stable")
+        for member_name, member_value in list(self.__dict__.items()):
+            if isinstance(member_value, np.ndarray):
+                setattr(self, member_name, member_value[sort_order])
 
     def get_frame_num(self):
         return len(self.frame_ids)
@@ -298,8 +726,8 @@ class VmdDataBase(object):
 
     def apply_mask(self, mask):
         # type: (np.ndarray) -> None
-        for member_name, member_value in self.__dict__.items():
-            if type(member_value) is np.ndarray:
+        for member_name, member_value in list(self.__dict__.items()):
+            if isinstance(member_value, np.ndarray):
                 setattr(self, member_name, member_value[mask])
 
 
@@ -369,3 +797,144 @@ class VmdBoneData(VmdDataBase):
                 setattr(self, member_name, np.array(member_value))
         # sort numpy array along frame_ids
         VmdDataBase.sort_frame(self)
+
+
+class VmdBoneDataView(object):
+
+    # per-bone view of VmdMotionTable, which has the same members as VmdBoneData
+    # and its methods except the ones growing frames (allocate, append)
+    __slots__ = (
+        "name",
+        "frame_ids",
+        "positions",
+        "orientations",
+        "curve_x",
+        "curve_y",
+        "curve_z",
+        "curve_rot",
+    )
+
+    def __init__(self, name, motion_table, start, stop):
+        # type: (str, VmdMotionTable, int, int) -> None
+        self.name = name
+        self.frame_ids = motion_table.frame_ids[start:stop]
+        self.positions = motion_table.positions[start:stop]
+        self.orientations = motion_table.orientations[start:stop]
+        self.curve_x = motion_table.curve_x[start:stop]
+        self.curve_y = motion_table.curve_y[start:stop]
+        self.curve_z = motion_table.curve_z[start:stop]
+        self.curve_rot = motion_table.curve_rot[start:stop]
+
+    def get_frame_num(self):
+        return len(self.frame_ids)
+
+    def sort_frame(self):
+        # the same as VmdBoneData, which replaces the views by sorted copies
+        # instead of modifying the table
+        sort_order = np.argsort(self.frame_ids, kind="stable")
+        self.apply_mask(sort_order)
+
+    def apply_mask(self, mask):
+        # type: (np.ndarray) -> None
+        for member_name in self.__slots__[1:]:
+            setattr(self, member_name, getattr(self, member_name)[mask])
+
+    def to_bone_data(self):
+        # type: () -> VmdBoneData
+        # copy to modifiable bone data
+        bone_data = VmdBoneData(self.name, self.get_frame_num())
+        for member_name in self.__slots__[1:]:
+            getattr(bone_data, member_name)[:] = getattr(self, member_name)
+        return bone_data
+
+
+class VmdMotionTable(object):
+
+    # keyframes of all bones stored in contiguous arrays,
+    # which are sorted along (bone, frame) so that each bone is a continuous block
+    __slots__ = (
+        "names",
+        "bone_ids",
+        "frame_ids",
+        "positions",
+        "orientations",
+        "curve_x",
+        "curve_y",
+        "curve_z",
+        "curve_rot",
+        "offsets",
+    )
+
+    def __init__(self,
+        names,
+        bone_ids,
+        frame_ids,
+        positions,
+        orientations,
+        curve_x,
+        curve_y,
+        curve_z,
+        curve_rot,
+        ):
+        # type: (list[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray) -> None
+        self.names = list(names)  # type: list[str]
+        # sort once (stable for duplicated frames)
+        sort_order = np.lexsort((frame_ids, bone_ids))
+        # (indexing copies, so dtype is converted without another copy if it matches)
+        self.bone_ids = np.asarray(bone_ids)[sort_order].astype("int", copy=False)
+        self.frame_ids = np.asarray(frame_ids)[sort_order].astype("int", copy=False)
+        self.positions = np.asarray(positions)[sort_order].astype("float", copy=False)
+        self.orientations = np.asarray(orientations)[sort_order].astype("float", copy=False)
+        self.curve_x = np.asarray(curve_x)[sort_order].astype("int", copy=False)
+        self.curve_y = np.asarray(curve_y)[sort_order].astype("int", copy=False)
+        self.curve_z = np.asarray(curve_z)[sort_order].astype("int", copy=False)
+        self.curve_rot = np.asarray(curve_rot)[sort_order].astype("int", copy=False)
+        # keyframes of i-th bone are in offsets[i] ~ offsets[i+1]-1
+        self.offsets = np.searchsorted(self.bone_ids, np.arange(len(self.names)+1))
+
+    @classmethod
+    def from_sorted(cls,
+        names,
+        bone_ids,
+        frame_ids,
+        positions,
+        orientations,
+        curve_x,
+        curve_y,
+        curve_z,
+        curve_rot,
+        offsets,
+        ):
+        # type: (list[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray) -> VmdMotionTable
+        # wrap arrays already sorted along (bone, frame) without copy,
+        # e.g. memory-mapped arrays
+        motion_table = cls.__new__(cls)
+        motion_table.names = list(names)
+        motion_table.bone_ids = bone_ids
+        motion_table.frame_ids = frame_ids
+        motion_table.positions = positions
+        motion_table.orientations = orientations
+        motion_table.curve_x = curve_x
+        motion_table.curve_y = curve_y
+        motion_table.curve_z = curve_z
+        motion_table.curve_rot = curve_rot
+        motion_table.offsets = offsets
+        return motion_table
+
+    def get_frame_num(self):
+        return len(self.frame_ids)
+
+    def get_bone(self, name):
+        # type: (str) -> VmdBoneDataView
+        # empty bone if not in the table, the same as bones not in vmd file
+        if name not in self.names:
+            return VmdBoneDataView(name, self, 0, 0)
+        i = self.names.index(name)
+        return VmdBoneDataView(name, self, self.offsets[i], self.offsets[i+1])
+
+    def get_bones(self):
+        # type: () -> dict[str, VmdBoneDataView]
+        return {
+            name: VmdBoneDataView(name, self, self.offsets[i], self.offsets[i+1])
+                for i, name in enumerate(self.names)
+        }
@@ -0,0 +1,30 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# the package at the root of repository, and the tools which are scripts
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT_DIR, os.path.join(ROOT_DIR, "tools")]
+
+# compiled kernels are optional, and their tests are skipped without numba
+HAS_NUMBA = importlib.util.find_spec("numba") is not None
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "requires_numba: test of compiled kernels, skipped without numba")
+
+
+def pytest_report_header(config):
+    if not HAS_NUMBA:
+        return "numba: not installed, tests marked requires_numba are skipped (pip install numba)"
+
+
+def pytest_collection_modifyitems(config, items):
+    if HAS_NUMBA:
+        return
+    skip_numba = pytest.mark.skip(reason="requires numba (pip install numba)")
+    for item in items:
+        if "requires_numba" in item.keywords:
+            item.add_marker(skip_numba)
@@ -0,0 +1,55 @@
+import numpy as np
+
+from mmd_vmd_interpolation.vmd_profile import (
+    VmdBoneData,
+    VmdCameraData,
+)
+
+# random data shared by tests
+
+BONES_LIST = [
+    ("center", None, np.array([0.0, 8.0, 0.0])),
+    ("upper", "center", np.array([0.0, 10.0, 0.0])),
+    ("head", "upper", np.array([0.0, 15.0, 0.0])),
+]
+
+
+def gen_random_bone(name, rng, frame_num=40):
+    # type: (str, np.random.RandomState, int) -> VmdBoneData
+    bone_data = VmdBoneData(name, frame_num)
+    bone_data.frame_ids = np.cumsum(rng.randint(1, 8, frame_num)) - 1
+    bone_data.positions = rng.randn(frame_num, 3)
+    orientations = rng.randn(frame_num, 4)
+    bone_data.orientations = orientations / np.linalg.norm(orientations, axis=1, keepdims=True)
+    for attr in ["curve_x", "curve_y", "curve_z", "curve_rot"]:
+        setattr(bone_data, attr, rng.randint(0, 128, (frame_num, 4)))
+    return bone_data
+
+
+def gen_random_camera(rng, frame_num=40):
+    # type: (np.random.RandomState, int) -> VmdCameraData
+    camera_data = VmdCameraData(frame_num)
+    camera_data.frame_ids = np.cumsum(rng.randint(1, 8, frame_num)) - 1
+    camera_data.positions = rng.randn(frame_num, 3)
+    camera_data.orientations = rng.randn(frame_num, 3)
+    camera_data.distances = rng.randn(frame_num)
+    camera_data.fov_angles = rng.randint(20, 40, frame_num).astype("float")
+    for attr in ["curve_x", "curve_y", "curve_z", "curve_rot", "curve_dis", "curve_fov"]:
+        setattr(camera_data, attr, rng.randint(0, 128, (frame_num, 4)))
+    return camera_data
+
+
+CAMERA_MEMBERS = ["frame_ids", "distances", "positions", "orientations", "fov_angles", "perspective_flags"]
+
+
+def gen_camera_with_cuts(rng, frame_num=200):
+    camera_data = gen_random_camera(rng, frame_num)
+    # some camera cuts (keyframes in adjacent frames) split segments
+    frame_ids = np.cumsum(rng.choice([1, 3, 5, 8], frame_num)) - 1
+    camera_data.frame_ids = frame_ids
+    return camera_data
+
+
+def assert_camera_equal(camera_data, camera_expected):
+    for member_name in CAMERA_MEMBERS:
+        np.testing.assert_array_equal(getattr(camera_data, member_name), getattr(camera_expected, member_name))
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from mmd_vmd_interpolation.bone_tracing_camera_job import (
+    generate_bone_tracing_camera_data,
+    generate_bone_tracing_camera_data_sweep,
+    get_dancer_bones_list,
+)
+from mmd_vmd_interpolation.bones_pose_calculator import (
+    BonesPoseCalculator,
+    BonesTree,
+)
+from mmd_vmd_interpolation.camera_trace_bone import CameraTracer
+from mmd_vmd_interpolation.vmd_profile import VmdSimpleProfile
+from sample_data import gen_random_bone, gen_random_camera
+
+
+@pytest.fixture
+def src_files(tmp_path):
+    rng = np.random.RandomState(0)
+    src_camera = str(tmp_path / "camera.vmd")
+    VmdSimpleProfile.write_camera(src_camera, gen_random_camera(rng, 30))
+    src_bone = str(tmp_path / "bone.vmd")
+    VmdSimpleProfile.write_bones(src_bone, "model", {
+        name: gen_random_bone(name, rng, 30) for name in ["head", "center"]
+    })
+    return src_camera, src_bone
+
+
+def assert_camera_file_equal(path, path_expected):
+    camera_data = VmdSimpleProfile(path).read_camera()
+    camera_expected = VmdSimpleProfile(path_expected).read_camera()
+    np.testing.assert_array_equal(camera_data.frame_ids, camera_expected.frame_ids)
+    np.testing.assert_allclose(camera_data.positions, camera_expected.positions, atol=1e-4)
+    np.testing.assert_allclose(camera_data.orientations, camera_expected.orientations, atol=1e-4)
+    np.testing.assert_allclose(camera_data.distances, camera_expected.distances, atol=1e-4)
+
+
+def test_sweep_agrees_with_single_runs(src_files, tmp_path):
+    src_camera, src_bone = src_files
+    generate_bone_tracing_camera_data_sweep(
+        src_camera, str(tmp_path / "sweep.vmd"),
+        src_nonrotatable_bone=src_bone,
+        trace_bone_names=["head", "center"],
+        interp_frame_intervals=[2, 3],
+        motion_time_delays=[0.0, 0.2],
+        camera_shake_intervals=[1.0],
+        camera_shake_amplitudes=[0.0, 0.1],
+        seed=1,
+    )
+    for interp_frame_interval in [2, 3]:
+        for trace_bone_name in ["head", "center"]:
+            for motion_time_delay in [0.0, 0.2]:
+                for camera_shake_amplitude in [0.0, 0.1]:
+                    dst = str(tmp_path / "single.vmd")
+                    generate_bone_tracing_camera_data(
+                        src_camera, dst,
+                        src_nonrotatable_bone=src_bone,
+                        trace_bone_name=trace_bone_name,
+                        interp_frame_interval=interp_frame_interval,
+                        motion_time_delay=motion_time_delay,
+                        camera_shake_interval=1.0,
+                        camera_shake_amplitude=camera_shake_amplitude,
+                        seed=1,
+                    )
+                    dst_sweep = str(tmp_path / ("sweep_i-%d_b-%s_d-%s_sa-%s.vmd" % (
+                        interp_frame_interval, trace_bone_name, motion_time_delay,
+                        camera_shake_amplitude,
+                    )))
+                    assert_camera_file_equal(dst_sweep, dst)
+
+
+@pytest.fixture
+def dancer_files(tmp_path):
+    rng = np.random.RandomState(2)
+    _, bones_list = get_dancer_bones_list("頭")
+    src_dancers = []
+    for i in range(2):
+        src_dancer = str(tmp_path / ("dancer_%d.vmd" % i))
+        VmdSimpleProfile.write_bones(src_dancer, "dancer %d" % i, {
+            name: gen_random_bone(name, rng, 10) for name, _, _ in bones_list
+        })
+        src_dancers.append(src_dancer)
+    return src_dancers, bones_list
+
+
+@pytest.mark.parametrize("thread_num", [1, 2])
+def test_dancers_agree_with_their_centroid(src_files, dancer_files, tmp_path, thread_num):
+    src_camera, _ = src_files
+    src_dancers, bones_list = dancer_files
+    dancer_weights = [1.0, 3.0]
+    dst = str(tmp_path / "dancers.vmd")
+    generate_bone_tracing_camera_data(
+        src_camera, dst, trace_bone_name="頭", camera_shake_interval=0.0,
+        src_dancers=src_dancers, dancer_weights=dancer_weights, thread_num=thread_num,
+    )
+    # centroid of dancers at every frame, traced as a single bone
+    frame_ids = np.arange(200)
+    dancers_bone = []
+    for src_dancer in src_dancers:
+        bones_data = VmdSimpleProfile(src_dancer).read_desired_bones([name for name, _, _ in bones_list])
+        bpc = BonesPoseCalculator(bones_data, BonesTree.get(bones_list))
+        dancers_bone.append(bpc.get_pose_bone_at("頭", frame_ids))
+    bone_data = CameraTracer.blend_bones(dancers_bone, frame_ids, dancer_weights)
+    bone_data.name = "頭"
+    src_bone = str(tmp_path / "centroid.vmd")
+    VmdSimpleProfile.write_bones(src_bone, "centroid", {"頭": bone_data})
+    dst_expected = str(tmp_path / "centroid_traced.vmd")
+    generate_bone_tracing_camera_data(
+        src_camera, dst_expected, trace_bone_name="頭", camera_shake_interval=0.0,
+        src_nonrotatable_bone=src_bone,
+    )
+    assert_camera_file_equal(dst, dst_expected)
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from mmd_vmd_interpolation.bones_pose_calculator import (
+    BonesPoseCalculator,
+    BonesTree,
+)
+from mmd_vmd_interpolation.vmd_profile import VmdBoneData
+from sample_data import BONES_LIST, gen_random_bone
+
+
+def gen_constant_bone(name, frame_ids):
+    # type: (str, list[int]) -> VmdBoneData
+    bone_data = VmdBoneData(name, len(frame_ids))
+    bone_data.frame_ids = np.array(frame_ids)
+    bone_data.positions[:] = [1.0, 2.0, 3.0]
+    bone_data.orientations[:] = [0.0, 0.6, 0.0, 0.8]
+    return bone_data
+
+
+@pytest.mark.parametrize("frame_ids, is_constant", [
+    ([0, 20, 49], True),
+    ([0, 49, 50], True),
+    ([0, 30], False),  # trailing gap
+    ([10, 49], False),  # leading gap
+    ([20], True),
+])
+def test_constant_bone_agrees_with_interpolated_one(frame_ids, is_constant):
+    rng = np.random.RandomState(0)
+    center = gen_random_bone("center", rng, 11)
+    center.frame_ids = np.arange(0, 51, 5)
+    bones_data = {
+        "center": center,
+        "upper": gen_constant_bone("upper", frame_ids),
+        "head": gen_random_bone("head", rng, 11),
+    }
+    bones_data["head"].frame_ids = center.frame_ids
+    bpc = BonesPoseCalculator(bones_data, BonesTree.get(BONES_LIST))
+    upper_full = bpc.get_full_interp_bones(["upper"])["upper"]
+    assert BonesPoseCalculator._check_is_constant_full_bone(upper_full) == is_constant
+    # the value where keyframes are interpolated, default out of them,
+    # and the last keyframe at the last frame of timeline
+    full_frame_ids = upper_full.frame_ids
+    is_default = (full_frame_ids < frame_ids[0]) | (full_frame_ids >= frame_ids[-1])
+    if len(frame_ids) == 1:
+        is_default[:] = False
+    is_default[-1] = False
+    positions_expected = np.where(is_default[:, None], 0.0, [[1.0, 2.0, 3.0]])
+    orientations_expected = np.where(is_default[:, None], [[0.0, 0.0, 0.0, 1.0]], [[0.0, 0.6, 0.0, 0.8]])
+    np.testing.assert_allclose(upper_full.positions, positions_expected, atol=1e-12)
+    np.testing.assert_allclose(upper_full.orientations, orientations_expected, atol=1e-12)
+    # evaluation at frames of timeline, and poses of the descendant
+    upper_at = bpc._get_timeline_interp_bone_at("upper", full_frame_ids)
+    np.testing.assert_allclose(upper_at.positions, upper_full.positions, atol=1e-12)
+    np.testing.assert_allclose(upper_at.orientations, upper_full.orientations, atol=1e-12)
+    head_full = bpc.get_full_pose_bones(["head"])["head"]
+    head_at = bpc._get_timeline_pose_bones_at(["head"], full_frame_ids)["head"]
+    np.testing.assert_allclose(head_at.positions, head_full.positions, atol=1e-9)
+
+
+@pytest.mark.parametrize("time_delay", [0.0, 0.3])
+def test_cache_counts_each_array_once(time_delay):
+    rng = np.random.RandomState(1)
+    bones_data = {name: gen_random_bone(name, rng) for name, _, _ in BONES_LIST}
+    bpc = BonesPoseCalculator(bones_data, BonesTree.get(BONES_LIST))
+    bones_pose = bpc.get_full_pose_bones()
+    bones_lpf = bpc.get_lpf_full_positions_bones(time_delay)
+    arrays = {}
+    for bones in [bpc.get_full_interp_bones(), bones_pose, bones_lpf]:
+        for bone in bones.values():
+            for x in [bone.positions, bone.orientations]:
+                if x.strides[0]:
+                    arrays[id(x)] = x
+    assert bpc.get_cache_stats()["bytes"] == sum([x.nbytes for x in arrays.values()])
+    # root bone is the same as its interpolated bone
+    assert bones_pose["center"] is bpc.get_full_interp_bones(["center"])["center"]
+
+
+def test_coarse_poses_within_position_error_bounds():
+    rng = np.random.RandomState(2)
+    bones_data = {name: gen_random_bone(name, rng) for name, _, _ in BONES_LIST}
+    bpc = BonesPoseCalculator(bones_data, BonesTree.get(BONES_LIST))
+    for easing_table_size in [4, 32]:
+        error_bounds = bpc.get_position_error_bounds(easing_table_size)
+        bones_coarse = bpc.get_coarse_pose_bones(1, easing_table_size)
+        for name, bone_coarse in bones_coarse.items():
+            bone_exact = bpc.get_pose_bone_at(name, bone_coarse.frame_ids)
+            error = np.linalg.norm(bone_coarse.positions - bone_exact.positions, axis=1).max()
+            assert 0 < error <= error_bounds[name]
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from mmd_vmd_interpolation.camera_trace_bone import (
+    CameraSmoother,
+    CameraTracer,
+)
+from sample_data import assert_camera_equal, gen_camera_with_cuts, gen_random_bone
+
+
+@pytest.mark.parametrize("need_smooth", [True, False])
+def test_interp_with_threads_agrees_with_sequential(need_smooth):
+    camera_data = gen_camera_with_cuts(np.random.RandomState(0))
+    camera_expected = CameraSmoother(camera_data).interp(need_smooth, True)
+    for thread_num, batch_size in [(1, 4), (4, 1), (4, 7), (8, 64)]:
+        cs = CameraSmoother(camera_data, thread_num=thread_num, batch_size=batch_size)
+        assert_camera_equal(cs.interp(need_smooth, True), camera_expected)
+
+
+@pytest.mark.parametrize("need_smooth", [True, False])
+def test_incremental_interp_agrees_with_full(need_smooth):
+    rng = np.random.RandomState(1)
+    camera_data = gen_camera_with_cuts(rng)
+    result_prev = CameraSmoother(camera_data).interp_result(need_smooth)
+    # edit a keyframe, and insert a camera cut
+    camera_edited = gen_camera_with_cuts(np.random.RandomState(1))
+    camera_edited.positions[50] += 1.0
+    camera_edited.frame_ids[120:] += 2
+    camera_edited.frame_ids[121:] -= 1
+    camera_expected = CameraSmoother(camera_edited).interp(need_smooth)
+    cs = CameraSmoother(camera_edited)
+    result = cs.interp_result(need_smooth, previous=result_prev)
+    assert_camera_equal(result.camera_data, camera_expected)
+    # unchanged keyframes reuse everything, and the smoother keeps nothing of previous run
+    assert_camera_equal(cs.interp_result(need_smooth, previous=result).camera_data, camera_expected)
+    assert_camera_equal(cs.interp_result(need_smooth, previous=result_prev).camera_data, camera_expected)
+    # result of different parameters isn't reused
+    assert_camera_equal(
+        cs.interp_result(not need_smooth, previous=result).camera_data,
+        CameraSmoother(camera_edited).interp(not need_smooth),
+    )
+
+
+@pytest.mark.parametrize("need_smooth", [True, False])
+def test_progressive_interp_within_error_bounds(need_smooth):
+    camera_data = gen_camera_with_cuts(np.random.RandomState(2))
+    cs = CameraSmoother(camera_data)
+    frame_ids = cs._interp_fram_ids
+    camera_exact = cs.interp_at(frame_ids, need_smooth)
+    results = list(cs.interp_progressive(need_smooth, frame_strides=[16, 8, 1]))
+    assert len(results) == 3
+    for camera_coarse, error_bounds in results[:-1]:
+        for name, error_bound in error_bounds.items():
+            values_coarse = getattr(camera_coarse, name).astype("float").reshape(camera_coarse.get_frame_num(), -1)
+            values_exact = getattr(camera_exact, name).astype("float").reshape(len(frame_ids), -1)
+            values_linear = np.column_stack([
+                np.interp(frame_ids, camera_coarse.frame_ids, values) for values in values_coarse.T
+            ])
+            assert np.abs(values_linear - values_exact).max() <= error_bound + 1e-9
+    # the last step is the exact result
+    camera_last, error_bounds = results[-1]
+    assert_camera_equal(camera_last, cs.interp(need_smooth))
+    assert set(error_bounds.values()) == {0.0}
+
+
+def test_blend_bones_is_weighted_centroid():
+    rng = np.random.RandomState(3)
+    frame_ids = np.arange(20)
+    bones_data = [gen_random_bone("head", rng, 20) for _ in range(3)]
+    for bone_data in bones_data:
+        bone_data.frame_ids = frame_ids
+    weights = [1.0, 2.0, 5.0]
+    bone_blend = CameraTracer.blend_bones(bones_data, frame_ids, weights)
+    positions_expected = sum([
+        weight * bone_data.positions for weight, bone_data in zip(weights, bones_data)
+    ]) / sum(weights)
+    np.testing.assert_allclose(bone_blend.positions, positions_expected, rtol=0, atol=1e-13)
+    for weights in [[1.0, 2.0], [1.0, -1.0, 1.0], [0.0, 0.0, 0.0]]:
+        with pytest.raises(ValueError):
+            CameraTracer.blend_bones(bones_data, frame_ids, weights)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from mmd_vmd_interpolation.bones_pose_calculator import BonesPoseCalculator
+from mmd_vmd_interpolation.camera_trace_bone import CameraSmoother
+from mmd_vmd_interpolation.jit_backend import JitBackend
+from mmd_vmd_interpolation.mmd_curve_interp import MMDCurveInterp
+from sample_data import CAMERA_MEMBERS, gen_camera_with_cuts
+
+
+@pytest.fixture
+def jit_backend():
+    is_enabled = JitBackend._is_enabled
+    yield JitBackend
+    JitBackend.set_enabled(is_enabled)
+
+
+def get_both_backends(jit_backend, fun):
+    # results of numpy path and compiled path
+    jit_backend.set_enabled(False)
+    result_ref = fun()
+    jit_backend.set_enabled(True)
+    return fun(), result_ref
+
+
+def test_numpy_path_without_backend():
+    is_enabled = JitBackend._is_enabled
+    JitBackend.set_enabled(False)
+    try:
+        assert JitBackend.get_kernels() is None
+    finally:
+        JitBackend.set_enabled(is_enabled)
+
+
+@pytest.mark.requires_numba
+def test_lpf_agrees_with_numpy(jit_backend):
+    rng = np.random.RandomState(0)
+    x = rng.randn(1000, 3)
+    y_prev = rng.randn(3)
+    for args in [(x, 0.3), (x, 0.3, y_prev), (x[:1], 0.3)]:
+        y, y_ref = get_both_backends(jit_backend, lambda: BonesPoseCalculator.apply_lpf(*args))
+        np.testing.assert_allclose(y, y_ref, rtol=0, atol=1e-12)
+
+
+@pytest.mark.requires_numba
+def test_curves_agree_with_numpy(jit_backend):
+    rng = np.random.RandomState(1)
+    curve_params = rng.randint(0, 128, (1000, 4))
+    # ratios including both ends
+    ratios = np.concatenate([rng.rand(998), [0.0, 1.0]])
+    y, y_ref = get_both_backends(
+        jit_backend, lambda: MMDCurveInterp._solve_curves_y_from_x(curve_params, ratios),
+    )
+    np.testing.assert_allclose(y, y_ref, rtol=0, atol=1e-9)
+
+
+@pytest.mark.requires_numba
+@pytest.mark.parametrize("need_smooth", [True, False])
+def test_camera_interp_agrees_with_numpy(jit_backend, need_smooth):
+    camera_data = gen_camera_with_cuts(np.random.RandomState(2))
+    camera_interp, camera_ref = get_both_backends(
+        jit_backend, lambda: CameraSmoother(camera_data).interp(need_smooth, True),
+    )
+    for member_name in CAMERA_MEMBERS:
+        np.testing.assert_allclose(
+            getattr(camera_interp, member_name), getattr(camera_ref, member_name), rtol=0, atol=1e-9,
+        )
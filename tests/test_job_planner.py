@@ -0,0 +1,119 @@
+import filecmp
+
+import numpy as np
+import pytest
+
+from mmd_vmd_interpolation.bones_pose_calculator import (
+    BonesPoseCalculator,
+    BonesTree,
+)
+from mmd_vmd_interpolation.job_planner import JobPlanner
+from mmd_vmd_interpolation.job_setting import DESIRED_BONES_NAMES
+from mmd_vmd_interpolation.nonrotatable_bones_job import (
+    generate_nonrotatable_bones_data,
+    plan_nonrotatable_bones_data,
+)
+from mmd_vmd_interpolation.vmd_comparator import VmdComparator
+from mmd_vmd_interpolation.vmd_profile import VmdSimpleProfile
+from sample_data import BONES_LIST, gen_random_bone, gen_random_camera
+
+
+@pytest.fixture
+def src_motion(tmp_path):
+    rng = np.random.RandomState(0)
+    src = str(tmp_path / "motion.vmd")
+    VmdSimpleProfile.write_bones(src, "model", {
+        name: gen_random_bone(name, rng, 100) for name in DESIRED_BONES_NAMES
+    })
+    return src
+
+
+@pytest.mark.parametrize("chunk_frame_num", [1, 64, 100, 100000])
+@pytest.mark.parametrize("time_delay", [0.0, 0.3])
+def test_lpf_by_chunks_agrees_with_full(chunk_frame_num, time_delay):
+    rng = np.random.RandomState(1)
+    bones_data = {name: gen_random_bone(name, rng) for name, _, _ in BONES_LIST}
+    bpc = BonesPoseCalculator(bones_data, BonesTree.get(BONES_LIST))
+    bones_full = bpc.get_lpf_full_positions_bones(time_delay)
+    bones_chunks = bpc.get_lpf_full_positions_bones_by_chunks(time_delay, None, chunk_frame_num)
+    for name, bone_full in bones_full.items():
+        np.testing.assert_array_equal(bones_chunks[name].frame_ids, bone_full.frame_ids)
+        np.testing.assert_allclose(bones_chunks[name].positions, bone_full.positions, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("time_delay", [0.0, 0.3])
+def test_memory_modes_agree_with_full(src_motion, tmp_path, monkeypatch, time_delay):
+    # several chunks of the timeline
+    monkeypatch.setattr(JobPlanner, "CHUNK_FRAME_NUM", 100)
+    dsts = {}
+    for mode in JobPlanner.MODES:
+        dsts[mode] = str(tmp_path / ("%s.vmd" % mode))
+        generate_nonrotatable_bones_data(
+            src_motion, dsts[mode], time_delay, need_reduce=False, memory_mode=mode,
+        )
+    assert filecmp.cmp(dsts[JobPlanner.MODE_CHUNKED], dsts[JobPlanner.MODE_FULL], shallow=False)
+    report = VmdComparator.compare_files(dsts[JobPlanner.MODE_FULL], dsts[JobPlanner.MODE_FLOAT32])
+    assert VmdComparator.check_is_equal(report)
+
+
+@pytest.mark.parametrize("scan_chunk_len", [1, 7, 1 << 16])
+def test_frame_id_range_agrees_with_decoded_frames(tmp_path, monkeypatch, scan_chunk_len):
+    monkeypatch.setattr(VmdSimpleProfile, "_SCAN_CHUNK_LEN", scan_chunk_len)
+    rng = np.random.RandomState(2)
+    bones_data = {name: gen_random_bone(name, rng) for name, _, _ in BONES_LIST}
+    bones_data["upper"].frame_ids = bones_data["upper"].frame_ids + 10000
+    src = str(tmp_path / "bones.vmd")
+    VmdSimpleProfile.write_bones(src, "model", bones_data)
+    frame_ids = np.concatenate([bone_data.frame_ids for bone_data in bones_data.values()])
+    vp = VmdSimpleProfile(src)
+    assert vp.read_frame_id_range("bone") == (frame_ids.min(), frame_ids.max())
+    assert vp.read_frame_id_range("camera") is None
+    camera_data = gen_random_camera(rng)
+    src_camera = str(tmp_path / "camera.vmd")
+    VmdSimpleProfile.write_camera(src_camera, camera_data)
+    assert VmdSimpleProfile(src_camera).read_frame_id_range("camera") == (
+        camera_data.frame_ids.min(), camera_data.frame_ids.max(),
+    )
+    summary = JobPlanner.read_summary(src_camera)
+    assert summary["is_camera"]
+    assert summary["frame_nums"]["camera"] == camera_data.get_frame_num()
+    assert summary["frame_id_range"] == (camera_data.frame_ids.min(), camera_data.frame_ids.max())
+
+
+def test_plan_decisions():
+    estimates = [
+        {"mode": JobPlanner.MODE_FULL, "peak_bytes": 300, "seconds": 1.0},
+        {"mode": JobPlanner.MODE_FLOAT32, "peak_bytes": 200, "seconds": 1.0},
+        {"mode": JobPlanner.MODE_CHUNKED, "peak_bytes": 100, "seconds": 2.0},
+    ]
+    # the first one of the fastest estimates, which fits the budget
+    for budget_bytes, mode in [(None, "full"), (300, "full"), (299, "float32"), (199, "chunked")]:
+        plan = JobPlanner.plan(estimates, budget_bytes)
+        assert (plan["decision"], plan["mode"]) == (JobPlanner.DECISION_RUN, mode)
+    # queued for memory in use, and refused out of budget
+    plan = JobPlanner.plan(estimates, 250, in_use_bytes=100)
+    assert (plan["decision"], plan["mode"]) == (JobPlanner.DECISION_QUEUE, JobPlanner.MODE_FLOAT32)
+    plan = JobPlanner.plan(estimates, 99)
+    assert (plan["decision"], plan["mode"]) == (JobPlanner.DECISION_REFUSE, JobPlanner.MODE_CHUNKED)
+    assert "exceeds budget" in JobPlanner.describe(plan)
+
+
+def test_plan_of_nonrotatable_bones_job(src_motion, tmp_path):
+    plan = plan_nonrotatable_bones_data(src_motion, 0.3)
+    assert plan["decision"] == JobPlanner.DECISION_RUN
+    estimates = {
+        mode: plan_nonrotatable_bones_data(src_motion, 0.3, memory_mode=mode)
+            for mode in JobPlanner.MODES
+    }
+    frame_nums = {estimate["frame_num"] for estimate in estimates.values()}
+    summary = JobPlanner.read_summary(src_motion)
+    assert frame_nums == {summary["frame_id_range"][1] - summary["frame_id_range"][0]}
+    assert estimates["float32"]["peak_bytes"] < estimates["full"]["peak_bytes"]
+    # refused job doesn't write output
+    budget = estimates["chunked"]["peak_bytes"] * 0.5e-6
+    plan = plan_nonrotatable_bones_data(src_motion, 0.3, memory_budget=budget)
+    assert plan["decision"] == JobPlanner.DECISION_REFUSE
+    dst = tmp_path / "refused.vmd"
+    with pytest.raises(MemoryError):
+        generate_nonrotatable_bones_data(src_motion, str(dst), 0.3, memory_budget=budget)
+    assert not dst.exists()
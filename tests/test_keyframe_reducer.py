@@ -0,0 +1,72 @@
+import numpy as np
+
+from mmd_vmd_interpolation.bones_pose_calculator import BonesPoseCalculator
+from mmd_vmd_interpolation.camera_trace_bone import CameraTracer
+from mmd_vmd_interpolation.keyframe_reducer import KeyframeReducer
+from mmd_vmd_interpolation.vmd_profile import (
+    VmdBoneData,
+    VmdCameraData,
+    VmdSimpleProfile,
+)
+
+
+def gen_dense_bone(name="center"):
+    # type: (str) -> VmdBoneData
+    # constant, linear (exact in binary) and curved runs on every frame
+    rng = np.random.RandomState(0)
+    positions = np.concatenate([
+        np.tile([1.0, 2.0, 3.0], [20, 1]),
+        np.array([1.0, 2.0, 3.0]) + 0.5 * np.arange(1, 31).reshape(-1, 1),
+        np.cumsum(rng.randn(30, 3), axis=0).astype("float32"),
+        np.tile([-4.0, 0.25, 8.0], [20, 1]),
+    ])
+    bone_data = VmdBoneData(name, len(positions))
+    bone_data.frame_ids = np.arange(len(positions))
+    bone_data.positions = positions
+    return bone_data
+
+
+def write_and_read(path, bone_data):
+    # type: (str, VmdBoneData) -> VmdBoneData
+    VmdSimpleProfile.write_bones(path, "model", {bone_data.name: bone_data})
+    return VmdSimpleProfile(path).read_desired_bones({bone_data.name})[bone_data.name]
+
+
+def test_reduced_keyframes_reproduce_dense_positions(tmp_path):
+    bone_dense = gen_dense_bone()
+    bone_reduced = KeyframeReducer.reduce_bones({bone_dense.name: bone_dense})[bone_dense.name]
+    assert bone_reduced.get_frame_num() < bone_dense.get_frame_num()
+    # reload and re-interpolate both files
+    bone_dense_loaded = write_and_read(str(tmp_path / "dense.vmd"), bone_dense)
+    bone_reduced_loaded = write_and_read(str(tmp_path / "reduced.vmd"), bone_reduced)
+    np.testing.assert_array_equal(bone_reduced_loaded.frame_ids, bone_reduced.frame_ids)
+    positions_dense = BonesPoseCalculator(
+        {bone_dense.name: bone_dense_loaded},
+    ).get_full_interp_bones()[bone_dense.name].positions
+    positions_reduced = BonesPoseCalculator(
+        {bone_dense.name: bone_reduced_loaded},
+    ).get_full_interp_bones()[bone_dense.name].positions
+    # the same up to rounding of solving the (linear) default curve
+    np.testing.assert_allclose(positions_reduced, positions_dense, rtol=0, atol=1e-9)
+
+
+def test_reduced_keyframes_trace_the_same_as_dense():
+    bone_dense = gen_dense_bone()
+    bone_reduced = KeyframeReducer.reduce_bone(bone_dense)
+    # camera frames beyond the last keyframe hold the last position
+    camera_data = VmdCameraData(60)
+    camera_data.frame_ids = np.arange(0, 120, 2)
+    np.testing.assert_allclose(
+        CameraTracer.trace_bone(camera_data, bone_reduced),
+        CameraTracer.trace_bone(camera_data, bone_dense),
+        rtol=0, atol=1e-12,
+    )
+
+
+def test_curved_keyframes_are_kept():
+    bone_data = gen_dense_bone()
+    bone_data.curve_x[50] = [64, 0, 64, 127]
+    mask = KeyframeReducer.get_redundant_mask(bone_data)
+    assert not mask[[0, -1]].any()
+    # the keyframe of a non-linear curve governs its interval, so is kept
+    assert not mask[49] and not mask[50]
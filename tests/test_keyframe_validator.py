@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from mmd_vmd_interpolation.bone_tracing_camera_job import generate_bone_tracing_camera_data
+from mmd_vmd_interpolation.keyframe_validator import KeyframeValidator
+from mmd_vmd_interpolation.timeline_profile import TimelineProfile
+from mmd_vmd_interpolation.vmd_profile import VmdSimpleProfile
+from sample_data import gen_random_bone, gen_random_camera
+
+
+def gen_broken_bone(rng):
+    bone_data = gen_random_bone("head", rng, 10)
+    bone_data.frame_ids = np.array([0, 10, 5, 20, 20, 30, 40, 50, 60, 70])
+    bone_data.positions[3] = np.nan
+    bone_data.orientations[6] = 0.0
+    bone_data.orientations[7] *= 2.0
+    bone_data.curve_x[8, 1] = 200
+    return bone_data
+
+
+def test_repair_bone():
+    bone_data = gen_broken_bone(np.random.RandomState(0))
+    bone_valid, issues = KeyframeValidator.validate_bone(bone_data)
+    assert issues == {
+        "unsorted_frames": 1,
+        "non_finite_keyframes": 1,
+        "zero_quaternions": 1,
+        "unnormalized_quaternions": 1,
+        "out_of_range_curves": 1,
+    }
+    # sorted, without non-finite (where the other of duplicates is kept) and zero quaternion
+    keep_loc = [0, 2, 1, 4, 5, 7, 8, 9]
+    np.testing.assert_array_equal(bone_valid.frame_ids, bone_data.frame_ids[keep_loc])
+    np.testing.assert_array_equal(bone_valid.positions, bone_data.positions[keep_loc])
+    np.testing.assert_allclose(np.linalg.norm(bone_valid.orientations, axis=1), 1.0)
+    assert bone_valid.curve_x.max() == 127
+    # valid bone is kept as it is
+    assert KeyframeValidator.validate_bone(bone_valid) == (bone_valid, {})
+
+
+def test_duplicate_frames_keep_the_last_one():
+    camera_data = gen_random_camera(np.random.RandomState(1), 5)
+    camera_data.frame_ids = np.array([0, 3, 3, 3, 8])
+    camera_valid, issues = KeyframeValidator.validate_camera(camera_data)
+    assert issues == {"duplicate_frames": 2}
+    np.testing.assert_array_equal(camera_valid.positions, camera_data.positions[[0, 3, 4]])
+
+
+def test_policies():
+    bone_data = gen_broken_bone(np.random.RandomState(2))
+    bone_ignored, issues = KeyframeValidator.validate_bone(bone_data, KeyframeValidator.POLICY_IGNORE)
+    assert bone_ignored is bone_data and issues
+    with pytest.raises(ValueError):
+        KeyframeValidator.validate_bone(bone_data, KeyframeValidator.POLICY_ERROR)
+
+
+def test_timeline_bone_is_not_validated(tmp_path, monkeypatch):
+    rng = np.random.RandomState(3)
+    src_camera = str(tmp_path / "camera.vmd")
+    VmdSimpleProfile.write_camera(src_camera, gen_random_camera(rng))
+    bone_data = gen_random_bone("head", rng)
+    src_vmd, src_timeline = str(tmp_path / "bone.vmd"), str(tmp_path / "bone_timeline")
+    VmdSimpleProfile.write_bones(src_vmd, "model", {"head": bone_data})
+    TimelineProfile.write_bones(src_timeline, "model", {"head": bone_data})
+    validated_names = []
+
+    def validate_bones(bones_data, policy):
+        validated_names.extend(bones_data)
+        return bones_data, {}
+
+    monkeypatch.setattr(KeyframeValidator, "validate_bones", validate_bones)
+    for src in [src_vmd, src_timeline]:
+        generate_bone_tracing_camera_data(
+            src_camera, str(tmp_path / "out.vmd"), src_nonrotatable_bone=src,
+            trace_bone_name="head", camera_shake_interval=0.0,
+        )
+    assert validated_names == ["head"]
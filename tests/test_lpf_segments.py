@@ -0,0 +1,64 @@
+import concurrent.futures
+
+import numpy as np
+import pytest
+
+from mmd_vmd_interpolation.bones_pose_calculator import (
+    BonesPoseCalculator,
+    BonesTree,
+)
+from sample_data import BONES_LIST, gen_random_bone
+
+
+@pytest.mark.parametrize("thread_num", [2, 3, 8])
+@pytest.mark.parametrize("frame_num", [200, 1001])
+def test_lpf_by_segments_agrees_with_sequential(monkeypatch, thread_num, frame_num):
+    # segments of a few frames filtered in parallel
+    monkeypatch.setattr(BonesPoseCalculator, "_LPF_SEGMENT_MIN_LEN", 50)
+    rng = np.random.RandomState(frame_num)
+    x = rng.randn(frame_num, 3)
+    y_prev = rng.randn(3)
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        for time_delay in [0.05, 0.3, 2.0]:
+            for args in [(x, time_delay), (x, time_delay, y_prev)]:
+                y_expected = BonesPoseCalculator.apply_lpf(*args)
+                y = BonesPoseCalculator.apply_lpf(*args, thread_num=thread_num)
+                np.testing.assert_allclose(y, y_expected, rtol=0, atol=1e-13)
+                # segments of thread_num on the given threads
+                y = BonesPoseCalculator.apply_lpf(*args, thread_num=thread_num, executor=executor)
+                np.testing.assert_allclose(y, y_expected, rtol=0, atol=1e-13)
+
+
+def test_calculator_reuses_lpf_threads(monkeypatch):
+    monkeypatch.setattr(BonesPoseCalculator, "_LPF_SEGMENT_MIN_LEN", 10)
+    rng = np.random.RandomState(5)
+    bones_data = {name: gen_random_bone(name, rng) for name, _, _ in BONES_LIST}
+    bpc = BonesPoseCalculator(bones_data, BonesTree.get(BONES_LIST), thread_num=3)
+    bpc_sequential = BonesPoseCalculator(bones_data, BonesTree.get(BONES_LIST))
+    executor = None
+    for time_delay in [0.3, 2.0]:
+        bones_lpf = bpc.get_lpf_full_positions_bones(time_delay)
+        bones_expected = bpc_sequential.get_lpf_full_positions_bones(time_delay)
+        for name, bone_lpf in bones_lpf.items():
+            np.testing.assert_allclose(bone_lpf.positions, bones_expected[name].positions, rtol=0, atol=1e-13)
+        assert bpc._lpf_executor is not None
+        assert executor in [None, bpc._lpf_executor]
+        executor = bpc._lpf_executor
+    assert bpc_sequential._lpf_executor is None
+
+
+@pytest.mark.parametrize("time_delay", [0.0, 0.05, 0.3, 2.0])
+def test_lpf_of_segments_joined_by_carry(time_delay):
+    rng = np.random.RandomState(4)
+    x = rng.randn(500, 3)
+    y_expected = BonesPoseCalculator.apply_lpf(x, time_delay)
+    # segments filtered separately from zero state, and joined in order
+    y_prev = x[0]
+    y_segments = []
+    for start, end in [(0, 1), (1, 64), (64, 65), (65, 300), (300, 300), (300, 500)]:
+        y_zero_state = BonesPoseCalculator.apply_lpf(x[start:end], time_delay, np.zeros(3))
+        y_segment = BonesPoseCalculator.apply_lpf_carry(y_zero_state, time_delay, y_prev)
+        y_segments.append(y_segment)
+        if end > start:
+            y_prev = y_segment[-1]
+    np.testing.assert_allclose(np.concatenate(y_segments), y_expected, rtol=0, atol=1e-13)
@@ -0,0 +1,67 @@
+import numpy as np
+
+from mmd_vmd_interpolation.bones_pose_calculator import (
+    BonesPoseCalculator,
+    BonesTree,
+)
+from mmd_vmd_interpolation.camera_trace_bone import CameraSmoother
+from mmd_vmd_interpolation.mmd_curve_interp import MMDCurveInterp
+from sample_data import BONES_LIST, gen_random_bone, gen_random_camera
+
+
+def test_interp_at_frames_agrees_with_full_timeline():
+    rng = np.random.RandomState(0)
+    bones_data = {name: gen_random_bone(name, rng) for name, _, _ in BONES_LIST}
+    # full timeline remains default value out of keyframes of each bone,
+    # while evaluation at times holds the end keyframes
+    for bone_data in bones_data.values():
+        bone_data.frame_ids = bones_data["center"].frame_ids
+    bpc = BonesPoseCalculator(bones_data, BonesTree.get(BONES_LIST))
+    for name in bones_data:
+        bone_full = bpc.get_full_pose_bones([name])[name]
+        # the last frame of timeline holds the last keyframe
+        frame_ids = bone_full.frame_ids[:-1]
+        bone_at = bpc.get_pose_bone_at(name, frame_ids)
+        np.testing.assert_allclose(bone_at.positions, bone_full.positions[:-1], atol=1e-9)
+        np.testing.assert_allclose(bone_at.orientations, bone_full.orientations[:-1], atol=1e-9)
+
+
+def test_interp_at_sub_frames_lies_between_frames():
+    rng = np.random.RandomState(1)
+    bone_data = gen_random_bone("center", rng)
+    # default curve is linear
+    bone_data.curve_x[:] = [20, 20, 107, 107]
+    times = np.arange(bone_data.frame_ids[-1] * 2) / 2.0
+    values = MMDCurveInterp.interp_keyframes(
+        bone_data.frame_ids, bone_data.positions[:, 0], bone_data.curve_x, times,
+    )
+    np.testing.assert_allclose(
+        values, np.interp(times, bone_data.frame_ids, bone_data.positions[:, 0]), atol=1e-9,
+    )
+
+
+def test_interp_keyframes_of_duplicate_frames_takes_the_later_one():
+    frame_ids = np.array([0, 10, 10, 20, 30, 30])
+    values = np.array([0.0, 1.0, 5.0, 6.0, 7.0, 9.0])
+    curves = np.tile([20, 20, 107, 107], [len(frame_ids), 1])
+    times = np.array([0.0, 5.0, 10.0, 15.0, 30.0, 40.0])
+    values_interp = MMDCurveInterp.interp_keyframes(frame_ids, values, curves, times)
+    np.testing.assert_allclose(values_interp, [0.0, 2.5, 5.0, 5.5, 9.0, 9.0])
+    quaternions = np.tile([0.0, 0.0, 0.0, 1.0], [len(frame_ids), 1])
+    quaternions[2] = [0.0, 0.0, np.sin(0.5), np.cos(0.5)]
+    quaternions_interp = MMDCurveInterp.interp_keyframes_quaternion(
+        frame_ids, quaternions, curves, times,
+    )
+    assert np.isfinite(quaternions_interp).all()
+    np.testing.assert_allclose(quaternions_interp[2], quaternions[2], atol=1e-12)
+
+
+def test_camera_interp_at_agrees_with_interp():
+    rng = np.random.RandomState(2)
+    cs = CameraSmoother(gen_random_camera(rng), interp_frame_interval=1)
+    for need_smooth in [False, True]:
+        camera_interp = cs.interp(need_smooth)
+        camera_at = cs.interp_at(camera_interp.frame_ids, need_smooth)
+        np.testing.assert_allclose(camera_at.positions, camera_interp.positions, atol=1e-9)
+        np.testing.assert_allclose(camera_at.orientations, camera_interp.orientations, atol=1e-9)
+        np.testing.assert_allclose(camera_at.distances, camera_interp.distances, atol=1e-9)
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from mmd_vmd_interpolation.bones_pose_calculator import (
+    BonesPoseCalculator,
+    BonesTree,
+)
+from mmd_vmd_interpolation.job_setting import (
+    BONES_LIST,
+    DESIRED_BONES_NAMES,
+    get_bones_setting,
+)
+from mmd_vmd_interpolation.nonrotatable_bones_job import generate_nonrotatable_bones_data
+from mmd_vmd_interpolation.vmd_profile import VmdSimpleProfile
+from sample_data import gen_random_bone
+
+
+@pytest.fixture
+def src_motion(tmp_path):
+    rng = np.random.RandomState(0)
+    src = str(tmp_path / "motion.vmd")
+    VmdSimpleProfile.write_bones(src, "model", {
+        name: gen_random_bone(name, rng, rng.randint(5, 20)) for name in DESIRED_BONES_NAMES
+    })
+    return src
+
+
+def test_bones_setting_selects_ancestors():
+    desired_bones_names, bones_list, bones_name_remap = get_bones_setting(["head", "左腕"])
+    assert desired_bones_names == [
+        "全ての親", "センター", "グルーブ", "腰", "上半身", "上半身2", "首", "頭", "左肩P", "左肩", "左腕",
+    ]
+    assert [bone[0] for bone in bones_list] == desired_bones_names
+    assert bones_name_remap == {"頭": "head", "左腕": "left arm"}
+
+
+def test_selected_bones_agree_with_all_bones(src_motion):
+    vp = VmdSimpleProfile(src_motion)
+    bones_data = vp.read_desired_bones(DESIRED_BONES_NAMES)
+    bpc = BonesPoseCalculator(bones_data, BonesTree.get(BONES_LIST))
+    _, bones_list, _ = get_bones_setting(["head"])
+    bpc_selected = BonesPoseCalculator(
+        {bone[0]: bones_data[bone[0]] for bone in bones_list}, BonesTree.get(bones_list),
+    )
+    head = bpc.get_full_pose_bones(["頭"])["頭"]
+    head_selected = bpc_selected.get_full_pose_bones(["頭"])["頭"]
+    # timeline of the selected chain is within the one of all bones
+    frame_ids, indices, _ = np.intersect1d(
+        head.frame_ids, head_selected.frame_ids, return_indices=True,
+    )
+    assert np.array_equal(frame_ids, head_selected.frame_ids)
+    # except the last frame, which holds the last keyframes of all bones
+    np.testing.assert_array_equal(head_selected.positions[:-1], head.positions[indices[:-1]])
+    np.testing.assert_array_equal(head_selected.orientations[:-1], head.orientations[indices[:-1]])
+    with pytest.raises(KeyError):
+        bpc_selected.get_full_pose_bones(["左腕"])
+
+
+def test_selected_bones_job_agrees_with_all_bones_job(src_motion, tmp_path):
+    dst = str(tmp_path / "all.vmd")
+    generate_nonrotatable_bones_data(src_motion, dst, need_reduce=False)
+    dst_selected = str(tmp_path / "selected.vmd")
+    generate_nonrotatable_bones_data(src_motion, dst_selected, need_reduce=False, bones_names=["head", "右腕"])
+    vp_selected = VmdSimpleProfile(dst_selected)
+    assert sorted(vp_selected.read_bones_list()) == ["head", "right arm"]
+    bones_selected = vp_selected.read_desired_bones(["head", "right arm"])
+    bones_data = VmdSimpleProfile(dst).read_desired_bones(["head", "right arm"])
+    for name, bone_selected in bones_selected.items():
+        bone_data = bones_data[name]
+        frame_ids, indices, _ = np.intersect1d(
+            bone_data.frame_ids, bone_selected.frame_ids, return_indices=True,
+        )
+        assert np.array_equal(frame_ids, bone_selected.frame_ids)
+        np.testing.assert_array_equal(bone_selected.positions[:-1], bone_data.positions[indices[:-1]])
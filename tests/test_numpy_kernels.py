@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from mmd_vmd_interpolation.bones_pose_calculator import BonesPoseCalculator
+from mmd_vmd_interpolation.camera_trace_bone import SmoothInterp
+
+scipy_interpolate = pytest.importorskip("scipy.interpolate")
+scipy_signal = pytest.importorskip("scipy.signal")
+
+
+def lfilter_lpf(x, time_delay, y_prev=None):
+    # type: (np.ndarray, float, np.ndarray | None) -> np.ndarray
+    lag_ratio, update_ratio = BonesPoseCalculator._get_lpf_ratios(time_delay)
+    b = np.array([update_ratio])
+    a = np.array([1.0, -lag_ratio])
+    if y_prev is None:
+        zi = scipy_signal.lfilter_zi(b, a) * x[:1]
+    else:
+        zi = lag_ratio * np.reshape(y_prev, (1, -1))
+    y, _ = scipy_signal.lfilter(b, a, x, axis=0, zi=zi)
+    return y
+
+
+@pytest.mark.parametrize("frame_num", [1, 63, 64, 65, 1000])
+@pytest.mark.parametrize("time_delay", [0.05, 0.3, 2.0])
+def test_lpf_agrees_with_lfilter(frame_num, time_delay):
+    rng = np.random.RandomState(frame_num)
+    x = rng.randn(frame_num, 3)
+    y = BonesPoseCalculator.apply_lpf(x, time_delay)
+    np.testing.assert_allclose(y, lfilter_lpf(x, time_delay), rtol=0, atol=1e-13)
+    # continued from the last output before x
+    y_prev = rng.randn(3)
+    y = BonesPoseCalculator.apply_lpf(x, time_delay, y_prev)
+    np.testing.assert_allclose(y, lfilter_lpf(x, time_delay, y_prev), rtol=0, atol=1e-13)
+
+
+def test_lpf_keeps_shape_of_input():
+    x = np.random.RandomState(0).randn(100)
+    y = BonesPoseCalculator.apply_lpf(x, 0.3)
+    assert y.shape == x.shape
+    np.testing.assert_allclose(y, lfilter_lpf(x.reshape(-1, 1), 0.3).ravel(), rtol=0, atol=1e-13)
+    assert BonesPoseCalculator.apply_lpf(x, 0.0) is x
+
+
+@pytest.mark.parametrize("frame_num", [2, 3, 4, 200])
+def test_pchip_agrees_with_scipy(frame_num):
+    rng = np.random.RandomState(frame_num)
+    frame_ids = np.cumsum(rng.randint(1, 10, frame_num))
+    values = rng.randn(frame_num, 3)
+    # flat and monotonic parts
+    values[frame_num // 2:, 0] = 1.0
+    values[:, 1] = np.sort(values[:, 1])
+    # extrapolated out of keyframes
+    frame_ids_desired = np.arange(frame_ids[0] - 5, frame_ids[-1] + 5)
+    values_desired = SmoothInterp.interp(frame_ids, values, frame_ids_desired)
+    values_expected = scipy_interpolate.PchipInterpolator(frame_ids, values, axis=0)(frame_ids_desired)
+    np.testing.assert_allclose(values_desired, values_expected, rtol=0, atol=1e-13)
+    values_desired = SmoothInterp.interp(frame_ids, values[:, 2], frame_ids_desired)
+    assert values_desired.shape == frame_ids_desired.shape
+    np.testing.assert_allclose(values_desired, values_expected[:, 2], rtol=0, atol=1e-13)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import struct
+
+import numpy as np
+import pytest
+
+from mmd_vmd_interpolation.pmx_profile import PmxSimpleProfile
+
+INDEX_CODES = {1: "b", 2: "h", 4: "i"}
+
+
+def pack_text(text, coding):
+    raw = text.encode(coding)
+    return struct.pack("<i", len(raw)) + raw
+
+
+def pack_pmx(bones, coding="utf-16-le", bone_index_size=2, additional_uv_num=1, weight_types=range(5)):
+    # minimal model with some vertices, faces, textures and materials before bones
+    coding_id = {"utf-16-le": 0, "utf-8": 1}[coding]
+    vertex_index_size = texture_index_size = 1
+    bone_index_code = "<" + INDEX_CODES[bone_index_size]
+    raw = b"PMX " + struct.pack("<f", 2.0) + bytes([8, coding_id, additional_uv_num,
+        vertex_index_size, texture_index_size, 1, bone_index_size, 1, 1])
+    for text in [u"モデル", "model", u"コメント", "comment"]:
+        raw += pack_text(text, coding)
+    # vertices with every weight type by default
+    weight_lens = [
+        bone_index_size,
+        2*bone_index_size + 4,
+        4*bone_index_size + 4*4,
+        2*bone_index_size + 4 + 3*3*4,
+        4*bone_index_size + 4*4,
+    ]
+    raw += struct.pack("<i", len(weight_types))
+    for weight_type in weight_types:
+        raw += b"\x01" * (3*4 + 3*4 + 2*4 + additional_uv_num*4*4)
+        raw += bytes([weight_type]) + b"\x00" * weight_lens[weight_type] + struct.pack("<f", 1.0)
+    # faces
+    raw += struct.pack("<i", 3) + bytes([0, 1, 2])
+    # textures
+    raw += struct.pack("<i", 2) + pack_text("a.png", coding) + pack_text("b.png", coding)
+    # materials with shared and individual toon
+    raw += struct.pack("<i", 2)
+    for toon_reference in [0, 1]:
+        raw += pack_text(u"材質", coding) + pack_text("material", coding)
+        raw += b"\x00" * (4*4 + 3*4 + 4 + 3*4 + 1 + 4*4 + 4) + b"\x00\x00" + b"\x00"
+        raw += bytes([toon_reference]) + b"\x00"
+        raw += pack_text("memo", coding) + struct.pack("<i", 3)
+    # bones
+    raw += struct.pack("<i", len(bones))
+    for name, parent_id, position, flag in bones:
+        raw += pack_text(name, coding) + pack_text("bone", coding)
+        raw += struct.pack("<3f", *position) + struct.pack(bone_index_code, parent_id)
+        raw += struct.pack("<i", 0) + struct.pack("<H", flag)
+        raw += struct.pack(bone_index_code, -1) if flag & 0x0001 else b"\x00" * 3*4
+        if flag & (0x0100 | 0x0200):
+            raw += struct.pack(bone_index_code, 0) + struct.pack("<f", 1.0)
+        if flag & 0x0400:
+            raw += b"\x00" * 3*4
+        if flag & 0x0800:
+            raw += b"\x00" * 2*3*4
+        if flag & 0x2000:
+            raw += b"\x00" * 4
+        if flag & 0x0020:
+            raw += struct.pack(bone_index_code, 0) + struct.pack("<i", 40) + struct.pack("<f", 2.0)
+            raw += struct.pack("<i", 2)
+            raw += struct.pack(bone_index_code, 1) + b"\x01" + b"\x00" * 2*3*4
+            raw += struct.pack(bone_index_code, 0) + b"\x00"
+    return raw
+
+
+@pytest.mark.parametrize("coding, bone_index_size", [("utf-16-le", 2), ("utf-8", 1), ("utf-8", 4)])
+def test_read_bones_list(tmp_path, coding, bone_index_size):
+    bones = [
+        (u"センター", -1, (0.0, 8.0, 0.0), 0x0001),
+        (u"上半身", 0, (0.0, 10.0, 0.5), 0x0001 | 0x0100 | 0x0400),
+        (u"頭", 1, (0.0, 15.0, 0.25), 0x0800 | 0x2000),
+        (u"右足ＩＫ", 0, (-1.0, 1.0, 0.0), 0x0020 | 0x0200),
+    ]
+    path = tmp_path / "model.pmx"
+    path.write_bytes(pack_pmx(bones, coding, bone_index_size))
+    vp = PmxSimpleProfile(str(path))
+    assert vp.read_model_name() == u"モデル"
+    bones_list = vp.read_bones_list()
+    assert [(name, parent) for name, parent, _ in bones_list] == [
+        (u"センター", None), (u"上半身", u"センター"), (u"頭", u"上半身"), (u"右足ＩＫ", u"センター"),
+    ]
+    np.testing.assert_array_equal(
+        [position for _, _, position in bones_list], [position for _, _, position, _ in bones],
+    )
+
+
+@pytest.mark.parametrize("weight_types", [
+    [],
+    [0] * 100 + [2] * 70 + [1] + [3] * 3 + [4] * 200 + [0] * 5,
+    [0, 1] * 50 + [2] * 16 + [3] * 17,
+])
+def test_skip_runs_of_weight_types(tmp_path, weight_types):
+    bones = [(u"センター", -1, (0.0, 8.0, 0.0), 0x0001), (u"頭", 0, (0.0, 15.0, 0.25), 0x0001)]
+    path = tmp_path / "model.pmx"
+    path.write_bytes(pack_pmx(bones, additional_uv_num=2, weight_types=weight_types))
+    bones_list = PmxSimpleProfile(str(path)).read_bones_list()
+    assert [(name, parent) for name, parent, _ in bones_list] == [(u"センター", None), (u"頭", u"センター")]
+
+
+def test_reject_non_pmx(tmp_path):
+    path = tmp_path / "model.pmx"
+    path.write_bytes(b"Vocaloid Motion Data 0002" + b"\x00" * 40)
+    with pytest.raises(ValueError):
+        PmxSimpleProfile(str(path)).read_bones_list()
@@ -0,0 +1,70 @@
+import json
+import os
+
+import numpy as np
+
+from mmd_vmd_interpolation.vmd_profile import VmdSimpleProfile
+from run_batch_jobs import BatchRunner
+from sample_data import gen_random_camera
+
+
+def write_manifest(tmp_path, jobs):
+    manifest = str(tmp_path / "jobs.json")
+    with open(manifest, "w") as fp:
+        json.dump(jobs, fp)
+    return manifest
+
+
+def read_journal(manifest):
+    with open(manifest + ".journal", "rb") as fp:
+        return [json.loads(line.decode("utf-8")) for line in fp]
+
+
+def test_rerun_skips_done_jobs_and_resumes_the_others(tmp_path, capsys):
+    VmdSimpleProfile.write_camera(str(tmp_path / "camera.vmd"), gen_random_camera(np.random.RandomState(0)))
+    jobs = [
+        {"id": "cam%d" % i, "type": "bone_tracing_camera", "options": {
+            "src_camera": "camera.vmd", "dst_camera": "out%d.vmd" % i,
+            "interp_frame_interval": i, "camera_shake_interval": 0.0,
+        }} for i in [1, 2]
+    ]
+    jobs.append({"id": "broken", "type": "bone_tracing_camera", "options": {
+        "src_camera": "missing.vmd", "dst_camera": "out3.vmd",
+    }})
+    manifest = write_manifest(tmp_path, jobs)
+    runner = BatchRunner(manifest)
+    assert not runner.run(need_keep_going=True)
+    statuses = {record["id"]: record["status"] for record in read_journal(manifest)}
+    assert statuses == {"cam1": "done", "cam2": "done", "broken": "failed"}
+    assert not os.path.exists(str(tmp_path / "out3.vmd"))
+    # done jobs are skipped, unless their outputs or inputs are changed
+    os.remove(str(tmp_path / "out2.vmd"))
+    capsys.readouterr()
+    assert not BatchRunner(manifest).run(need_keep_going=True)
+    out = capsys.readouterr().out
+    assert "skip job cam1" in out
+    assert "run job cam2" in out
+    assert "job broken (bone_tracing_camera) failed" in out
+    VmdSimpleProfile.write_camera(str(tmp_path / "camera.vmd"), gen_random_camera(np.random.RandomState(1)))
+    jobs.pop()
+    assert BatchRunner(write_manifest(tmp_path, jobs)).run()
+    out = capsys.readouterr().out
+    assert "run job cam1" in out
+    assert "run job cam2" in out
+    # partial outputs never remain
+    assert sorted(os.listdir(str(tmp_path))) == [
+        "camera.vmd", "jobs.json", "jobs.json.journal", "out1.vmd", "out2.vmd",
+    ]
+
+
+def test_interrupted_job_is_rerun(tmp_path, capsys):
+    VmdSimpleProfile.write_camera(str(tmp_path / "camera.vmd"), gen_random_camera(np.random.RandomState(0)))
+    manifest = write_manifest(tmp_path, [{"type": "bone_tracing_camera", "options": {
+        "src_camera": "camera.vmd", "dst_camera": "out.vmd", "camera_shake_interval": 0.0,
+    }}])
+    # crash while running left a record and a broken line
+    with open(manifest + ".journal", "w") as fp:
+        fp.write(json.dumps({"id": "0", "status": "running"}) + "\n" + '{"id": "0", "sta')
+    assert BatchRunner(manifest).run()
+    assert "resume job 0" in capsys.readouterr().out
+    assert BatchRunner(manifest)._load_journal()["0"]["status"] == "done"
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from mmd_vmd_interpolation.timeline_profile import TimelineProfile
+from sample_data import BONES_LIST, CAMERA_MEMBERS, gen_random_bone, gen_random_camera
+
+BONE_MEMBERS = ["frame_ids", "positions", "orientations", "curve_x", "curve_y", "curve_z", "curve_rot"]
+
+
+@pytest.mark.parametrize("name", ["timeline", "timeline.npz"])
+def test_bones_round_trip(tmp_path, name):
+    rng = np.random.RandomState(0)
+    bones_data = {bone_name: gen_random_bone(bone_name, rng) for bone_name, _, _ in BONES_LIST}
+    dst = str(tmp_path / name)
+    TimelineProfile.write_bones(dst, "model", bones_data)
+    assert TimelineProfile.is_timeline(dst)
+    tp = TimelineProfile(dst)
+    assert tp.read_model_name() == "model"
+    assert not tp.check_is_camera()
+    bones_read = tp.read_desired_bones(["head", "center", "missing"])
+    for bone_name in ["head", "center"]:
+        for member_name in BONE_MEMBERS:
+            np.testing.assert_array_equal(
+                getattr(bones_read[bone_name], member_name), getattr(bones_data[bone_name], member_name),
+            )
+    # missing bone is empty as in vmd file
+    assert bones_read["missing"].get_frame_num() == 0
+
+
+@pytest.mark.parametrize("name", ["timeline", "timeline.npz"])
+def test_camera_round_trip(tmp_path, name):
+    camera_data = gen_random_camera(np.random.RandomState(1))
+    dst = str(tmp_path / name)
+    TimelineProfile.write_camera(dst, camera_data)
+    tp = TimelineProfile(dst)
+    assert tp.check_is_camera()
+    camera_read = tp.read_camera()
+    for member_name in CAMERA_MEMBERS + ["curve_x", "curve_fov"]:
+        np.testing.assert_array_equal(getattr(camera_read, member_name), getattr(camera_data, member_name))
+
+
+@pytest.mark.parametrize("name", ["timeline", "timeline.npz"])
+def test_rewrite_keeps_memory_mapped_data(tmp_path, name):
+    rng = np.random.RandomState(2)
+    bones_data_old = {"center": gen_random_bone("center", rng, 50)}
+    bones_data_new = {"center": gen_random_bone("center", rng, 80), "head": gen_random_bone("head", rng)}
+    dst = str(tmp_path / name)
+    TimelineProfile.write_bones(dst, "model", bones_data_old)
+    bones_read_old = TimelineProfile(dst).read_desired_bones(["center"])
+    TimelineProfile.write_bones(dst, "model", bones_data_new)
+    # data read before is intact
+    np.testing.assert_array_equal(bones_read_old["center"].positions, bones_data_old["center"].positions)
+    bones_read = TimelineProfile(dst).read_desired_bones(["center", "head"])
+    for bone_name in ["center", "head"]:
+        np.testing.assert_array_equal(bones_read[bone_name].positions, bones_data_new[bone_name].positions)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [name]
+
+
+def test_write_refuses_other_directory(tmp_path):
+    dst = tmp_path / "timeline"
+    dst.mkdir()
+    (dst / "other.txt").write_bytes(b"")
+    with pytest.raises(ValueError):
+        TimelineProfile.write_camera(str(dst), gen_random_camera(np.random.RandomState(3)))
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["timeline"]
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from mmd_vmd_interpolation.vmd_comparator import VmdComparator
+from mmd_vmd_interpolation.vmd_profile import (
+    VmdMotionTable,
+    VmdSimpleProfile,
+)
+from sample_data import BONES_LIST, gen_random_bone, gen_random_camera
+
+TABLE_MEMBERS = ["positions", "orientations", "curve_x", "curve_y", "curve_z", "curve_rot"]
+
+
+def gen_motion_table(rng, names, frame_num=40):
+    # type: (np.random.RandomState, list[str], int) -> VmdMotionTable
+    bones_data = [gen_random_bone(name, rng, frame_num) for name in names]
+    return VmdMotionTable(
+        names, np.repeat(np.arange(len(names)), frame_num),
+        np.concatenate([bone_data.frame_ids for bone_data in bones_data]),
+        *[np.concatenate([getattr(bone_data, member_name) for bone_data in bones_data])
+            for member_name in TABLE_MEMBERS]
+    )
+
+
+def permute_motion_table(table, order, names):
+    # type: (VmdMotionTable, np.ndarray, list[str]) -> VmdMotionTable
+    # the same keys in another order of keys and bone names
+    name_to_id = {name: i for i, name in enumerate(names)}
+    table_to_id = np.array([name_to_id[name] for name in table.names])
+    return VmdMotionTable(
+        names, table_to_id[table.bone_ids[order]], table.frame_ids[order],
+        *[getattr(table, member_name)[order] for member_name in TABLE_MEMBERS]
+    )
+
+
+def test_compare_ignores_order_and_quaternion_sign():
+    rng = np.random.RandomState(0)
+    names = [name for name, _, _ in BONES_LIST]
+    table_a = gen_motion_table(rng, names)
+    table_b = permute_motion_table(table_a, rng.permutation(table_a.get_frame_num()), names[::-1])
+    table_b.orientations *= np.where(rng.rand(table_b.get_frame_num(), 1) < 0.5, -1.0, 1.0)
+    report = VmdComparator.compare_motion_tables(table_a, table_b, atol=1e-12)
+    assert report["matched"] == table_a.get_frame_num()
+    assert report["fields"]["orientations"]["max"] < 1e-15
+    assert VmdComparator.check_is_equal(report)
+
+
+def test_compare_counts_deviations_and_keys():
+    rng = np.random.RandomState(1)
+    names = [name for name, _, _ in BONES_LIST]
+    table_a = gen_motion_table(rng, names)
+    frame_num = table_a.get_frame_num()
+    # 3 keys out of tolerance, 1 key within it, a changed curve,
+    # 2 keys of "head" removed, and a duplicate key of the last one
+    order = np.concatenate([np.delete(np.arange(frame_num), [-2, -3]), [frame_num - 1]])
+    table_b = permute_motion_table(table_a, order, names)
+    table_b.positions[[0, 10, 50], 1] += 1e-3
+    table_b.positions[20, 0] += 1e-5
+    table_b.curve_rot[30, 2] = (table_b.curve_rot[30, 2] + 5) % 128
+    report = VmdComparator.compare_motion_tables(table_a, table_b, atol=1e-4)
+    assert report["fields"]["positions"]["exceeded"] == 3
+    np.testing.assert_allclose(report["fields"]["positions"]["max"], 1e-3, rtol=1e-6)
+    assert report["fields"]["orientations"]["exceeded"] == 0
+    assert report["curves"] == {"curve_x": 0, "curve_y": 0, "curve_z": 0, "curve_rot": 1}
+    assert VmdComparator.compare_motion_tables(table_a, table_b, curve_tol=5)["curves"]["curve_rot"] == 0
+    assert report["missing"] == 2 and report["missing_bones"] == {"head": 2}
+    assert report["extra"] == 0 and report["extra_bones"] == {}
+    assert report["duplicates"] == 1
+    assert not VmdComparator.check_is_equal(report)
+    # relative tolerance to the values of a
+    report = VmdComparator.compare_motion_tables(table_a, table_b, atol=0.0, rtol=1e-6)
+    assert report["fields"]["positions"]["exceeded"] == 4
+    report = VmdComparator.compare_motion_tables(table_a, table_b, atol=0.0, rtol=1.0)
+    assert report["fields"]["positions"]["exceeded"] == 0
+
+
+def test_compare_files_of_extra_bone_and_camera(tmp_path):
+    rng = np.random.RandomState(2)
+    bones_data = {name: gen_random_bone(name, rng) for name, _, _ in BONES_LIST}
+    src_a = str(tmp_path / "a.vmd")
+    VmdSimpleProfile.write_bones(src_a, "model", {name: bones_data[name] for name in ["center", "upper"]})
+    src_b = str(tmp_path / "b.vmd")
+    VmdSimpleProfile.write_bones(src_b, "model", bones_data)
+    report = VmdComparator.compare_files(src_a, src_b)
+    assert report["extra_bones"] == {"head": bones_data["head"].get_frame_num()}
+    assert report["missing"] == 0
+    src_camera = str(tmp_path / "camera.vmd")
+    VmdSimpleProfile.write_camera(src_camera, gen_random_camera(rng))
+    assert VmdComparator.check_is_equal(VmdComparator.compare_files(src_camera, src_camera))
+    with pytest.raises(ValueError):
+        VmdComparator.compare_files(src_a, src_camera)
+
+
+def test_compare_cameras_counts_frames():
+    rng = np.random.RandomState(3)
+    camera_a = gen_random_camera(rng)
+    camera_b = gen_random_camera(np.random.RandomState(3))
+    camera_b.frame_ids = camera_b.frame_ids.copy()
+    camera_b.frame_ids[-1] += 100
+    camera_b.fov_angles[0] += 1.0
+    report = VmdComparator.compare_cameras(camera_a, camera_b)
+    assert report["missing_frames"].tolist() == [camera_a.frame_ids[-1]]
+    assert report["extra_frames"].tolist() == [camera_b.frame_ids[-1]]
+    assert report["fields"]["fov_angles"]["exceeded"] == 1
+    assert report["fields"]["positions"]["exceeded"] == 0
@@ -0,0 +1,63 @@
+import gzip
+import io
+import lzma
+import zipfile
+
+import numpy as np
+import pytest
+
+from mmd_vmd_interpolation.vmd_profile import VmdSimpleProfile
+from sample_data import gen_random_bone, gen_random_camera
+
+
+@pytest.mark.parametrize("ext, decompress", [
+    (".vmd.gz", lambda path: gzip.open(path).read()),
+    (".vmd.xz", lambda path: lzma.open(path).read()),
+    (".zip", lambda path: zipfile.ZipFile(path).read("camera.vmd")),
+])
+def test_compressed_vmd_agrees_with_plain_one(tmp_path, ext, decompress):
+    rng = np.random.RandomState(5)
+    camera_data = gen_random_camera(rng)
+    path_plain = str(tmp_path / "camera.vmd")
+    VmdSimpleProfile.write_camera(path_plain, camera_data)
+    path = str(tmp_path / ("camera" + ext))
+    VmdSimpleProfile.write_camera(path, camera_data)
+    with open(path_plain, "rb") as fp:
+        assert decompress(path) == fp.read()
+    # camera is read by skipping (empty) bones block
+    camera_plain = VmdSimpleProfile(path_plain).read_camera()
+    camera_read = VmdSimpleProfile(path).read_camera()
+    for member_name in ["frame_ids", "positions", "orientations", "distances", "fov_angles"]:
+        np.testing.assert_array_equal(getattr(camera_read, member_name), getattr(camera_plain, member_name))
+
+
+def test_read_zip_members(tmp_path):
+    rng = np.random.RandomState(6)
+    raws = {}
+    for name, frame_num in [("ダンス.vmd", 10), ("camera.vmd", 20)]:
+        path = str(tmp_path / "member.vmd")
+        VmdSimpleProfile.write_bones(path, "model", {"center": gen_random_bone("center", rng, frame_num)})
+        with open(path, "rb") as fp:
+            raws[name] = fp.read()
+    path_zip = str(tmp_path / "motion.zip")
+    # name in shift-jis without utf-8 flag, like archives made on windows,
+    # which replaces an ascii name of the same length
+    name_sjis = "ダンス.vmd".encode("shift-jis")
+    name_ascii = b"x" * (len(name_sjis) - 4) + b".vmd"
+    raw_zip = io.BytesIO()
+    with zipfile.ZipFile(raw_zip, "w") as zf:
+        zf.writestr(name_ascii.decode(), raws["ダンス.vmd"])
+        zf.writestr("camera.vmd", raws["camera.vmd"])
+        zf.writestr("readme.txt", b"")
+    with open(path_zip, "wb") as fp:
+        fp.write(raw_zip.getvalue().replace(name_ascii, name_sjis))
+    assert sorted(VmdSimpleProfile(path_zip).read_members()) == ["camera.vmd", "ダンス.vmd"]
+    for src in [VmdSimpleProfile(path_zip + "/ダンス.vmd"), VmdSimpleProfile(path_zip, "ダンス.vmd")]:
+        assert src.read_desired_bones(["center"])["center"].get_frame_num() == 10
+    src = VmdSimpleProfile(path_zip + "/camera.vmd")
+    assert src.read_desired_bones(["center"])["center"].get_frame_num() == 20
+    # the only vmd file has to be given among several ones
+    with pytest.raises(ValueError):
+        VmdSimpleProfile(path_zip).read_model_name()
+    with pytest.raises(ValueError):
+        VmdSimpleProfile(path_zip, "missing.vmd").read_model_name()
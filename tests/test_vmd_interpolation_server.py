@@ -0,0 +1,139 @@
+import asyncio
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from mmd_vmd_interpolation.job_planner import JobPlanner
+from mmd_vmd_interpolation.mmd_curve_interp import MMDCurveInterp
+from mmd_vmd_interpolation.vmd_profile import VmdSimpleProfile
+from sample_data import gen_random_camera
+from vmd_interpolation_server import FileCache, JobServer
+
+
+@pytest.fixture
+def make_server():
+    servers = []
+
+    def make(**kwargs):
+        servers.append(JobServer(**kwargs))
+        return servers[-1]
+
+    yield make
+    for server in servers:
+        server._executor.shutdown()
+    MMDCurveInterp.disable_curve_cache()
+
+
+@pytest.fixture
+def blocking_job(monkeypatch):
+    # job waiting for the event, whose estimated peak memory is 0.6 MB
+    event = threading.Event()
+
+    def run_blocking_job(need_fail=False):
+        assert event.wait(10)
+        if need_fail:
+            raise RuntimeError("failed by request")
+
+    def plan_blocking_job(memory_budget=None, in_use_bytes=0):
+        estimate = {"mode": JobPlanner.MODE_FULL, "peak_bytes": 600000, "seconds": 1.0}
+        budget_bytes = None if memory_budget is None else int(memory_budget * 1e6)
+        return JobPlanner.plan([estimate], budget_bytes, in_use_bytes)
+
+    monkeypatch.setitem(JobServer._JOBS, "blocking", (run_blocking_job, [], plan_blocking_job))
+    return event
+
+
+async def wait_stats(server, key, value):
+    while server.get_stats()[key] != value:
+        await asyncio.sleep(0.01)
+
+
+def test_submit_rejects_bad_jobs(make_server, blocking_job):
+    server = make_server(workers=1, queue_size=0)
+
+    async def submit_jobs():
+        statuses = []
+        statuses.append((await server.submit({"type": "unknown"}))[0])
+        statuses.append((await server.submit({"type": "blocking", "options": {"unknown": 1}}))[0])
+        # the worker is busy and no job can wait
+        running = asyncio.ensure_future(server.submit({"type": "blocking"}))
+        await wait_stats(server, "running", 1)
+        statuses.append((await server.submit({"type": "blocking"}))[0])
+        blocking_job.set()
+        statuses.append((await running)[0])
+        # job failed by itself
+        statuses.append((await server.submit({"type": "blocking", "options": {"need_fail": True}}))[0])
+        return statuses
+
+    assert asyncio.run(submit_jobs()) == [400, 400, 503, 200, 500]
+    stats = server.get_stats()
+    assert (stats["completed"], stats["failed"], stats["rejected"]) == (1, 1, 1)
+    assert (stats["queue_depth"], stats["running"]) == (0, 0)
+
+
+def test_submit_in_memory_budget(make_server, blocking_job):
+    server = make_server(workers=2, memory_budget=1.0)
+
+    async def submit_jobs():
+        # the second job waits until the first one releases its memory
+        jobs = [asyncio.ensure_future(server.submit({"type": "blocking"})) for _ in range(2)]
+        await wait_stats(server, "memory_waiting", 1)
+        assert server.get_stats()["memory_reserved"] == 600000
+        blocking_job.set()
+        return [(await job)[0] for job in jobs]
+
+    assert asyncio.run(submit_jobs()) == [200, 200]
+    stats = server.get_stats()
+    assert (stats["completed"], stats["memory_reserved"], stats["memory_waiting"]) == (2, 0, 0)
+    assert 0 < stats["latency_p50"] <= stats["latency_max"]
+    # job which never fits the budget
+    server = make_server(memory_budget=0.5)
+    status, result = asyncio.run(server.submit({"type": "blocking"}))
+    assert status == 503
+    assert result["error"].startswith("refused")
+    assert server.get_stats()["refused"] == 1
+
+
+def test_submit_runs_tools(make_server, tmp_path):
+    src_camera = str(tmp_path / "camera.vmd")
+    VmdSimpleProfile.write_camera(src_camera, gen_random_camera(np.random.RandomState(0)))
+    server = make_server(memory_budget=1000.0)
+    job = {"type": "bone_tracing_camera", "options": {
+        "src_camera": src_camera, "dst_camera": str(tmp_path / "out.vmd"),
+        "camera_shake_interval": 0.0,
+    }}
+
+    async def submit_jobs():
+        return [(await server.submit(job))[0] for _ in range(2)]
+
+    assert asyncio.run(submit_jobs()) == [200, 200]
+    assert VmdSimpleProfile(str(tmp_path / "out.vmd")).read_camera().get_frame_num() > 0
+    stats = server.get_stats()
+    assert stats["file_cache"] == {"hits": 1, "misses": 1}
+    assert stats["curve_cache"]["hits"] > 0
+    # missing source is a bad option
+    job["options"]["src_camera"] = str(tmp_path / "missing.vmd")
+    assert asyncio.run(server.submit(job))[0] == 400
+
+
+def test_file_cache_reloads_modified_file(tmp_path):
+    path = str(tmp_path / "motion.vmd")
+    with open(path, "wb") as fp:
+        fp.write(b"abc")
+    file_cache = FileCache(2)
+    assert bytes(file_cache.get(path)) == b"abc"
+    assert bytes(file_cache.get(path)) == b"abc"
+    assert file_cache.stats == {"hits": 1, "misses": 1}
+    # the same size but modified time
+    with open(path, "wb") as fp:
+        fp.write(b"xyz")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert bytes(file_cache.get(path)) == b"xyz"
+    # the different size
+    with open(path, "wb") as fp:
+        fp.write(b"xyzw")
+    assert bytes(file_cache.get(path)) == b"xyzw"
+    assert file_cache.stats == {"hits": 1, "misses": 3}
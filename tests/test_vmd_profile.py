@@ -0,0 +1,88 @@
+import io
+
+import numpy as np
+import pytest
+
+from mmd_vmd_interpolation.vmd_profile import VmdSimpleProfile
+from sample_data import BONES_LIST, gen_random_bone
+
+
+def _write_random_bones(path, rng):
+    bones_data = {name: gen_random_bone(name, rng) for name, _, _ in BONES_LIST}
+    VmdSimpleProfile.write_bones(str(path), "model", bones_data)
+    return str(path)
+
+
+def test_motion_table_agrees_with_bone_data(tmp_path):
+    path = _write_random_bones(tmp_path / "bones.vmd", np.random.RandomState(0))
+    vmd_profile = VmdSimpleProfile(path)
+    names = [name for name, _, _ in BONES_LIST]
+    bones_data = vmd_profile.read_desired_bones(names)
+    motion_table = vmd_profile.read_motion_table(names)
+    assert motion_table.frame_ids.dtype == np.dtype("int")
+    assert motion_table.positions.dtype == np.dtype("float")
+    for name in names:
+        bone_view = motion_table.get_bone(name)
+        bone_data = bones_data[name]
+        for member_name in bone_view.__slots__[1:]:
+            np.testing.assert_array_equal(getattr(bone_view, member_name), getattr(bone_data, member_name))
+
+
+def test_bone_view_sorts_and_masks_without_modifying_table(tmp_path):
+    path = _write_random_bones(tmp_path / "bones.vmd", np.random.RandomState(1))
+    motion_table = VmdSimpleProfile(path).read_motion_table()
+    frame_ids_table = motion_table.frame_ids.copy()
+    bone_view = motion_table.get_bone("upper")
+    frame_ids = bone_view.frame_ids.copy()
+    positions = bone_view.positions.copy()
+    # reverse order, then sort back
+    bone_view.apply_mask(np.arange(bone_view.get_frame_num())[::-1])
+    np.testing.assert_array_equal(bone_view.frame_ids, frame_ids[::-1])
+    bone_view.sort_frame()
+    np.testing.assert_array_equal(bone_view.frame_ids, frame_ids)
+    np.testing.assert_array_equal(bone_view.positions, positions)
+    # drop odd keyframes
+    bone_view.apply_mask(bone_view.frame_ids % 2 == 0)
+    np.testing.assert_array_equal(bone_view.frame_ids, frame_ids[frame_ids % 2 == 0])
+    np.testing.assert_array_equal(motion_table.frame_ids, frame_ids_table)
+    bone_data = bone_view.to_bone_data()
+    np.testing.assert_array_equal(bone_data.positions, positions[frame_ids % 2 == 0])
+
+
+class _ReadOnlyStream(object):
+
+    # stream without seekable method
+
+    def __init__(self, raw):
+        self.raw = io.BytesIO(raw)
+
+    def read(self, size=-1):
+        return self.raw.read(size)
+
+
+@pytest.mark.parametrize("ext", [".vmd", ".vmd.gz", ".vmd.xz", ".zip"])
+def test_read_from_buffers_and_file_objects(tmp_path, ext):
+    rng = np.random.RandomState(4)
+    bone_data = gen_random_bone("center", rng)
+    path = str(tmp_path / ("bones" + ext))
+    VmdSimpleProfile.write_bones(path, "model", {"center": bone_data})
+    with open(path, "rb") as fp:
+        raw = fp.read()
+    prefix = b"\x00" * 7
+    path_prefixed = str(tmp_path / "prefixed.bin")
+    with open(path_prefixed, "wb") as fp:
+        fp.write(prefix + raw)
+    stream_prefixed = io.BytesIO(prefix + raw)
+    stream_prefixed.seek(len(prefix))
+    with open(path_prefixed, "rb") as fp:
+        fp.seek(len(prefix))
+        for src in [raw, bytearray(raw), memoryview(raw), io.BytesIO(raw), stream_prefixed, fp,
+                _ReadOnlyStream(raw)]:
+            vmd_profile = VmdSimpleProfile(src)
+            assert vmd_profile.read_model_name() == "model"
+            assert vmd_profile.read_members() == (["bones.vmd"] if ext == ".zip" else [])
+            assert vmd_profile.read_frame_nums()["bone"] == bone_data.get_frame_num()
+            # read again from the start of vmd data
+            bone_read = vmd_profile.read_desired_bones(["center"])["center"]
+            np.testing.assert_array_equal(bone_read.frame_ids, bone_data.frame_ids)
+            np.testing.assert_allclose(bone_read.positions, bone_data.positions, atol=1e-6)
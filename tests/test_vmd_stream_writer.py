@@ -0,0 +1,76 @@
+import io
+
+import numpy as np
+import pytest
+
+from mmd_vmd_interpolation.vmd_profile import (
+    VmdBoneData,
+    VmdSimpleProfile,
+    VmdStreamWriter,
+)
+from sample_data import BONES_LIST, gen_random_bone, gen_random_camera
+
+
+class _NonSeekableStream(io.RawIOBase):
+
+    def __init__(self):
+        self.raw = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def write(self, b):
+        return self.raw.write(b)
+
+
+def test_stream_writer_patches_frame_nums(tmp_path):
+    rng = np.random.RandomState(2)
+    bones_data = {name: gen_random_bone(name, rng) for name, _, _ in BONES_LIST}
+    camera_data = gen_random_camera(rng)
+    path = str(tmp_path / "bones.vmd")
+    VmdSimpleProfile.write_bones(path, "model", bones_data)
+    # chunks of unknown frame number are patched after the section
+    stream = io.BytesIO()
+    with VmdStreamWriter(stream, "model") as writer:
+        for name, bone_data in bones_data.items():
+            half = bone_data.get_frame_num() // 2
+            for mask in [slice(None, half), slice(half, None)]:
+                bone_chunk = VmdBoneData(name)
+                for member_name, member_value in bone_data.__dict__.items():
+                    if isinstance(member_value, np.ndarray):
+                        setattr(bone_chunk, member_name, member_value[mask])
+                writer.write_bone(name, bone_chunk)
+    with open(path, "rb") as fp:
+        assert stream.getvalue() == fp.read()
+    # camera
+    path = str(tmp_path / "camera.vmd")
+    VmdSimpleProfile.write_camera(path, camera_data)
+    stream = io.BytesIO()
+    with VmdStreamWriter(stream, VmdSimpleProfile._CAMERA_HEADER_NAME) as writer:
+        writer.write_camera(camera_data)
+    with open(path, "rb") as fp:
+        assert stream.getvalue() == fp.read()
+    camera_read = VmdSimpleProfile(path).read_camera()
+    np.testing.assert_array_equal(camera_read.frame_ids, camera_data.frame_ids)
+
+
+def test_stream_writer_to_non_seekable_stream(tmp_path):
+    rng = np.random.RandomState(3)
+    bone_data = gen_random_bone("center", rng)
+    frame_num = bone_data.get_frame_num()
+    stream = _NonSeekableStream()
+    with VmdStreamWriter(stream, "model", bone_frame_num=frame_num, camera_frame_num=0) as writer:
+        writer.write_bone("center", bone_data)
+    path = str(tmp_path / "bone.vmd")
+    with open(path, "wb") as fp:
+        fp.write(stream.raw.getvalue())
+    bone_read = VmdSimpleProfile(path).read_desired_bones(["center"])["center"]
+    np.testing.assert_array_equal(bone_read.frame_ids, bone_data.frame_ids)
+    # given frame number has to be kept
+    stream = _NonSeekableStream()
+    with pytest.raises(ValueError):
+        with VmdStreamWriter(stream, "model", bone_frame_num=frame_num+1, camera_frame_num=0) as writer:
+            writer.write_bone("center", bone_data)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import argparse
+import copy
+import time
+
+import numpy as np
+
+from mmd_vmd_interpolation.camera_trace_bone import CameraSmoother
+from mmd_vmd_interpolation.vmd_profile import (
+    VmdCameraData,
+    VmdSimpleProfile,
+)
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "src_camera", type=str, nargs="?",
+        help="source camera vmd file (default: random camera data)",
+    )
+    parser.add_argument(
+        "-n", "--frame_num", type=int, default=20000,
+        help="number of keyframes of random camera data",
+    )
+    parser.add_argument(
+        "-t", "--threads", type=int, nargs="+", default=[1, 2, 4, 8],
+        help="numbers of threads to compare",
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3,
+        help="number of repetitions (best one is reported)",
+    )
+    parser.add_argument(
+        "-e", "--edit_num", type=int, default=5,
+        help="number of edited keyframes for incremental interpolation",
+    )
+    args = parser.parse_args()
+
+    if args.src_camera:
+        camera_data = VmdSimpleProfile(args.src_camera).read_camera()
+    else:
+        camera_data = gen_random_camera_data(args.frame_num)
+    print("camera data with %d keyframes" % camera_data.get_frame_num())
+
+    for need_smooth in [False, True]:
+        print("need_smooth = %s" % need_smooth)
+        camera_interp_ref = None
+        time_ref = None
+        for thread_num in args.threads:
+            elapsed_list = []
+            for _ in range(args.repeat):
+                cs = CameraSmoother(camera_data, thread_num=thread_num)
+                time_start = time.perf_counter()
+                camera_interp = cs.interp(need_smooth)
+                elapsed_list.append(time.perf_counter() - time_start)
+            elapsed = min(elapsed_list)
+            if camera_interp_ref is None:
+                camera_interp_ref = camera_interp
+                time_ref = elapsed
+            is_identical = all([
+                np.array_equal(getattr(camera_interp, name), getattr(camera_interp_ref, name))
+                    for name in ["positions", "orientations", "distances", "fov_angles"]
+            ])
+            print(
+                "  threads: %2d, time: %.3f sec, speedup: %.2f, identical: %s"
+                % (thread_num, elapsed, time_ref / elapsed, is_identical)
+            )
+
+        # incremental interpolation after editing a few keyframes
+        camera_data_edit = copy.deepcopy(camera_data)
+        rng = np.random.RandomState(1)
+        edit_loc = rng.choice(camera_data.get_frame_num(), args.edit_num, replace=False)
+        camera_data_edit.positions[edit_loc] += rng.randn(len(edit_loc), 3)
+        result_prev = CameraSmoother(camera_data).interp_result(need_smooth)
+        elapsed_list = []
+        for is_incremental in [False, True]:
+            cs = CameraSmoother(camera_data_edit)
+            time_start = time.perf_counter()
+            camera_interp = cs.interp_result(
+                need_smooth, previous=result_prev if is_incremental else None,
+            ).camera_data
+            elapsed_list.append(time.perf_counter() - time_start)
+            if not is_incremental:
+                camera_interp_ref = camera_interp
+        is_identical = all([
+            np.array_equal(getattr(camera_interp, name), getattr(camera_interp_ref, name))
+                for name in ["frame_ids", "positions", "orientations", "distances", "fov_angles"]
+        ])
+        print(
+            "  incremental with %d edited keyframes: time: %.3f sec (full: %.3f sec), identical: %s"
+            % (len(edit_loc), elapsed_list[1], elapsed_list[0], is_identical)
+        )
+
+
+def gen_random_camera_data(frame_num, seed=0):
+    # type: (int, int) -> VmdCameraData
+    rng = np.random.RandomState(seed)
+    camera_data = VmdCameraData(frame_num)
+    # keyframe intervals with camera cuts (1 frame interval)
+    camera_data.frame_ids[:] = np.cumsum(rng.choice([1, 3, 5, 10, 30], frame_num)) - 1
+    camera_data.positions[:] = rng.randn(frame_num, 3) * 5
+    camera_data.orientations[:] = rng.randn(frame_num, 3) * 0.5
+    camera_data.distances[:] = -30 + rng.randn(frame_num)
+    camera_data.fov_angles[:] = 30
+    camera_data.curve_x[:] = rng.randint(0, 128, (frame_num, 4))
+    camera_data.curve_rot[:] = rng.randint(0, 128, (frame_num, 4))
+    return camera_data
+
+
+if __name__ == "__main__":
+    main()
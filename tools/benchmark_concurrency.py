@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import argparse
+import concurrent.futures
+import hashlib
+import io
+import time
+
+import numpy as np
+
+from benchmark_camera_smoother import gen_random_camera_data
+from mmd_vmd_interpolation.bones_pose_calculator import BonesPoseCalculator, BonesTree
+from mmd_vmd_interpolation.camera_trace_bone import CameraSmoother, CameraTracer
+from mmd_vmd_interpolation.vmd_profile import (
+    VmdBoneData,
+    VmdCameraData,
+    VmdSimpleProfile,
+)
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=32,
+        help="number of jobs to run",
+    )
+    parser.add_argument(
+        "-n", "--frame_num", type=int, default=2000,
+        help="number of keyframes of random camera and bone data",
+    )
+    parser.add_argument(
+        "-t", "--threads", type=int, nargs="+", default=[1, 2, 4, 8],
+        help="numbers of threads to compare",
+    )
+    parser.add_argument(
+        "-c", "--calculators", nargs="+", default=["shared", "per_job"],
+        choices=["shared", "per_job"],
+        help="calculator shared by all jobs (serialized by its lock), "
+            "or created for each job (computed in parallel)",
+    )
+    args = parser.parse_args()
+
+    bones_data, bones_tree = gen_random_bones_data(args.frame_num)
+    camera_data = gen_random_camera_data(args.frame_num)
+    print("%d jobs with %d keyframes" % (args.jobs, args.frame_num))
+
+    digests_ref = None
+    for calculator in args.calculators:
+        print("calculator: %s" % calculator)
+        time_ref = None
+        for thread_num in args.threads:
+            # shared calculator checks its memoization under contention,
+            # where its methods are serialized by its lock and don't scale with threads
+            if calculator == "shared":
+                bpc = BonesPoseCalculator(bones_data, bones_tree)
+                get_bpc = lambda: bpc
+            else:
+                get_bpc = lambda: BonesPoseCalculator(bones_data, bones_tree)
+            time_start = time.perf_counter()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=thread_num) as executor:
+                digests = list(executor.map(
+                    lambda job_id: run_job(job_id, get_bpc(), camera_data),
+                    range(args.jobs),
+                ))
+            elapsed = time.perf_counter() - time_start
+            if digests_ref is None:
+                digests_ref = digests
+            if time_ref is None:
+                time_ref = elapsed
+            print(
+                "  threads: %2d, time: %.3f sec, jobs/sec: %.2f, speedup: %.2f, identical: %s"
+                % (thread_num, elapsed, args.jobs / elapsed, time_ref / elapsed,
+                   digests == digests_ref)
+            )
+
+
+def run_job(job_id, bpc, camera_data):
+    # type: (int, BonesPoseCalculator, VmdCameraData) -> str
+    # nonrotatable bones with the calculator, whose interpolated bones are
+    # shared by jobs, but time delay differs for each job
+    nonrotatable_bones = bpc.get_lpf_full_positions_bones(0.3 + 0.01 * job_id)
+    buf_bones = io.BytesIO()
+    VmdSimpleProfile.write_bones(buf_bones, "model", nonrotatable_bones)
+    # camera tracing bone with shake, whose seed differs for each job
+    camera_interp = CameraSmoother(camera_data).interp(need_smooth=job_id % 2 == 0)
+    camera_interp.positions = CameraTracer.trace_bone(camera_interp, nonrotatable_bones["head"])
+    camera_interp.positions = CameraTracer.add_camera_shake(
+        camera_interp, 0.5, 0.1, seed=job_id,
+    )
+    buf_camera = io.BytesIO()
+    VmdSimpleProfile.write_camera(buf_camera, camera_interp)
+    return hashlib.sha1(buf_bones.getvalue() + buf_camera.getvalue()).hexdigest()
+
+
+def gen_random_bones_data(frame_num, seed=0):
+    # type: (int, int) -> tuple[dict[str, VmdBoneData], dict]
+    rng = np.random.RandomState(seed)
+    bones_list = [
+        ("center", None, np.array([0., 8., 0.])),
+        ("upper_body", "center", np.array([0., 11., 0.])),
+        ("head", "upper_body", np.array([0., 16., 0.])),
+    ]
+    bones_data = {}  # type: dict[str, VmdBoneData]
+    for name, _, _ in bones_list:
+        bone_data = VmdBoneData(name, frame_num)
+        bone_data.frame_ids[:] = np.cumsum(rng.randint(1, 10, frame_num)) - 1
+        bone_data.positions[:] = rng.randn(frame_num, 3)
+        orientations = rng.randn(frame_num, 4)
+        bone_data.orientations[:] = orientations / np.linalg.norm(orientations, axis=1, keepdims=True)
+        bone_data.curve_x[:] = rng.randint(0, 128, (frame_num, 4))
+        bone_data.curve_rot[:] = rng.randint(0, 128, (frame_num, 4))
+        bones_data[name] = bone_data
+    return bones_data, BonesTree.get(bones_list)
+
+
+if __name__ == "__main__":
+    main()
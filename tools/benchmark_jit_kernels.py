@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import argparse
+import time
+
+import numpy as np
+
+from mmd_vmd_interpolation.bones_pose_calculator import BonesPoseCalculator
+from mmd_vmd_interpolation.camera_trace_bone import CameraSmoother
+from mmd_vmd_interpolation.jit_backend import JitBackend
+from mmd_vmd_interpolation.mmd_curve_interp import MMDCurveInterp
+from mmd_vmd_interpolation.vmd_profile import VmdCameraData
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n", "--frame_num", type=int, default=100000,
+        help="number of frames of random data",
+    )
+    parser.add_argument(
+        "-d", "--delay", type=float, default=0.3,
+        help="time delay of low-pass filter (second)",
+    )
+    parser.add_argument(
+        "--atol", type=float, default=1e-6,
+        help="absolute tolerance of parity between backends",
+    )
+    args = parser.parse_args()
+
+    if not JitBackend.is_available():
+        print("numba is not installed, only numpy backend is available")
+        return
+    rng = np.random.RandomState(0)
+    x = np.cumsum(rng.randn(args.frame_num, 3), axis=0)
+    print("%d frames" % args.frame_num)
+
+    # low-pass filter
+    is_same = compare_backends(
+        "lpf", lambda: BonesPoseCalculator.apply_lpf(x, args.delay), args.atol,
+    )
+
+    # bezier curves of each ratio in interval
+    curve_params = rng.randint(0, 128, (args.frame_num, 4))
+    ratios = rng.rand(args.frame_num)
+    is_same &= compare_backends(
+        "curves", lambda: MMDCurveInterp._solve_curves_y_from_x(curve_params, ratios), args.atol,
+    )
+
+    # camera with keyframes every few frames
+    camera_smoother = CameraSmoother(gen_random_camera_data(x[::4], rng))
+    is_same &= compare_backends(
+        "camera", lambda: get_camera_values(camera_smoother.interp(need_smooth=False)), args.atol,
+    )
+    print("parity OK" if is_same else "parity FAILED")
+    exit(0 if is_same else 1)
+
+
+def compare_backends(name, fun, atol):
+    # type: (str, callable, float) -> bool
+    # time the numpy and compiled paths of the same function,
+    # where the first call of compiled path includes compilation (or loading cache)
+    JitBackend.set_enabled(False)
+    y_ref, elapsed_ref = timeit(fun)
+    JitBackend.set_enabled(True)
+    time_start = time.perf_counter()
+    fun()
+    elapsed_first = time.perf_counter() - time_start
+    y, elapsed = timeit(fun)
+    deviation = float(np.abs(y - y_ref).max()) if np.size(y) else 0.0
+    print(
+        "  %s: numpy %.3f sec, jit %.3f sec (first call %.3f sec), max difference %g"
+        % (name, elapsed_ref, elapsed, elapsed_first, deviation)
+    )
+    return deviation <= atol
+
+
+def gen_random_camera_data(x, rng):
+    # type: (np.ndarray, np.random.RandomState) -> VmdCameraData
+    camera_data = VmdCameraData(len(x))
+    camera_data.frame_ids[:] = np.cumsum(rng.randint(1, 10, len(x)))
+    camera_data.positions[:] = x
+    camera_data.orientations[:] = x * 0.01
+    camera_data.distances[:] = x[:, 0]
+    camera_data.fov_angles[:] = rng.randint(10, 60, len(x))
+    for name in ["curve_x", "curve_y", "curve_z", "curve_rot", "curve_dis", "curve_fov"]:
+        getattr(camera_data, name)[:] = rng.randint(0, 128, (len(x), 4))
+    return camera_data
+
+
+def get_camera_values(camera_data):
+    # type: (VmdCameraData) -> np.ndarray
+    return np.column_stack([
+        camera_data.positions, camera_data.orientations,
+        camera_data.distances, camera_data.fov_angles,
+    ])
+
+
+def timeit(fun, repeat=3):
+    # best time of repetitions
+    elapsed_list = []
+    for _ in range(repeat):
+        time_start = time.perf_counter()
+        result = fun()
+        elapsed_list.append(time.perf_counter() - time_start)
+    return result, min(elapsed_list)
+
+
+if __name__ == "__main__":
+    main()
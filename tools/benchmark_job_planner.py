@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from mmd_vmd_interpolation.bone_tracing_camera_job import (
+    generate_bone_tracing_camera_data,
+    plan_bone_tracing_camera_data,
+)
+from mmd_vmd_interpolation.job_planner import JobPlanner
+from mmd_vmd_interpolation.nonrotatable_bones_job import (
+    generate_nonrotatable_bones_data,
+    plan_nonrotatable_bones_data,
+)
+from mmd_vmd_interpolation.vmd_profile import (
+    VmdBoneData,
+    VmdSimpleProfile,
+)
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("src", type=str, help="source motion vmd file")
+    parser.add_argument("--camera", type=str, help="source camera vmd file")
+    parser.add_argument(
+        "-r", "--repeat_motion", type=int, default=20,
+        help="number of times the motion is repeated along time for a large job",
+    )
+    parser.add_argument(
+        "-d", "--delay", type=float, default=0.3,
+        help="time delay of motion smoothing (second)",
+    )
+    args = parser.parse_args()
+
+    # peak memory traced by python (numpy arrays included) and wall time,
+    # compared with the estimates from vmd header
+    temp_dir = tempfile.mkdtemp()
+    try:
+        src = os.path.join(temp_dir, "motion.vmd")
+        write_repeated_motion(args.src, src, args.repeat_motion)
+        summary = JobPlanner.read_summary(src)
+        print(
+            "motion: %d keyframes, frames %d ~ %d"
+            % ((summary["frame_nums"]["bone"],) + tuple(summary["frame_id_range"]))
+        )
+        dst = os.path.join(temp_dir, "nonrotatable.vmd")
+        for mode in JobPlanner.MODES:
+            plan = plan_nonrotatable_bones_data(src, args.delay, memory_mode=mode)
+            _, peak_bytes, elapsed = measure(
+                generate_nonrotatable_bones_data, src=src, dst=dst,
+                motion_time_delay=args.delay, memory_mode=mode,
+            )
+            print_comparison("nonrotatable bones (%s)" % mode, plan, peak_bytes, elapsed)
+        if args.camera:
+            dst_camera = os.path.join(temp_dir, "camera.vmd")
+            options = {
+                "src_camera": args.camera,
+                "src_nonrotatable_bone": dst,
+                "trace_bone_name": "head",
+                "motion_time_delay": args.delay,
+            }
+            plan = plan_bone_tracing_camera_data(**options)
+            _, peak_bytes, elapsed = measure(
+                generate_bone_tracing_camera_data, dst_camera=dst_camera,
+                camera_shake_interval=0.0, **options
+            )
+            print_comparison("bone tracing camera", plan, peak_bytes, elapsed)
+            options = {
+                "src_camera": args.camera,
+                "src_dancers": [src, src],
+                "trace_bone_name": "head",
+                "motion_time_delay": args.delay,
+            }
+            plan = plan_bone_tracing_camera_data(**options)
+            _, peak_bytes, elapsed = measure(
+                generate_bone_tracing_camera_data, dst_camera=dst_camera,
+                camera_shake_interval=0.0, **options
+            )
+            print_comparison("bone tracing camera (2 dancers)", plan, peak_bytes, elapsed)
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def measure(fun, **kwargs):
+    # type: (callable, ...) -> tuple[object, int, float]
+    # time of an untraced run (tracing slows down allocations), and peak memory
+    # of a traced run, where messages of the tool are suppressed
+    with contextlib.redirect_stdout(io.StringIO()):
+        time_start = time.perf_counter()
+        fun(**kwargs)
+        elapsed = time.perf_counter() - time_start
+        tracemalloc.start()
+        try:
+            result = fun(**kwargs)
+            _, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return result, peak_bytes, elapsed
+
+
+def print_comparison(name, plan, peak_bytes, elapsed):
+    # type: (str, dict, int, float) -> None
+    print(
+        "  %s: peak memory %.1f MB (estimated %.1f MB), time %.2f sec (estimated %.2f sec)"
+        % (name, peak_bytes / 1e6, plan["peak_bytes"] / 1e6, elapsed, plan["seconds"])
+    )
+
+
+def write_repeated_motion(src, dst, repeat):
+    # type: (str, str, int) -> None
+    # keyframes of the motion are repeated after its last frame
+    vp = VmdSimpleProfile(src)
+    motion_table = vp.read_motion_table()
+    period = int(motion_table.frame_ids.max()) + 1 if motion_table.get_frame_num() else 1
+    bones_data = {}  # type: dict[str, VmdBoneData]
+    for name, bone_view in motion_table.get_bones().items():
+        bone_data = bone_view.to_bone_data()
+        frame_num = bone_data.get_frame_num()
+        bone_repeated = VmdBoneData(name, frame_num * repeat)
+        bone_repeated.frame_ids[:] = (
+            np.asarray(bone_data.frame_ids).reshape(1, -1)
+            + period * np.arange(repeat).reshape(-1, 1)
+        ).ravel()
+        for attr in ["positions", "orientations", "curve_x", "curve_y", "curve_z", "curve_rot"]:
+            getattr(bone_repeated, attr)[:] = np.tile(getattr(bone_data, attr), (repeat, 1))
+        bones_data[name] = bone_repeated
+    VmdSimpleProfile.write_bones(dst, vp.read_model_name(), bones_data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import argparse
+import concurrent.futures
+import time
+
+import numpy as np
+
+from mmd_vmd_interpolation.bones_pose_calculator import BonesPoseCalculator
+from mmd_vmd_interpolation.camera_trace_bone import SmoothInterp
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n", "--frame_num", type=int, default=100000,
+        help="number of frames of random data",
+    )
+    parser.add_argument(
+        "-d", "--delay", type=float, default=0.3,
+        help="time delay of low-pass filter (second)",
+    )
+    parser.add_argument(
+        "-t", "--threads", type=int, nargs="+", default=[1, 2, 4],
+        help="numbers of threads of low-pass filter to compare",
+    )
+    args = parser.parse_args()
+
+    # compare with scipy, which is optional
+    try:
+        import scipy.interpolate
+        import scipy.signal
+    except ImportError:
+        scipy = None
+        print("scipy is not installed, only numpy kernels are timed")
+
+    rng = np.random.RandomState(0)
+    x = np.cumsum(rng.randn(args.frame_num, 3), axis=0)
+    print("%d frames" % args.frame_num)
+
+    # low-pass filter
+    y, elapsed = timeit(lambda: BonesPoseCalculator.apply_lpf(x, args.delay))
+    line = "  lpf:   numpy %.3f sec" % elapsed
+    if scipy is not None:
+        dt = 1/30.0
+        lag_ratio = 1.0 / (1.0 + 2.5 / args.delay * dt)
+        b = np.array([1.0 - lag_ratio])
+        a = np.array([1.0, -lag_ratio])
+        zi = scipy.signal.lfilter_zi(b, a)
+        (y_ref, _), elapsed_ref = timeit(
+            lambda: scipy.signal.lfilter(b, a, x, axis=0, zi=zi*np.array([x[0]])),
+        )
+        line += ", scipy %.3f sec, max difference %g" % (elapsed_ref, np.abs(y - y_ref).max())
+    print(line)
+    # segments of timeline in parallel, compared with the sequential one
+    for thread_num in args.threads:
+        if thread_num > 1:
+            # threads are reused as by BonesPoseCalculator
+            with concurrent.futures.ThreadPoolExecutor(thread_num) as executor:
+                y_parallel, elapsed_parallel = timeit(
+                    lambda: BonesPoseCalculator.apply_lpf(
+                        x, args.delay, thread_num=thread_num, executor=executor,
+                    ),
+                )
+            print(
+                "    threads: %2d, time: %.3f sec, speedup: %.2f, max difference %g"
+                % (thread_num, elapsed_parallel, elapsed / elapsed_parallel,
+                    np.abs(y_parallel - y).max())
+            )
+
+    # pchip with keyframes every few frames
+    frame_ids = np.cumsum(rng.randint(1, 10, args.frame_num // 4)).astype("float")
+    values = x[:len(frame_ids)]
+    frame_ids_desired = np.arange(frame_ids[-1] + 1)
+    y, elapsed = timeit(lambda: SmoothInterp.interp(frame_ids, values, frame_ids_desired))
+    line = "  pchip: numpy %.3f sec" % elapsed
+    if scipy is not None:
+        y_ref, elapsed_ref = timeit(lambda: scipy.interpolate.PchipInterpolator(
+            frame_ids, values, axis=0,
+        )(frame_ids_desired))
+        line += ", scipy %.3f sec, max difference %g" % (elapsed_ref, np.abs(y - y_ref).max())
+    print(line)
+
+
+def timeit(fun, repeat=3):
+    # best time of repetitions
+    elapsed_list = []
+    for _ in range(repeat):
+        time_start = time.perf_counter()
+        result = fun()
+        elapsed_list.append(time.perf_counter() - time_start)
+    return result, min(elapsed_list)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+TOOLS = [
+    "generate_nonrotatable_bones_data",
+    "generate_bone_tracing_camera_data",
+    "compare_vmd",
+    "run_batch_jobs",
+]
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-t", "--tools", type=str, nargs="+", default=TOOLS,
+        help="modules of tools to import",
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=5,
+        help="number of repetitions (best one is reported)",
+    )
+    parser.add_argument(
+        "--top", type=int, default=5,
+        help="number of listed heaviest top-level packages",
+    )
+    parser.add_argument(
+        "--baseline", type=str,
+        help="json file of import times to compare with",
+    )
+    parser.add_argument(
+        "--save_baseline", type=str,
+        help="json file to save import times as baseline",
+    )
+    args = parser.parse_args()
+
+    baseline = {}  # type: dict[str, dict]
+    if args.baseline:
+        with open(args.baseline, "rb") as fp:
+            baseline = json.loads(fp.read().decode("utf-8"))
+
+    results = {}  # type: dict[str, dict]
+    for tool in args.tools:
+        results[tool] = result = measure_startup(tool, args.repeat)
+        line = "%s: import %.1f ms, process %.1f ms" % (
+            tool, result["import_us"] / 1e3, result["process_ms"],
+        )
+        if tool in baseline:
+            line += " (baseline import %.1f ms, process %.1f ms)" % (
+                baseline[tool]["import_us"] / 1e3, baseline[tool]["process_ms"],
+            )
+        print(line)
+        packages = sorted(result["packages"].items(), key=lambda item: -item[1])
+        print("  heaviest packages: %s" % ", ".join([
+            "%s %.1f ms" % (name, us / 1e3) for name, us in packages[:args.top]
+        ]))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "wb") as fp:
+            fp.write(json.dumps(results, indent=1, sort_keys=True).encode("utf-8"))
+
+
+def measure_startup(tool, repeat=5):
+    # type: (str, int) -> dict
+    # import time by "python -X importtime", and wall time of the whole process,
+    # in new processes which import nothing in advance
+    tools_dir = os.path.dirname(os.path.abspath(__file__))
+    best = None  # type: dict | None
+    for _ in range(repeat):
+        time_start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import %s" % tool],
+            cwd=tools_dir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True,
+        )
+        process_ms = (time.perf_counter() - time_start) * 1e3
+        result = parse_importtime(proc.stderr.decode("utf-8"), tool)
+        result["process_ms"] = process_ms
+        if best is None or result["import_us"] < best["import_us"]:
+            best = result
+    return best
+
+
+def parse_importtime(log, tool):
+    # type: (str, str) -> dict
+    # lines of "import time: self [us] | cumulative | imported package",
+    # where self time of modules is summed up by top-level package
+    import_us = 0
+    packages = {}  # type: dict[str, int]
+    for line in log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if name == tool:
+            import_us = int(cumulative_us)
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+    return {"import_us": import_us, "packages": packages}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import argparse
+import io
+import time
+
+import numpy as np
+
+from mmd_vmd_interpolation.vmd_comparator import VmdComparator
+from mmd_vmd_interpolation.vmd_profile import (
+    VmdBoneData,
+    VmdSimpleProfile,
+)
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n", "--frame_num", type=int, default=2000000,
+        help="total number of keyframes of random bone data",
+    )
+    parser.add_argument(
+        "-b", "--bone_num", type=int, default=100,
+        help="number of bones of random bone data",
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3,
+        help="number of repetitions (best one is reported)",
+    )
+    args = parser.parse_args()
+
+    # the other file has keys in another order, a few changed values,
+    # and a few missing and extra keys
+    bones_a = gen_random_bones_data(args.frame_num, args.bone_num, seed=0)
+    bones_b = gen_random_bones_data(args.frame_num, args.bone_num, seed=0)
+    rng = np.random.RandomState(1)
+    changed_num = 0
+    for bone_b in list(bones_b.values())[::10]:
+        loc = rng.choice(bone_b.get_frame_num(), 3, replace=False)
+        bone_b.positions[loc] += 1.0
+        bone_b.apply_mask(np.arange(bone_b.get_frame_num()) != loc[0])
+        changed_num += 2
+    bones_b = dict(reversed(list(bones_b.items())))
+    buf_a = io.BytesIO()
+    buf_b = io.BytesIO()
+    VmdSimpleProfile.write_bones(buf_a, "model", bones_a)
+    VmdSimpleProfile.write_bones(buf_b, "model", bones_b)
+    print(
+        "%d keyframes of %d bones (%.1f MB), %d changed and %d missing keys"
+        % (args.frame_num, args.bone_num, len(buf_a.getvalue()) / 1e6,
+           changed_num, changed_num // 2)
+    )
+
+    elapsed_list = []
+    for _ in range(args.repeat):
+        time_start = time.perf_counter()
+        report = VmdComparator.compare_files(buf_a, buf_b)
+        elapsed_list.append(time.perf_counter() - time_start)
+    print(
+        "  time: %.3f sec (including decoding), matched: %d, missing: %d, extra: %d, "
+        "out of tolerance: %d"
+        % (min(elapsed_list), report["matched"], report["missing"], report["extra"],
+           report["fields"]["positions"]["exceeded"])
+    )
+
+
+def gen_random_bones_data(frame_num, bone_num, seed=0):
+    # type: (int, int, int) -> dict[str, VmdBoneData]
+    rng = np.random.RandomState(seed)
+    bones_data = {}  # type: dict[str, VmdBoneData]
+    for i in range(bone_num):
+        bone_frame_num = frame_num // bone_num
+        bone_data = VmdBoneData("bone%d" % i, bone_frame_num)
+        bone_data.frame_ids[:] = np.arange(bone_frame_num)
+        bone_data.positions[:] = rng.randn(bone_frame_num, 3)
+        orientations = rng.randn(bone_frame_num, 4)
+        bone_data.orientations[:] = orientations / np.linalg.norm(orientations, axis=1, keepdims=True)
+        bone_data.curve_x[:] = rng.randint(0, 128, (bone_frame_num, 4))
+        bones_data[bone_data.name] = bone_data
+    return bones_data
+
+
+if __name__ == "__main__":
+    main()
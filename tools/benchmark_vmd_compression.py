@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmark_camera_smoother import gen_random_camera_data
+from benchmark_vmd_comparator import gen_random_bones_data
+from mmd_vmd_interpolation.vmd_profile import (
+    VmdSimpleProfile,
+    VmdStreamWriter,
+)
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n", "--frame_num", type=int, default=200000,
+        help="total number of keyframes of random bone data",
+    )
+    parser.add_argument(
+        "-c", "--camera_frame_num", type=int, default=2000,
+        help="number of keyframes of random camera data",
+    )
+    parser.add_argument(
+        "-f", "--formats", type=str, nargs="+", default=[".vmd", ".vmd.gz", ".vmd.xz", ".zip"],
+        help="extensions of files to compare",
+    )
+    args = parser.parse_args()
+
+    # random data whose values are quantized like edited motion, to be compressible
+    bones_data = gen_random_bones_data(args.frame_num, 100)
+    for bone_data in bones_data.values():
+        bone_data.positions[:] = np.round(np.cumsum(bone_data.positions, axis=0), 1)
+    camera_data = gen_random_camera_data(args.camera_frame_num)
+    print(
+        "%d keyframes of bones and %d keyframes of camera"
+        % (args.frame_num, args.camera_frame_num)
+    )
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        for ext in args.formats:
+            dst = os.path.join(temp_dir, "motion" + ext)
+            time_start = time.perf_counter()
+            with VmdStreamWriter(
+                    dst, "model",
+                    bone_frame_num=sum([b.get_frame_num() for b in bones_data.values()]),
+                    camera_frame_num=camera_data.get_frame_num(),
+                ) as writer:
+                writer.write_bone_chunks(bones_data.items())
+                writer.write_camera(camera_data)
+            elapsed_write = time.perf_counter() - time_start
+            size = os.path.getsize(dst)
+            if ext == ".vmd":
+                raw_size = size
+            # all bones, and camera only which skips bones block
+            vp = VmdSimpleProfile(dst)
+            time_start = time.perf_counter()
+            vp.read_motion_table()
+            elapsed_bones = time.perf_counter() - time_start
+            time_start = time.perf_counter()
+            vp.read_camera()
+            elapsed_camera = time.perf_counter() - time_start
+            print(
+                "  %-8s size: %6.1f MB (%5.1f%%), write: %.3f sec, read bones: %.3f sec "
+                "(%.0f MB/s), read camera: %.3f sec (%.0f MB/s)"
+                % (ext, size / 1e6, 100.0 * size / raw_size, elapsed_write,
+                   elapsed_bones, raw_size / 1e6 / elapsed_bones,
+                   elapsed_camera, raw_size / 1e6 / elapsed_camera)
+            )
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
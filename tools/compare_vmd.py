@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import argparse
+
+from mmd_vmd_interpolation.vmd_comparator import VmdComparator
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("src_a", type=str, help="reference vmd file")
+    parser.add_argument("src_b", type=str, help="vmd file compared with the reference")
+    parser.add_argument(
+        "--atol", type=float, default=1e-4,
+        help="absolute tolerance of values",
+    )
+    parser.add_argument(
+        "--rtol", type=float, default=0.0,
+        help="relative tolerance of values (to the reference)",
+    )
+    parser.add_argument(
+        "--curve_tol", type=int, default=0,
+        help="tolerance of curve control points (0 ~ 127)",
+    )
+    parser.add_argument(
+        "--max_listed", type=int, default=10,
+        help="max number of listed bones or frames of missing and extra keys",
+    )
+    args = parser.parse_args()
+
+    is_equal = compare_vmd(
+        src_a=args.src_a,
+        src_b=args.src_b,
+        atol=args.atol,
+        rtol=args.rtol,
+        curve_tol=args.curve_tol,
+        max_listed=args.max_listed,
+    )
+    exit(0 if is_equal else 1)
+
+
+def compare_vmd(src_a, src_b, atol=1e-4, rtol=0.0, curve_tol=0, max_listed=10):
+    # type: (str, str, float, float, int, int) -> bool
+    report = VmdComparator.compare_files(src_a, src_b, atol, rtol, curve_tol)
+    print(
+        "matched keys: %d, missing keys: %d, extra keys: %d, duplicate keys: %d"
+        % (report["matched"], report["missing"], report["extra"], report["duplicates"])
+    )
+    for name in ["missing", "extra"]:
+        if report.get(name + "_bones"):
+            items = sorted(report[name + "_bones"].items(), key=lambda item: -item[1])
+            print("  %s keys of bones: %s" % (name, ", ".join([
+                "%s (%d)" % item for item in items[:max_listed]
+            ]) + (", ..." if len(items) > max_listed else "")))
+        if len(report.get(name + "_frames", [])):
+            frame_ids = report[name + "_frames"]
+            print("  %s keys of frames: %s" % (name, ", ".join([
+                "%d" % frame_id for frame_id in frame_ids[:max_listed]
+            ]) + (", ..." if len(frame_ids) > max_listed else "")))
+    for name, field in report["fields"].items():
+        print(
+            "%s: max deviation %g, mean deviation %g, %d keys out of tolerance"
+            % (name, field["max"], field["mean"], field["exceeded"])
+        )
+    for name, num in report["curves"].items():
+        if num:
+            print("%s: %d keys differ" % (name, num))
+    if report.get("perspective_flags"):
+        print("perspective_flags: %d keys differ" % report["perspective_flags"])
+    is_equal = VmdComparator.check_is_equal(report)
+    print("same within tolerance" if is_equal else "different")
+    return is_equal
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,16 @@
 # -*- coding: utf-8 -*-
 import argparse
 
-from mmd_vmd_interpolation.camera_trace_bone import (
-    CameraSmoother,
-    CameraTracer,
+from mmd_vmd_interpolation.bone_tracing_camera_job import (
+    generate_bone_tracing_camera_data,
+    generate_bone_tracing_camera_data_sweep,
 )
-from mmd_vmd_interpolation.vmd_profile import VmdSimpleProfile
+from mmd_vmd_interpolation.job_setting import (
+    PREVIEW_STRIDE,
+    QUALITIES,
+    QUALITY_FULL,
+)
+from mmd_vmd_interpolation.keyframe_validator import KeyframeValidator
 
 
 def main():
@@ -21,18 +26,35 @@ def main():
     )
     parser.add_argument(
         "-b", "--src_nonrotatable_bone", type=str,
-        help="nonrotatable bone vmd file",
+        help="nonrotatable bone vmd file (or its dense timeline: directory or .npz)",
+    )
+    parser.add_argument(
+        "--dancers", type=str, nargs="+",
+        help="motion vmd files of members of group dance, "
+            "whose weighted centroid of traced bone is traced instead of nonrotatable bone",
     )
     parser.add_argument(
-        "-t", "--trace_bone_name", type=str,
+        "--dancer_weights", type=float, nargs="+",
+        help="weights of dancers (default: equal)",
+    )
+    parser.add_argument(
+        "--dancer_model", type=str,
+        help="pmx model file providing bone positions of dancers (default: built-in body shape)",
+    )
+    parser.add_argument(
+        "-t", "--trace_bone_name", type=str, nargs="+", default=[None],
         help="name of the bone camera wanted to trace",
     )
     parser.add_argument(
-        "--shake_interval", type=float, default=0.0,
+        "-d", "--delay", type=float, nargs="+", default=[0.0],
+        help="time delay of smoothing nonrotatable bone motion (second)",
+    )
+    parser.add_argument(
+        "--shake_interval", type=float, nargs="+", default=[0.0],
         help="period of camera shaking motion (second)",
     )
     parser.add_argument(
-        "--shake_amplitude", type=float, default=0.0,
+        "--shake_amplitude", type=float, nargs="+", default=[0.0],
         help="aplitude of camera shaking motion (meter)",
     )
     parser.add_argument(
@@ -44,19 +66,87 @@ def main():
         help="flag of smoothing camera fov angles",
     )
     parser.add_argument(
-        "--interp_frame_interval", type=int, default=2,
+        "--interp_frame_interval", type=int, nargs="+", default=[2],
         help="number of frames between 2 interpolation frames",
     )
+    parser.add_argument(
+        "--threads", type=int, default=1,
+        help="number of threads for camera interpolation and bone smoothing",
+    )
+    parser.add_argument(
+        "--seed", type=int,
+        help="seed of random camera shake (random by default)",
+    )
+    parser.add_argument(
+        "--validation", type=str, default=KeyframeValidator.POLICY_REPAIR,
+        choices=KeyframeValidator.POLICIES,
+        help="policy for invalid keyframes (duplicate frames, NaN, unnormalized "
+            "quaternion, out-of-range curve)",
+    )
+    parser.add_argument(
+        "--quality", type=str, default=QUALITY_FULL, choices=QUALITIES,
+        help="quality of output, where preview is evaluated on coarse frames "
+            "with approximated curves and without smoothing bone, "
+            "and progressive overwrites the preview with full quality (not for parameter sweep)",
+    )
+    parser.add_argument(
+        "--preview_stride", type=int, default=PREVIEW_STRIDE,
+        help="number of frames between 2 preview frames",
+    )
+    parser.add_argument(
+        "--memory_budget", type=float,
+        help="budget of peak memory (MB), over which the job is refused "
+            "(estimated from vmd header before loading)",
+    )
     args = parser.parse_args()
 
+    # giving several values of options means parameter sweep
+    sweep_params = [
+        args.interp_frame_interval, args.trace_bone_name, args.delay,
+        args.shake_interval, args.shake_amplitude,
+    ]
+    need_sweep = any([len(values) > 1 for values in sweep_params])
+    if args.dancers and args.src_nonrotatable_bone:
+        parser.error("dancers and src_nonrotatable_bone can't be given together")
+    if args.dancers and need_sweep:
+        parser.error("parameter sweep doesn't support dancers")
+    if args.memory_budget is not None and need_sweep:
+        parser.error("parameter sweep doesn't support memory_budget")
+    if args.dancer_weights and len(args.dancer_weights) != len(args.dancers or []):
+        parser.error("number of dancer_weights has to be the same as dancers")
+    if need_sweep:
+        generate_bone_tracing_camera_data_sweep(
+            src_camera=args.src_camera,
+            dst_camera=args.output,
+            src_nonrotatable_bone=args.src_nonrotatable_bone,
+            trace_bone_names=args.trace_bone_name,
+            motion_time_delays=args.delay,
+            camera_shake_intervals=args.shake_interval,
+            camera_shake_amplitudes=args.shake_amplitude,
+            need_smooth=not args.force_default_interp,
+            need_smooth_fov_angles=args.smooth_fov_angles,
+            interp_frame_intervals=args.interp_frame_interval,
+            thread_num=args.threads,
+            seed=args.seed,
+            validation_policy=args.validation,
+        )
+        return
+    args.interp_frame_interval, args.trace_bone_name, args.delay, \
+        args.shake_interval, args.shake_amplitude = [values[0] for values in sweep_params]
+
     # warning message about src_nonrotatable_bone
-    if args.src_nonrotatable_bone and not args.trace_bone_name:
+    if args.dancers and not args.trace_bone_name:
+        print(
+            "\nWarning: because trace_bone_name is not given, "
+            "ignore dancers: %s\n" % args.dancers
+        )
+    elif args.src_nonrotatable_bone and not args.trace_bone_name:
         print(
             "\nWarning: because trace_bone_name is not given, "
             "ignore src_nonrotatable_bone: '%s'\n"
              % args.src_nonrotatable_bone
         )
-    elif not args.src_nonrotatable_bone and args.trace_bone_name:
+    elif not args.src_nonrotatable_bone and not args.dancers and args.trace_bone_name:
         print(
             "\nWarning: because src_nonrotatable_bone is not given, "
             "ignore trace_bone_name: '%s'\n"
@@ -79,72 +169,23 @@ def main():
         dst_camera=args.output,
         src_nonrotatable_bone=args.src_nonrotatable_bone,
         trace_bone_name=args.trace_bone_name,
+        motion_time_delay=args.delay,
         camera_shake_interval=args.shake_interval,
         camera_shake_amplitude=args.shake_amplitude,
         need_smooth=not args.force_default_interp,
         need_smooth_fov_angles=args.smooth_fov_angles,
         interp_frame_interval=args.interp_frame_interval,
+        thread_num=args.threads,
+        seed=args.seed,
+        validation_policy=args.validation,
+        quality=args.quality,
+        preview_stride=args.preview_stride,
+        src_dancers=args.dancers,
+        dancer_weights=args.dancer_weights,
+        src_dancer_model=args.dancer_model,
+        memory_budget=args.memory_budget,
     )
 
 
-def generate_bone_tracing_camera_data(
-        src_camera,
-        dst_camera,
-        need_smooth=True,
-        need_smooth_fov_angles=False,
-        camera_shake_interval=1.0,
-        camera_shake_amplitude=0.1,
-        src_nonrotatable_bone=None,
-        trace_bone_name=None,
-        interp_frame_interval=2,
-    ):
-
-    vpc = VmdSimpleProfile(src_camera)
-
-    if not vpc.check_is_camera():
-        print("Not camera data but bone data: " + src_camera)
-        return
-
-    # load
-    print("load camera data")
-    camera_data = vpc.read_camera()
-    print("load %d frames of camera" % len(camera_data.frame_ids))
-
-    # create object to processing camera data
-    cs = CameraSmoother(camera_data, interp_frame_interval)
-
-    # interpolation
-    print("doing interpolation of camera data...")
-    camera_interp = cs.interp(need_smooth, need_smooth_fov_angles)
-
-    if src_nonrotatable_bone and trace_bone_name:
-        vpb = VmdSimpleProfile(src_nonrotatable_bone)
-        if vpb.check_is_camera():
-            print("Not bone data but camera data: " + src_nonrotatable_bone)
-        else:
-            print("load fully interpolated nonrotatable bone data...")
-            bone_data = vpb.read_desired_bones({trace_bone_name})[trace_bone_name]
-            print("load %d frames of bone %s" % (bone_data.get_frame_num(), bone_data.name))
-
-        print("calculate camera tracing bone...")
-        # camera distance data is redundant (useless, and misleading) for bone tracing
-        camera_interp.distances = camera_interp.positions[:,2]
-        camera_interp.positions = CameraTracer.trace_bone(camera_interp, bone_data)
-
-    if camera_shake_interval > 0. and camera_shake_amplitude > 0.:
-        print(
-            "add cammera shake with interval %f sec and amplitiude %f m ..."
-            % (camera_shake_interval, camera_shake_amplitude)
-        )
-        camera_interp.positions = CameraTracer.add_camera_shake(
-            camera_interp, camera_shake_interval, camera_shake_amplitude,
-        )
-
-    # write to file
-    print("exporting camera data to file: '%s' ..." % dst_camera)
-    vpc.write_camera(dst_camera, camera_interp)
-    print("done!")
-
-
 if __name__ == "__main__":
     main()
@@ -1,13 +1,14 @@
 # -*- coding: utf-8 -*-
 import argparse
 
-import numpy as np
-
-from mmd_vmd_interpolation.bones_pose_calculator import (
-    BonesPoseCalculator,
-    BonesTree,
+from mmd_vmd_interpolation.job_planner import JobPlanner
+from mmd_vmd_interpolation.job_setting import (
+    PREVIEW_STRIDE,
+    QUALITIES,
+    QUALITY_FULL,
 )
-from mmd_vmd_interpolation.vmd_profile import VmdSimpleProfile
+from mmd_vmd_interpolation.keyframe_validator import KeyframeValidator
+from mmd_vmd_interpolation.nonrotatable_bones_job import generate_nonrotatable_bones_data
 
 
 def main():
@@ -22,94 +23,73 @@ def main():
         "-d", "--delay", type=float, default=0.0,
         help="time delay of motion smoothing (second)",
     )
+    parser.add_argument(
+        "-m", "--model", type=str,
+        help="pmx model file providing bone positions (default: built-in body shape)",
+    )
+    parser.add_argument(
+        "-b", "--bones", type=str, nargs="+",
+        help="bones to export (default: all built-in bones), "
+            "where only they and their ancestors are evaluated",
+    )
+    parser.add_argument(
+        "--timeline_output", type=str,
+        help="also export dense timeline of nonrotatable bones (directory or .npz)",
+    )
+    parser.add_argument(
+        "--keep_redundant_frames", action="store_true",
+        help="flag of keeping the frames which are constant or linear to neighbors",
+    )
+    parser.add_argument(
+        "--validation", type=str, default=KeyframeValidator.POLICY_REPAIR,
+        choices=KeyframeValidator.POLICIES,
+        help="policy for invalid keyframes (duplicate frames, NaN, unnormalized "
+            "quaternion, out-of-range curve)",
+    )
+    parser.add_argument(
+        "--quality", type=str, default=QUALITY_FULL, choices=QUALITIES,
+        help="quality of output, where preview is evaluated on coarse frames "
+            "with approximated curves and without smoothing, "
+            "and progressive overwrites the preview with full quality",
+    )
+    parser.add_argument(
+        "--preview_stride", type=int, default=PREVIEW_STRIDE,
+        help="number of frames between 2 preview frames",
+    )
+    parser.add_argument(
+        "--memory_mode", type=str, default=JobPlanner.MODE_FULL,
+        choices=JobPlanner.MODES + [JobPlanner.MODE_AUTO],
+        help="how bones on full timeline are kept in memory, where float32 halves "
+            "memory with less precision, chunked evaluates chunks of frames without "
+            "cache, and auto chooses the fastest one in memory_budget",
+    )
+    parser.add_argument(
+        "--memory_budget", type=float,
+        help="budget of peak memory (MB), over which the job is refused "
+            "(estimated from vmd header before loading)",
+    )
+    parser.add_argument(
+        "--threads", type=int, default=1,
+        help="number of threads for smoothing bones along timeline",
+    )
     args = parser.parse_args()
 
     generate_nonrotatable_bones_data(
         src=args.src,
         dst=args.output,
         motion_time_delay=args.delay,
+        need_reduce=not args.keep_redundant_frames,
+        src_model=args.model,
+        bones_names=args.bones,
+        dst_timeline=args.timeline_output,
+        validation_policy=args.validation,
+        quality=args.quality,
+        preview_stride=args.preview_stride,
+        memory_mode=args.memory_mode,
+        memory_budget=args.memory_budget,
+        thread_num=args.threads,
     )
 
 
-def generate_nonrotatable_bones_data(src, dst, motion_time_delay=0.0):
-
-    vp = VmdSimpleProfile(src)
-
-    if vp.check_is_camera():
-        print("Not bones data but camera data: " + src)
-        return
-
-    # setting
-    desired_bones_names = [
-        "全ての親", "センター", "グルーブ", "腰",
-        "上半身", "上半身2", "首", "頭", "面",
-        "右肩P", "右肩", "右腕", "左肩P", "左肩", "左腕",
-    ]
-    bones_tree = BonesTree.get([
-        ["全ての親", None, np.array([0., 0., 0.])],
-        ["センター", "全ての親", np.array([0., 8., 0.])],
-        ["グルーブ", "センター", np.array([0., 8.2, 0.])],
-        ["腰", "グルーブ", np.array([0., 12., 0.255])],
-        ["上半身", "腰", np.array([0., 12.8, -0.5])],
-        ["上半身2", "上半身", np.array([0., 13.9, -0.46])],
-        ["首", "上半身2", np.array([0., 16.34, -0.11])],
-        ["頭", "首", np.array([0., 17.2, -0.12])],
-        ["面", "頭", np.array([0., 17.8, -1.0])],
-        ["右肩P", "上半身2", np.array([-0.235, 16.06, -0.15])],
-        ["右肩", "右肩P", np.array([-0.235, 16.06, -0.15])],
-        ["右腕", "右肩", np.array([-1.1, 15.8, -0.13])],
-        ["左肩P", "上半身2", np.array([0.235, 16.06, -0.15])],
-        ["左肩", "左肩P", np.array([0.235, 16.06, -0.15])],
-        ["左腕", "左肩", np.array([1.1, 15.8, -0.13])],
-    ])
-    bones_name_remap = {
-        "全ての親":"parent of all",
-        "センター":"center",
-        "グルーブ":"groove",
-        "腰":"waist",
-        "上半身":"upper body",
-        "上半身2":"upper body 2",
-        "首":"neck",
-        "頭":"head",
-        "面":"face",
-        "右肩": "right shoulder",
-        "右腕": "right arm",
-        "左肩": "left shoulder",
-        "左腕": "left arm",
-    }
-    dst_model_name = "nonrotatable_bone"
-
-    # load
-    model_name = vp.read_model_name()
-    print("loading bonse data from model: %s ..." % model_name)
-    bones_dict = vp.read_desired_bones(desired_bones_names)
-    for bone_name in desired_bones_names:
-        bone_data = bones_dict[bone_name]
-        print("load %d frames of bone %s" % (bone_data.get_frame_num(), bone_data.name))
-
-    # create object to processing bone data
-    bpc = BonesPoseCalculator(bones_dict, bones_tree)
-
-    # interpolation
-    print("doing interpolation of bone data...")
-    bones_interp_data = bpc.get_full_interp_bones()
-
-    # generate nonrotatable bones
-    print(
-        "generating nonrotatable bones "
-        "with %f sec of time delay..." % motion_time_delay
-    )
-    nonrotatable_bones = bpc.get_lpf_full_positions_bones(motion_time_delay)
-    nonrotatable_bones_remap = {
-        new_name: nonrotatable_bones[old_name] \
-            for old_name, new_name in bones_name_remap.items()
-    }
-
-    # write to file
-    print("exporting nonrotatable bone data to file: '%s' ..." % dst)
-    vp.write_bones(dst, dst_model_name, nonrotatable_bones_remap)
-    print("done!")
-
-
 if __name__ == "__main__":
     main()
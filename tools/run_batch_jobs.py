@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+
+from mmd_vmd_interpolation.bone_tracing_camera_job import generate_bone_tracing_camera_data
+from mmd_vmd_interpolation.job_planner import JobPlanner
+from mmd_vmd_interpolation.nonrotatable_bones_job import generate_nonrotatable_bones_data
+from mmd_vmd_interpolation.vmd_profile import VmdSimpleProfile
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "manifest", type=str,
+        help="json file of job list, e.g. "
+            '[{"type": "nonrotatable_bones", "options": {"src": "a.vmd", "dst": "b.vmd"}}]',
+    )
+    parser.add_argument(
+        "--journal", type=str,
+        help="journal file of job progress (default: manifest path + '.journal')",
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="flag of rerunning all jobs even if they are done",
+    )
+    parser.add_argument(
+        "-k", "--keep_going", action="store_true",
+        help="flag of continuing with other jobs after a job fails",
+    )
+    parser.add_argument(
+        "--memory_budget", type=float,
+        help="budget of peak memory (MB) of each job, which chooses its memory mode, "
+            "and the job fails if its estimated peak memory doesn't fit",
+    )
+    args = parser.parse_args()
+
+    runner = BatchRunner(args.manifest, args.journal, args.memory_budget)
+    is_success = runner.run(need_force=args.force, need_keep_going=args.keep_going)
+    exit(0 if is_success else 1)
+
+
+class BatchRunner(object):
+
+    # jobs have the same options as the keyword arguments of tools,
+    # with the keys of input and output paths
+    _JOBS = {
+        "nonrotatable_bones": (
+            generate_nonrotatable_bones_data, ["src", "src_model"], ["dst", "dst_timeline"],
+        ),
+        "bone_tracing_camera": (
+            generate_bone_tracing_camera_data,
+            ["src_camera", "src_nonrotatable_bone", "src_dancers", "src_dancer_model"],
+            ["dst_camera"],
+        ),
+    }
+    _HASH_CHUNK_SIZE = 1 << 20
+    _TEMP_SUFFIX = ".partial"
+
+    def __init__(self, manifest, journal=None, memory_budget=None):
+        # type: (str, str | None, float | None) -> None
+        self._manifest = manifest
+        self._journal = journal or manifest + ".journal"
+        self._memory_budget = memory_budget
+        # paths in manifest are relative to the manifest
+        self._base_dir = os.path.dirname(os.path.abspath(manifest))
+
+    def _load_jobs(self):
+        # type: () -> list[tuple[str, str, callable, dict, list[str], list[str]]]
+        with open(self._manifest, "rb") as fp:
+            manifest = json.loads(fp.read().decode("utf-8"))
+        jobs = []
+        for i, job in enumerate(manifest):
+            job_type = job.get("type")
+            if job_type not in self._JOBS:
+                raise ValueError("unknown job type of job %d: %s" % (i, job_type))
+            fun, src_keys, dst_keys = self._JOBS[job_type]
+            options = dict(job.get("options", {}))
+            unknown_keys = set(options) - set(inspect.signature(fun).parameters)
+            if unknown_keys:
+                raise ValueError(
+                    "unknown options of job %d: %s" % (i, ", ".join(sorted(unknown_keys)))
+                )
+            for key in src_keys + dst_keys:
+                if isinstance(options.get(key), list):
+                    options[key] = [os.path.join(self._base_dir, path) for path in options[key]]
+                elif options.get(key):
+                    options[key] = os.path.join(self._base_dir, options[key])
+            dst_paths = [options[key] for key in dst_keys if options.get(key)]
+            if not dst_paths:
+                raise ValueError("no output of job %d" % i)
+            job_id = str(job.get("id", i))
+            jobs.append((job_id, job_type, fun, options, src_keys, dst_keys))
+        return jobs
+
+    def _load_journal(self):
+        # type: () -> dict[str, dict]
+        # the last record of each job is its current state,
+        # and a broken line written at crash is ignored
+        records = {}  # type: dict[str, dict]
+        if not os.path.exists(self._journal):
+            return records
+        with open(self._journal, "rb") as fp:
+            for line in fp:
+                try:
+                    record = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    continue
+                records[record["id"]] = record
+        return records
+
+    def _append_journal(self, record):
+        # type: (dict) -> None
+        with open(self._journal, "ab+") as fp:
+            # broken line written at crash is ended, so that it doesn't break this record
+            if fp.seek(0, 2) > 0:
+                fp.seek(-1, 2)
+                if fp.read(1) != b"\n":
+                    fp.write(b"\n")
+            fp.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            fp.flush()
+            os.fsync(fp.fileno())
+
+    @classmethod
+    def _hash_path(cls, path):
+        # type: (str) -> str
+        # content hash of file, or files in directory (dense timeline)
+        hasher = hashlib.sha256()
+        if not os.path.exists(path):
+            # member of zip archive, e.g. "motion.zip/camera.vmd"
+            path, member = VmdSimpleProfile.split_archive_path(path)
+            hasher.update((member or "").encode("utf-8"))
+        if os.path.isdir(path):
+            file_paths = sorted([
+                os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+            ])
+        else:
+            file_paths = [path]
+        for file_path in file_paths:
+            hasher.update(os.path.relpath(file_path, path).encode("utf-8"))
+            with open(file_path, "rb") as fp:
+                for chunk in iter(lambda: fp.read(cls._HASH_CHUNK_SIZE), b""):
+                    hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def _get_job_hash(self, job_type, options, src_keys):
+        # type: (str, dict, list[str]) -> str
+        # parameters and contents of inputs, but not the paths of inputs
+        src_hashes = {}  # type: dict[str, str | list[str]]
+        for key in src_keys:
+            if isinstance(options.get(key), list):
+                src_hashes[key] = [self._hash_path(path) for path in options[key]]
+            elif options.get(key):
+                src_hashes[key] = self._hash_path(options[key])
+        params = {key: value for key, value in options.items() if key not in src_hashes}
+        raw = json.dumps([job_type, params, src_hashes], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def _get_temp_path(cls, path):
+        # type: (str) -> str
+        # keep extension, which determines the output format
+        root, ext = os.path.splitext(path)
+        return root + cls._TEMP_SUFFIX + ext
+
+    @staticmethod
+    def _remove_path(path):
+        # type: (str) -> None
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def _run_job(self, fun, options, dst_keys):
+        # type: (callable, dict, list[str]) -> None
+        # write outputs to temporary paths and rename them after all are done,
+        # so that an output path never has incomplete data
+        temp_options = dict(options)
+        temp_paths = {}  # type: dict[str, str]
+        for key in dst_keys:
+            if options.get(key):
+                temp_paths[key] = self._get_temp_path(options[key])
+                self._remove_path(temp_paths[key])
+                temp_options[key] = temp_paths[key]
+        # memory budget (and automatic memory mode) unless the job has its own,
+        # which isn't a parameter of job hash since it only affects resources
+        if self._memory_budget is not None:
+            parameters = inspect.signature(fun).parameters
+            if "memory_budget" in parameters:
+                temp_options.setdefault("memory_budget", self._memory_budget)
+            if "memory_mode" in parameters:
+                temp_options.setdefault("memory_mode", JobPlanner.MODE_AUTO)
+        try:
+            fun(**temp_options)
+            missing_paths = [
+                options[key] for key, path in temp_paths.items() if not os.path.exists(path)
+            ]
+            if missing_paths:
+                raise RuntimeError("no output: %s" % ", ".join(missing_paths))
+            for key, path in temp_paths.items():
+                if os.path.isdir(path):
+                    # directory can't be replaced at once
+                    self._remove_path(options[key])
+                os.replace(path, options[key])
+        finally:
+            for path in temp_paths.values():
+                self._remove_path(path)
+
+    def _fail_job(self, record, e):
+        # type: (dict, Exception) -> None
+        print("job %s (%s) failed: %s: %s" % (record["id"], record["type"], type(e).__name__, e))
+        self._append_journal(dict(
+            record, status="failed", error="%s: %s" % (type(e).__name__, e), time=time.time(),
+        ))
+
+    def run(self, need_force=False, need_keep_going=False):
+        # type: (bool, bool) -> bool
+        jobs = self._load_jobs()
+        records = self._load_journal()
+        is_success = True
+        for job_id, job_type, fun, options, src_keys, dst_keys in jobs:
+            dst_paths = [options[key] for key in dst_keys if options.get(key)]
+            record = {"id": job_id, "type": job_type, "outputs": dst_paths}
+            try:
+                job_hash = self._get_job_hash(job_type, options, src_keys)
+            except OSError as e:
+                # missing input fails the job instead of the whole batch
+                self._fail_job(record, e)
+                is_success = False
+                if need_keep_going:
+                    continue
+                break
+            record = records.get(job_id, {})
+            if not need_force and record.get("status") == "done" \
+                    and record.get("hash") == job_hash \
+                    and record.get("outputs") == dst_paths \
+                    and all([os.path.exists(path) for path in dst_paths]):
+                print("skip job %s (%s): up to date" % (job_id, job_type))
+                continue
+            if record.get("status") == "running":
+                print("resume job %s (%s) interrupted last time" % (job_id, job_type))
+            print("run job %s (%s) ..." % (job_id, job_type))
+            record = {"id": job_id, "type": job_type, "hash": job_hash, "outputs": dst_paths}
+            self._append_journal(dict(record, status="running", time=time.time()))
+            time_start = time.monotonic()
+            try:
+                self._run_job(fun, options, dst_keys)
+            except Exception as e:
+                self._fail_job(record, e)
+                is_success = False
+                if need_keep_going:
+                    continue
+                break
+            self._append_journal(dict(
+                record, status="done", elapsed=time.monotonic() - time_start, time=time.time(),
+            ))
+        return is_success
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+from mmd_vmd_interpolation.bone_tracing_camera_job import (
+    generate_bone_tracing_camera_data,
+    plan_bone_tracing_camera_data,
+)
+from mmd_vmd_interpolation.job_planner import JobPlanner
+from mmd_vmd_interpolation.nonrotatable_bones_job import (
+    generate_nonrotatable_bones_data,
+    plan_nonrotatable_bones_data,
+)
+from mmd_vmd_interpolation.mmd_curve_interp import MMDCurveInterp
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--host", type=str, default="127.0.0.1",
+        help="host of http server (localhost only by default)",
+    )
+    parser.add_argument(
+        "--port", type=int, default=8765,
+        help="port of http server",
+    )
+    parser.add_argument(
+        "--unix_socket", type=str,
+        help="path of unix socket to listen instead of tcp port",
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=2,
+        help="number of worker threads",
+    )
+    parser.add_argument(
+        "--queue_size", type=int, default=16,
+        help="maximum number of jobs waiting for worker",
+    )
+    parser.add_argument(
+        "--file_cache_size", type=int, default=16,
+        help="maximum number of vmd files whose content is kept in memory",
+    )
+    parser.add_argument(
+        "--curve_cache_memory", type=float, default=64.0,
+        help="maximum memory (MB) of solved mmd curves kept in memory",
+    )
+    parser.add_argument(
+        "--memory_budget", type=float,
+        help="budget of peak memory (MB) shared by running jobs, where a job waits "
+            "until its estimated peak memory fits, and is refused if it never fits",
+    )
+    args = parser.parse_args()
+
+    server = JobServer(
+        workers=args.workers,
+        queue_size=args.queue_size,
+        file_cache_size=args.file_cache_size,
+        curve_cache_memory=args.curve_cache_memory,
+        memory_budget=args.memory_budget,
+    )
+    asyncio.run(server.serve(args.host, args.port, args.unix_socket))
+
+
+class FileCache(object):
+
+    # content of source files, which is reloaded if the file is modified
+
+    def __init__(self, max_size):
+        # type: (int) -> None
+        self._max_size = max_size
+        self._contents = collections.OrderedDict()  # type: collections.OrderedDict[str, tuple[tuple[int, int], bytes]]
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, path):
+        # type: (str) -> memoryview
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._contents.get(path)
+            if cached is not None and cached[0] == version:
+                self._contents.move_to_end(path)
+                self.stats["hits"] += 1
+                return memoryview(cached[1])
+            self.stats["misses"] += 1
+        with open(path, "rb") as fp:
+            content = fp.read()
+        with self._lock:
+            self._contents[path] = (version, content)
+            while len(self._contents) > self._max_size:
+                self._contents.popitem(last=False)
+        return memoryview(content)
+
+
+class JobServer(object):
+
+    # jobs have the same options as the keyword arguments of tools,
+    # with the function estimating peak memory of the job from vmd headers
+    _JOBS = {
+        "nonrotatable_bones": (
+            generate_nonrotatable_bones_data, ["src"], plan_nonrotatable_bones_data,
+        ),
+        "bone_tracing_camera": (
+            generate_bone_tracing_camera_data, ["src_camera", "src_nonrotatable_bone"],
+            plan_bone_tracing_camera_data,
+        ),
+    }
+    _LATENCY_HISTORY_LEN = 1000
+
+    def __init__(
+            self, workers=2, queue_size=16, file_cache_size=16, curve_cache_memory=64.0,
+            memory_budget=None,
+        ):
+        # type: (int, int, int, float, float | None) -> None
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self._workers = workers
+        self._queue_size = queue_size
+        self._file_cache = FileCache(file_cache_size)
+        MMDCurveInterp.enable_curve_cache(int(curve_cache_memory * 1e6))
+        self._pending_num = 0
+        self._running_num = 0
+        self._running_num_lock = threading.Lock()
+        self._stats = {"completed": 0, "failed": 0, "rejected": 0, "refused": 0}
+        # estimated peak memory (bytes) reserved by admitted jobs in the budget
+        self._memory_budget_bytes = None if memory_budget is None else int(memory_budget * 1e6)
+        self._reserved_bytes = 0
+        self._memory_waiting_num = 0
+        self._memory_condition = asyncio.Condition()
+        self._latencies = collections.deque(maxlen=self._LATENCY_HISTORY_LEN)
+
+    async def serve(self, host, port, unix_socket=None):
+        # type: (str, int, str | None) -> None
+        if unix_socket:
+            server = await asyncio.start_unix_server(self._handle, path=unix_socket)
+            print("listening on unix socket: %s" % unix_socket)
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+            print("listening on http://%s:%d" % (host, port))
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        # type: (asyncio.StreamReader, asyncio.StreamWriter) -> None
+        try:
+            method, path, body = await self._read_request(reader)
+            if method == "GET" and path == "/stats":
+                status, result = 200, self.get_stats()
+            elif method == "POST" and path == "/jobs":
+                status, result = await self.submit(json.loads(body or b"{}"))
+            else:
+                status, result = 404, {"error": "unknown request: %s %s" % (method, path)}
+        except Exception as e:
+            status, result = 400, {"error": str(e)}
+        self._write_response(writer, status, result)
+        await writer.drain()
+        writer.close()
+
+    @staticmethod
+    async def _read_request(reader):
+        # type: (asyncio.StreamReader) -> tuple[str, str, bytes]
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) < 2:
+            raise ValueError("bad request")
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+        body_len = int(headers.get("content-length", 0))
+        body = await reader.readexactly(body_len) if body_len else b""
+        return request_line[0], request_line[1], body
+
+    @staticmethod
+    def _write_response(writer, status, result):
+        # type: (asyncio.StreamWriter, int, dict) -> None
+        body = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        reasons = {
+            200: "OK", 400: "Bad Request", 404: "Not Found",
+            500: "Internal Server Error", 503: "Service Unavailable",
+        }
+        writer.write((
+            "HTTP/1.1 %d %s\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            "Content-Length: %d\r\n"
+            "Connection: close\r\n\r\n" % (status, reasons.get(status, ""), len(body))
+        ).encode("latin-1") + body)
+
+    async def submit(self, job):
+        # type: (dict) -> tuple[int, dict]
+        job_type = job.get("type")
+        if job_type not in self._JOBS:
+            return 400, {"error": "unknown job type: %s" % job_type}
+        fun, src_keys, plan_fun = self._JOBS[job_type]
+        options = dict(job.get("options", {}))
+        unknown_keys = set(options) - set(inspect.signature(fun).parameters)
+        if unknown_keys:
+            return 400, {"error": "unknown options: %s" % ", ".join(sorted(unknown_keys))}
+        # bounded queue
+        if self._pending_num >= self._queue_size + self._workers:
+            self._stats["rejected"] += 1
+            return 503, {"error": "queue is full"}
+        self._pending_num += 1
+        time_submit = time.monotonic()
+        loop = asyncio.get_running_loop()
+        reserved_bytes = 0
+        # plan fails by bad options (such as missing sources), and job fails by itself
+        status_failed = 400
+        try:
+            if self._memory_budget_bytes is not None:
+                plan = await self._admit(plan_fun, options)
+                if plan["decision"] == JobPlanner.DECISION_REFUSE:
+                    self._stats["refused"] += 1
+                    return 503, {"error": "refused: %s" % plan["reason"]}
+                reserved_bytes = plan["peak_bytes"]
+            status_failed = 500
+            await loop.run_in_executor(self._executor, self._run, fun, src_keys, options)
+        except Exception as e:
+            self._stats["failed"] += 1
+            return status_failed, {"error": "%s: %s" % (type(e).__name__, e)}
+        finally:
+            self._pending_num -= 1
+            if reserved_bytes:
+                async with self._memory_condition:
+                    self._reserved_bytes -= reserved_bytes
+                    self._memory_condition.notify_all()
+        latency = time.monotonic() - time_submit
+        self._latencies.append(latency)
+        self._stats["completed"] += 1
+        return 200, {"status": "done", "latency": latency}
+
+    async def _admit(self, plan_fun, options):
+        # type: (callable, dict) -> dict
+        # wait until estimated peak memory of the job fits the budget with the
+        # running jobs, and reserve it (memory mode of the job is decided by
+        # the plan unless given)
+        plan_keys = set(inspect.signature(plan_fun).parameters) - {"memory_budget", "in_use_bytes"}
+        plan_options = {key: value for key, value in options.items() if key in plan_keys}
+        if "memory_mode" in plan_keys:
+            plan_options.setdefault("memory_mode", JobPlanner.MODE_AUTO)
+        loop = asyncio.get_running_loop()
+        while True:
+            # reading vmd headers is blocking, so it isn't done in the condition,
+            # and the plan is redone if reserved memory is changed meanwhile
+            in_use_bytes = self._reserved_bytes
+            plan = await loop.run_in_executor(None, functools.partial(
+                plan_fun, memory_budget=self._memory_budget_bytes / 1e6,
+                in_use_bytes=in_use_bytes, **plan_options
+            ))
+            async with self._memory_condition:
+                if self._reserved_bytes != in_use_bytes:
+                    continue
+                if plan["decision"] == JobPlanner.DECISION_RUN:
+                    self._reserved_bytes += plan["peak_bytes"]
+                    if "memory_mode" in plan_keys:
+                        options["memory_mode"] = plan["mode"]
+                if plan["decision"] != JobPlanner.DECISION_QUEUE:
+                    return plan
+                self._memory_waiting_num += 1
+                try:
+                    await self._memory_condition.wait()
+                finally:
+                    self._memory_waiting_num -= 1
+
+    def _run(self, fun, src_keys, options):
+        with self._running_num_lock:
+            self._running_num += 1
+        try:
+            # source files are passed as cached memory buffers
+            for key in src_keys:
+                if options.get(key) and os.path.isfile(options[key]) \
+                        and not options[key].endswith(".npz"):
+                    options[key] = self._file_cache.get(options[key])
+            fun(**options)
+        finally:
+            with self._running_num_lock:
+                self._running_num -= 1
+
+    def get_stats(self):
+        # type: () -> dict
+        latencies = sorted(self._latencies)
+
+        def percentile(ratio):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies)-1, int(ratio * len(latencies)))]
+
+        return {
+            "workers": self._workers,
+            "queue_depth": self._pending_num - self._running_num,
+            "running": self._running_num,
+            "completed": self._stats["completed"],
+            "failed": self._stats["failed"],
+            "rejected": self._stats["rejected"],
+            "refused": self._stats["refused"],
+            "memory_budget": self._memory_budget_bytes,
+            "memory_reserved": self._reserved_bytes,
+            "memory_waiting": self._memory_waiting_num,
+            "latency_mean": sum(latencies) / len(latencies) if latencies else None,
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+            "latency_max": latencies[-1] if latencies else None,
+            "file_cache": dict(self._file_cache.stats),
+            "curve_cache": MMDCurveInterp.get_curve_cache_stats(),
+        }
+
+
+if __name__ == "__main__":
+    main()